@@ -7,8 +7,10 @@ from datetime import datetime, timezone
 
 from app.core.database import get_db
 from app.models.endpoint import Endpoint
-from app.schemas.endpoint import EndpointCreate, EndpointUpdate, EndpointResponse
+from app.schemas.endpoint import EndpointCreate, EndpointUpdate, EndpointResponse, EndpointConcurrency
+from app.services.concurrency_controller import concurrency_controller
 from app.services.rclone_service import RcloneService
+from app.services.stats_counters import stats_counters
 
 router = APIRouter()
 rclone_service = RcloneService()
@@ -25,7 +27,9 @@ async def list_endpoints(
         select(Endpoint).offset(skip).limit(limit)
     )
     endpoints = result.scalars().all()
-    return endpoints
+    return await stats_counters.merge_endpoints(
+        [EndpointResponse.model_validate(endpoint) for endpoint in endpoints]
+    )
 
 
 @router.get("/{endpoint_id}", response_model=EndpointResponse)
@@ -45,7 +49,7 @@ async def get_endpoint(
             detail=f"Endpoint with id {endpoint_id} not found"
         )
     
-    return endpoint
+    return (await stats_counters.merge_endpoints([EndpointResponse.model_validate(endpoint)]))[0]
 
 
 @router.post("/", response_model=EndpointResponse, status_code=status.HTTP_201_CREATED)
@@ -204,4 +208,39 @@ async def test_endpoint_connection(
             "success": False,
             "status": "error",
             "message": str(e)
-        }
\ No newline at end of file
+        }
+
+
+async def _get_endpoint_or_404(endpoint_id: str, db: AsyncSession) -> Endpoint:
+    result = await db.execute(
+        select(Endpoint).where(Endpoint.id == endpoint_id)
+    )
+    endpoint = result.scalar_one_or_none()
+    
+    if not endpoint:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Endpoint with id {endpoint_id} not found"
+        )
+    return endpoint
+
+
+@router.get("/{endpoint_id}/concurrency", response_model=EndpointConcurrency)
+async def get_endpoint_concurrency(
+    endpoint_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the adaptive concurrency limit of an endpoint and why it was last changed"""
+    endpoint = await _get_endpoint_or_404(endpoint_id, db)
+    return await concurrency_controller.describe(endpoint.id, endpoint.max_concurrent_transfers)
+
+
+@router.post("/{endpoint_id}/concurrency/reset", response_model=EndpointConcurrency)
+async def reset_endpoint_concurrency(
+    endpoint_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Forget the learned concurrency limit so the endpoint starts over"""
+    endpoint = await _get_endpoint_or_404(endpoint_id, db)
+    await concurrency_controller.reset(endpoint.id)
+    return await concurrency_controller.describe(endpoint.id, endpoint.max_concurrent_transfers)
\ No newline at end of file
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
 from typing import List, Optional
+import logging
 import uuid
 from datetime import datetime, timezone
 
@@ -11,6 +12,22 @@ from app.schemas.job import JobCreate, JobUpdate, JobResponse, JobExecute
 from app.services.redis_manager import redis_manager
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def with_live_progress(jobs: List[Job]) -> List[JobResponse]:
+    """Add bytes copied so far by running transfers (kept in Redis) to running jobs"""
+    responses = [JobResponse.model_validate(job) for job in jobs]
+    running_ids = [r.id for r in responses if r.status == JobStatus.RUNNING]
+    try:
+        in_flight = await redis_manager.get_job_in_flight_bytes(running_ids)
+    except Exception as e:
+        logger.warning(f"Live job progress unavailable: {e}")
+        return responses
+    return [
+        r.model_copy(update={'transferred_bytes': r.transferred_bytes + in_flight[r.id]}) if in_flight.get(r.id) else r
+        for r in responses
+    ]
 
 
 @router.get("/", response_model=List[JobResponse])
@@ -33,7 +50,7 @@ async def list_jobs(
     
     result = await db.execute(query)
     jobs = result.scalars().all()
-    return jobs
+    return await with_live_progress(jobs)
 
 
 @router.get("/{job_id}", response_model=JobResponse)
@@ -53,7 +70,7 @@ async def get_job(
             detail=f"Job with id {job_id} not found"
         )
     
-    return job
+    return (await with_live_progress([job]))[0]
 
 
 @router.post("/", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
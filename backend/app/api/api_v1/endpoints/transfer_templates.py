@@ -12,6 +12,7 @@ from app.schemas.transfer_template import TransferTemplateCreate, TransferTempla
 from app.schemas.job import JobCreate, JobResponse
 # from app.services.chain_job_service import ChainJobService  # PHASE 3: Now handled by worker
 from app.services.redis_manager import redis_manager
+from app.services.stats_counters import stats_counters
 
 router = APIRouter()
 
@@ -36,7 +37,9 @@ async def list_transfer_templates(
     
     result = await db.execute(query)
     templates = result.scalars().all()
-    return templates
+    return await stats_counters.merge_templates(
+        [TransferTemplateResponse.model_validate(template) for template in templates]
+    )
 
 
 @router.get("/{template_id}", response_model=TransferTemplateResponse)
@@ -56,7 +59,7 @@ async def get_transfer_template(
             detail=f"Transfer template with id {template_id} not found"
         )
     
-    return template
+    return (await stats_counters.merge_templates([TransferTemplateResponse.model_validate(template)]))[0]
 
 
 @router.post("/", response_model=TransferTemplateResponse, status_code=status.HTTP_201_CREATED)
@@ -267,7 +270,7 @@ async def execute_transfer_template(
     await redis_manager.enqueue_job(job.id)
     
     # Update template statistics
-    template.total_triggers += 1
+    await stats_counters.record_template(template.id, total_triggers=1)
     template.last_triggered = datetime.now(timezone.utc)
     await db.commit()
     
@@ -3,12 +3,31 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import List, Optional
 from datetime import datetime, timedelta
+import logging
 
 from app.core.database import get_db
 from app.models.transfer import Transfer, TransferStatus
 from app.schemas.transfer import TransferResponse, TransferStats
+from app.services.redis_manager import redis_manager
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def with_live_progress(transfers: List[Transfer]) -> List[TransferResponse]:
+    """Overlay live progress from Redis on transfers that are still running
+    
+    The worker only writes progress to Postgres every few seconds; Redis has
+    the latest values. Falls back to the stored values if Redis is unavailable.
+    """
+    responses = [TransferResponse.model_validate(transfer) for transfer in transfers]
+    running_ids = [r.id for r in responses if r.status == TransferStatus.IN_PROGRESS]
+    try:
+        live = await redis_manager.get_transfer_progress(running_ids)
+    except Exception as e:
+        logger.warning(f"Live transfer progress unavailable: {e}")
+        return responses
+    return [r.model_copy(update=live[r.id]) if r.id in live else r for r in responses]
 
 
 @router.get("/dashboard-stats", response_model=dict)
@@ -54,7 +73,7 @@ async def get_active_transfers(
         .order_by(Transfer.started_at.desc())
     )
     transfers = result.scalars().all()
-    return transfers
+    return await with_live_progress(transfers)
 
 
 @router.get("/stats", response_model=TransferStats)
@@ -86,6 +105,17 @@ async def get_transfer_stats(
     )
     total_bytes = result.scalar() or 0
     
+    # Bytes that skipped the worker network path
+    result = await db.execute(
+        select(func.sum(Transfer.bytes_transferred))
+        .where(
+            Transfer.created_at >= since,
+            Transfer.status == TransferStatus.COMPLETED,
+            Transfer.server_side.is_(True)
+        )
+    )
+    server_side_bytes = result.scalar() or 0
+    
     # Calculate average transfer rate
     result = await db.execute(
         select(func.avg(Transfer.transfer_rate))
@@ -103,6 +133,7 @@ async def get_transfer_stats(
         completed_transfers=status_counts.get(TransferStatus.COMPLETED, 0),
         failed_transfers=status_counts.get(TransferStatus.FAILED, 0),
         total_bytes_transferred=total_bytes,
+        server_side_bytes=server_side_bytes,
         average_transfer_rate=avg_rate
     )
 
@@ -133,7 +164,7 @@ async def list_transfers(
     
     result = await db.execute(query)
     transfers = result.scalars().all()
-    return transfers
+    return await with_live_progress(transfers)
 
 
 @router.get("/{transfer_id}", response_model=TransferResponse)
@@ -153,7 +184,7 @@ async def get_transfer(
             detail=f"Transfer with id {transfer_id} not found"
         )
     
-    return transfer
+    return (await with_live_progress([transfer]))[0]
 
 
 @router.post("/{transfer_id}/retry", response_model=dict)
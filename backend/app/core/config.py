@@ -46,6 +46,11 @@ class Settings(BaseSettings):
     RCLONE_RC_ADDR: str = "localhost:5572"
     RCLONE_RC_USER: Optional[str] = None
     RCLONE_RC_PASS: Optional[str] = None
+    RCLONE_EXECUTION_ENGINE: str = "cli"  # cli (an rclone process per transfer) or rcd (jobs in the rclone rcd)
+    RCLONE_RC_MAX_CONNECTIONS: int = 20  # Pooled keep-alive connections (and concurrent requests) to the RC API
+    RCLONE_RC_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle RC API connection stays open
+    RCLONE_RC_TIMEOUT: float = 30.0  # Default timeout (seconds) for one RC API call
+    RCLONE_RC_POLL_INTERVAL: float = 1.0  # Seconds between batched status/stats polls of running rcd jobs
     
     # Email
     SMTP_HOST: str = "smtp.ctf.org"
@@ -72,6 +77,43 @@ class Settings(BaseSettings):
     DEFAULT_MAX_CONCURRENT: int = 5
     THROTTLE_CHECK_INTERVAL: int = 1  # seconds
     
+    # Worker
+    WORKER_JOB_CONCURRENCY: int = 1  # jobs a single worker process runs at once
+    WORKER_SHUTDOWN_TIMEOUT: int = 30  # seconds to let running jobs finish on shutdown
+    JOB_MAX_PARALLEL_TRANSFERS: int = 4  # files transferred at once within one job
+    TRANSFER_MODE: str = "per_file"  # per_file, batch (one rclone per job) or auto (batch for SMB/SFTP)
+    LISTING_CHUNK_SIZE: int = 500  # listed files turned into Transfer rows and started together
+    LISTING_CHUNK_SECONDS: float = 1.0  # start a partial chunk once its first file has waited this long
+    SYNC_MODE: str = "full"  # full, or incremental (skip files unchanged since they were last transferred)
+    DEDUP_MAX_AGE_HOURS: int = 0  # skip files delivered unchanged to the same destination path this recently (0 disables); the destination itself is not checked
+    CHAIN_JOB_MODE: str = "per_file"  # "per_file" (one chain job per file) or "grouped" (one chain job per rule with a file list)
+    CHAIN_DISPATCH: str = "on_completion"  # "on_completion" (after the whole parent succeeds), "streaming" (as each file lands) or "fanout" (copy from the parent's source once each file's parent transfer succeeds)
+    CHAIN_DISPATCH_SECONDS: float = 2.0  # streaming chains: how long to gather landed files into one dispatch; fan-out chains: how often to check parent transfers
+    
+    # Job queue
+    QUEUE_BLOCK_TIMEOUT: int = 5  # seconds an idle worker blocks waiting for a job
+    QUEUE_PROMOTE_INTERVAL: int = 5  # max seconds between checks for due delayed jobs
+    JOB_LEASE_SECONDS: int = 60  # a claimed job is requeued if its worker misses heartbeats this long
+    JOB_LEASE_HEARTBEAT: int = 15  # seconds between lease renewals (and expired lease reaping)
+    # Endpoint slots
+    SLOT_LEASE_SECONDS: int = 60  # a transfer slot is freed if its holder stops renewing this long
+    SLOT_WAIT_POLL_INTERVAL: int = 5  # max seconds a queued waiter sleeps before re-checking
+    SLOT_PARK_RECHECK_SECONDS: int = 60  # a parked job is requeued after this even if no slot was released
+    # Adaptive concurrency (AIMD below each endpoint's max_concurrent_transfers)
+    ADAPTIVE_CONCURRENCY: bool = True  # adjust endpoint concurrency to observed throughput and errors
+    AIMD_INITIAL_LIMIT: int = 0  # concurrency an endpoint starts at (0 = its max_concurrent_transfers)
+    AIMD_DECREASE_FACTOR: float = 0.5  # limit multiplier on errors, throttling or falling throughput
+    AIMD_ERROR_THRESHOLD: int = 3  # non-throttling errors in a row before the limit is cut
+    AIMD_DECREASE_COOLDOWN: int = 10  # min seconds between decreases, so one burst of failures backs off once
+    AIMD_THROUGHPUT_DROP: float = 0.5  # back off when per-stream throughput falls below this fraction of its average
+    AIMD_MIN_SAMPLE_BYTES: int = 8388608  # smaller transfers don't count toward throughput
+    # Bandwidth governor (splits Endpoint.max_bandwidth across active transfers)
+    BANDWIDTH_REBALANCE_INTERVAL: int = 2  # seconds between re-checking a transfer's share
+    BANDWIDTH_LEASE_SECONDS: int = 30  # a transfer stops counting against the budget if not renewed this long
+    # Transfer progress
+    PROGRESS_FLUSH_INTERVAL: int = 5  # seconds between batched writes of live progress to Postgres
+    STATS_FLUSH_INTERVAL: int = 10  # seconds between batched writes of endpoint/template counters to Postgres
+    
     model_config = SettingsConfigDict(
         env_file=[".env", "../.env"],  # Check backend/.env first, then root/.env
         env_file_encoding="utf-8",
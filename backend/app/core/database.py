@@ -1,3 +1,4 @@
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
@@ -25,6 +26,24 @@ AsyncSessionLocal = async_sessionmaker(
 # Create base class for models
 Base = declarative_base()
 
+# Columns added to existing tables. create_all only creates missing tables,
+# so these are applied after it; each statement is safe to run again.
+SCHEMA_UPGRADES = (
+    # Chain jobs: the parent transfer each file came from
+    "ALTER TABLE transfers ADD COLUMN IF NOT EXISTS parent_transfer_id VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_transfers_parent_transfer_id ON transfers (parent_transfer_id)",
+    # Server-side copies; existing rows were all streamed through a worker
+    "ALTER TABLE transfers ADD COLUMN IF NOT EXISTS server_side BOOLEAN DEFAULT false",
+    # File version passed on to chain jobs
+    "ALTER TABLE transfers ADD COLUMN IF NOT EXISTS fingerprint VARCHAR",
+)
+
+
+async def upgrade_schema(conn):
+    """Add columns that existing databases are missing (run after create_all)"""
+    for statement in SCHEMA_UPGRADES:
+        await conn.execute(text(statement))
+
 
 # Dependency to get DB session
 async def get_db():
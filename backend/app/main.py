@@ -3,8 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.api.api_v1.api import api_router
-from app.core.database import engine, Base
+from app.core.database import engine, Base, upgrade_schema
 from app.services.redis_manager import redis_manager
+from app.services.rclone_service import RcloneService
 
 
 @asynccontextmanager
@@ -15,6 +16,7 @@ async def lifespan(app: FastAPI):
     # Create database tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await upgrade_schema(conn)
     
     # Initialize Redis connection
     await redis_manager.connect()
@@ -23,6 +25,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("Shutting down CTF Rclone MVP API...")
+    await RcloneService.close_http_client()
     await redis_manager.disconnect()
 
 
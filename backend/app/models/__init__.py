@@ -3,5 +3,7 @@ from app.models.transfer import Transfer
 from app.models.endpoint import Endpoint
 from app.models.transfer_template import TransferTemplate
 from app.models.settings import Settings, SETTING_KEYS
+from app.models.sync_manifest import SyncManifestEntry
+from app.models.delivered_file import DeliveredFile
 
-__all__ = ["Job", "Transfer", "Endpoint", "TransferTemplate", "Settings", "SETTING_KEYS"]
\ No newline at end of file
+__all__ = ["Job", "Transfer", "Endpoint", "TransferTemplate", "Settings", "SETTING_KEYS", "SyncManifestEntry", "DeliveredFile"]
\ No newline at end of file
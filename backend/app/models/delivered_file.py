@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, DateTime, BigInteger
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class DeliveredFile(Base):
+    """
+    The file version last delivered to a destination path by a successful
+    transfer, so repeat transfers of the same version can be skipped.
+    """
+    __tablename__ = "delivered_files"
+    
+    destination_endpoint_id = Column(String, primary_key=True)
+    destination_path = Column(String, primary_key=True)  # Directory and file name on the endpoint
+    
+    # Version of the source file that was delivered
+    size = Column(BigInteger, nullable=False)
+    fingerprint = Column(String, nullable=False)  # "<hash type>:<hash>", or "mtime:<source ModTime>" without a hash
+    
+    transfer_id = Column(String, nullable=True)
+    delivered_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
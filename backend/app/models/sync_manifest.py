@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, DateTime, BigInteger
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class SyncManifestEntry(Base):
+    """
+    Last successfully transferred version of a file for incremental sync.
+    One manifest per scope: a source endpoint and path synced to a
+    destination endpoint and path.
+    """
+    __tablename__ = "sync_manifest"
+    
+    scope = Column(String(64), primary_key=True)  # Hash of source/destination endpoint and path
+    file_path = Column(String, primary_key=True)  # Path relative to the source path
+    source_endpoint_id = Column(String, nullable=False, index=True)
+    
+    # File version as listed by rclone lsjson
+    size = Column(BigInteger, nullable=False)
+    mod_time = Column(String, nullable=True)
+    hash = Column(String, nullable=True)
+    
+    synced_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
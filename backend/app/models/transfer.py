@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, Float, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, Integer, Float, Boolean, ForeignKey, Enum as SQLEnum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -24,9 +24,11 @@ class Transfer(Base):
     file_name = Column(String, nullable=False)
     file_path = Column(String, nullable=False)  # Source file path
     file_size = Column(Integer, nullable=False)
+    fingerprint = Column(String, nullable=True)  # Version of the file when listed (hash or mtime), passed on to chain jobs
     
     # Destination tracking (for chain job support)
     destination_path = Column(String, nullable=True)  # Actual destination path after template substitution
+    parent_transfer_id = Column(String, nullable=True, index=True)  # Parent job's transfer this file came from (chain jobs)
     
     # Transfer progress
     status = Column(SQLEnum(TransferStatus), nullable=False, default=TransferStatus.PENDING)
@@ -45,6 +47,7 @@ class Transfer(Base):
     
     # Rclone specific
     rclone_job_id = Column(Integer, nullable=True)  # Rclone RC job ID
+    server_side = Column(Boolean, default=False)  # Copied endpoint-to-endpoint without passing through the worker
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
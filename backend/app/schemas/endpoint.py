@@ -37,4 +37,18 @@ class EndpointResponse(EndpointBase):
     total_bytes_transferred: int = 0
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class EndpointConcurrency(BaseModel):
+    """Adaptive concurrency state of an endpoint"""
+    endpoint_id: str
+    adaptive: bool
+    ceiling: int  # max_concurrent_transfers
+    limit: int  # slots currently allowed
+    active: int
+    waiting: int
+    stream_rate: Optional[float] = None  # average bytes/sec per transfer stream
+    last_decision: Optional[str] = None  # "increase" or "decrease"
+    last_reason: Optional[str] = None  # "ok", "throttled" or "throughput"
+    decided_at: Optional[datetime] = None
\ No newline at end of file
@@ -25,6 +25,8 @@ class TransferResponse(TransferBase):
     error_message: Optional[str] = None
     retry_count: int = 0
     rclone_job_id: Optional[int] = None
+    parent_transfer_id: Optional[str] = None
+    server_side: bool = False
 
     class Config:
         from_attributes = True
@@ -36,4 +38,5 @@ class TransferStats(BaseModel):
     completed_transfers: int
     failed_transfers: int
     total_bytes_transferred: int
+    server_side_bytes: int = 0  # Bytes copied server-side, without passing through a worker
     average_transfer_rate: Optional[float] = None
\ No newline at end of file
@@ -0,0 +1,109 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+import logging
+
+from app.core.config import settings
+from app.models.endpoint import Endpoint
+from app.services.redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+
+class BandwidthGovernor:
+    """
+    Shares each endpoint's max_bandwidth across its active transfers.
+    Active transfers are registered in Redis, so the budget is split across
+    every worker; each rclone process enforces its share with --bwlimit.
+
+    The budget is split equally rather than metered through a shared token
+    bucket: the bytes flow through rclone, not the worker, so a cluster-wide
+    bucket would need every rclone process to take tokens from Redis as it
+    sends. rclone's --bwlimit already is a token bucket per process, and
+    the shares are rebalanced as transfers start and finish, so their sum
+    stays within the budget.
+    """
+
+    @staticmethod
+    def budgets_for(*endpoints: Endpoint) -> Dict[str, int]:
+        """Bandwidth budgets (bytes/sec) of the endpoints that have one"""
+        return {
+            endpoint.id: endpoint.max_bandwidth
+            for endpoint in endpoints
+            if endpoint.max_bandwidth
+        }
+
+    async def get_share(self, budgets: Dict[str, int], holder_id: str, streams: int = 1) -> Optional[int]:
+        """
+        Register (or renew) a transfer and get its current bandwidth share.
+
+        Args:
+            budgets: Endpoint ID -> max bandwidth in bytes/sec
+            holder_id: Unique ID of the transfer
+            streams: Files the transfer copies at once; each counts as one share
+
+        Returns:
+            Bytes/sec the transfer may use (the tightest endpoint wins), None if unlimited
+        """
+        if not budgets:
+            return None
+        counts = await redis_manager.join_bandwidth_share(
+            list(budgets), holder_id, settings.BANDWIDTH_LEASE_SECONDS, streams=streams
+        )
+        return min(max(1, budget * streams // counts[endpoint_id]) for endpoint_id, budget in budgets.items())
+
+    async def release(self, budgets: Dict[str, int], holder_id: str, streams: int = 1):
+        """Stop counting a transfer against its endpoints' budgets"""
+        if budgets:
+            await redis_manager.leave_bandwidth_share(list(budgets), holder_id, streams=streams)
+
+
+class BandwidthAllocation:
+    """Context manager holding a transfer's bandwidth share
+
+    `rate` is the share to start the transfer with. Once the transfer is
+    running, call follow() with a function that applies a new rate to it;
+    the share is then re-checked every BANDWIDTH_REBALANCE_INTERVAL seconds
+    and re-applied whenever other transfers start or finish.
+    """
+
+    def __init__(self, governor: BandwidthGovernor, budgets: Dict[str, int], holder_id: str, streams: int = 1):
+        self.governor = governor
+        self.budgets = budgets
+        self.holder_id = holder_id
+        self.streams = streams
+        self.rate: Optional[int] = None
+        self._rebalance_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.rate = await self.governor.get_share(self.budgets, self.holder_id, self.streams)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._rebalance_task:
+            self._rebalance_task.cancel()
+            try:
+                await self._rebalance_task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.shield(self.governor.release(self.budgets, self.holder_id, self.streams))
+
+    def follow(self, apply_rate: Callable[[int], Awaitable]):
+        """Keep the running transfer at its share by calling apply_rate on changes"""
+        if self.budgets and not self._rebalance_task:
+            self._rebalance_task = asyncio.create_task(self._rebalance(apply_rate))
+
+    async def _rebalance(self, apply_rate: Callable[[int], Awaitable]):
+        while True:
+            await asyncio.sleep(settings.BANDWIDTH_REBALANCE_INTERVAL)
+            try:
+                rate = await self.governor.get_share(self.budgets, self.holder_id, self.streams)
+                if rate != self.rate:
+                    await apply_rate(rate)
+                    logger.info(f"Transfer {self.holder_id} bandwidth rebalanced: {self.rate} -> {rate} bytes/sec")
+                    self.rate = rate
+            except Exception as e:
+                logger.warning(f"Error rebalancing bandwidth for transfer {self.holder_id}: {e}")
+
+
+# Global instance
+bandwidth_governor = BandwidthGovernor()
@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
+import os
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -19,7 +20,8 @@ class ChainJobService:
         parent_job: Job,
         chain_rules: List[Dict[str, str]],
         db: AsyncSession,
-        per_file_transfers: Optional[List[Transfer]] = None
+        per_file_transfers: Optional[List[Transfer]] = None,
+        grouped: bool = False
     ) -> List[Job]:
         """
         Create chain jobs from chain rules
@@ -29,6 +31,8 @@ class ChainJobService:
             chain_rules: List of chain rule definitions with endpoint_id and path_template
             db: Database session
             per_file_transfers: Optional list of successful transfers for per-file chain creation
+            grouped: With per_file_transfers, create one chain job per rule carrying
+                the whole file list instead of one job per file per rule
             
         Returns:
             List of created chain jobs
@@ -38,6 +42,13 @@ class ChainJobService:
             
         created_jobs = []
         
+        # Grouped: one chain job per rule, listing the transferred files
+        if per_file_transfers and grouped:
+            logger.info(f"Creating grouped chain jobs for {len(per_file_transfers)} transfers")
+            return await ChainJobService._create_grouped_chain_jobs(
+                parent_job, chain_rules, per_file_transfers, db
+            )
+        
         # If per_file_transfers provided, create one chain job per transfer
         if per_file_transfers:
             logger.info(f"Creating per-file chain jobs for {len(per_file_transfers)} transfers")
@@ -147,6 +158,179 @@ class ChainJobService:
         )
         return result.scalars().all()
     
+    @staticmethod
+    def _strip_remote_prefix(path: str) -> str:
+        """Strip an rclone remote prefix from a path (e.g. "dest:path" -> "path")"""
+        if path and ':' in path:
+            _, path = path.split(':', 1)
+        return path
+    
+    @staticmethod
+    async def _create_grouped_chain_jobs(
+        parent_job: Job,
+        chain_rules: List[Dict[str, str]],
+        transfers: List[Transfer],
+        db: AsyncSession
+    ) -> List[Job]:
+        """
+        Create one chain job per chain rule for all successfully transferred files
+        
+        Each job's config carries a "file_manifest" of the files it copies
+        (with their size, fingerprint and parent transfer), so the worker
+        creates its transfers without listing the source and copies them as
+        one batch. The fingerprint lets the chain's delivery index skip files
+        a previous run already delivered.
+        Files are grouped by directory, which gives one job per rule unless
+        the parent job spread its files over several directories. The rule's
+        path template is resolved per file by the worker.
+        
+        Args:
+            parent_job: The parent job
+            chain_rules: Chain rule definitions
+            transfers: List of successful transfers with resolved destination paths
+            db: Database session
+            
+        Returns:
+            List of created chain jobs
+        """
+        manifests: Dict[str, List[Dict]] = {}
+        for transfer in transfers:
+            source_file = ChainJobService._strip_remote_prefix(transfer.destination_path)
+            if not source_file:
+                logger.warning(f"Transfer {transfer.id} has no destination path, skipping chain")
+                continue
+            dir_path, filename = os.path.split(source_file)
+            manifests.setdefault(dir_path, []).append({
+                'name': filename,
+                'path': filename,
+                'size': transfer.file_size,
+                'fingerprint': transfer.fingerprint,
+                'parent_transfer_id': transfer.id
+            })
+        
+        created_jobs = []
+        created_at = datetime.now(timezone.utc)
+        for idx, chain_rule in enumerate(chain_rules):
+            for dir_path, manifest in manifests.items():
+                chain_job_data = JobCreate(
+                    name=f"{parent_job.name} - Chain {idx + 1} ({len(manifest)} files)",
+                    type=JobType.CHAINED,
+                    source_endpoint_id=parent_job.destination_endpoint_id,
+                    source_path=dir_path,
+                    destination_endpoint_id=chain_rule['endpoint_id'],
+                    destination_path=chain_rule['path_template'],
+                    file_pattern=None,
+                    delete_source_after_transfer=False,
+                    is_active=True,
+                    config={
+                        'parent_job_id': parent_job.id,
+                        'chain_index': idx,
+                        'chain_rule': chain_rule,
+                        'transfer_mode': 'batch',
+                        'file_manifest': manifest
+                    }
+                )
+                chain_job = Job(
+                    id=str(uuid.uuid4()),
+                    **chain_job_data.model_dump(),
+                    parent_job_id=parent_job.id,
+                    status=JobStatus.PENDING,
+                    created_at=created_at
+                )
+                db.add(chain_job)
+                created_jobs.append(chain_job)
+                logger.info(
+                    f"Created grouped chain job {chain_job.id} for {len(manifest)} files in '{dir_path}' "
+                    f"(parent job {parent_job.id})"
+                )
+        
+        if created_jobs:
+            await db.commit()
+            logger.info(f"Created {len(created_jobs)} grouped chain jobs")
+        
+        return created_jobs
+    
+    @staticmethod
+    async def create_fanout_chain_jobs(
+        parent_job: Job,
+        chain_rules: List[Dict[str, str]],
+        files: List[Dict],
+        db: AsyncSession
+    ) -> List[Job]:
+        """
+        Create one chain job per chain rule that copies files from the parent's source
+        
+        Fan-out: instead of re-reading each file from the parent's destination
+        once the parent has copied it, the chain jobs read the same source
+        files as the parent, alongside it. Files are Transfer rows of the
+        parent job (id, file_name, file_path, file_size, fingerprint); their
+        IDs become the chain transfers' parent_transfer_id. Unless the parent's
+        config sets "chain_fanout_wait" to False, the worker only queues the
+        jobs once those parent transfers have finished, and copies just the
+        files whose parent transfer succeeded.
+        
+        Args:
+            parent_job: The parent job
+            chain_rules: Chain rule definitions
+            files: The parent's Transfer rows to fan out
+            db: Database session
+            
+        Returns:
+            List of created chain jobs
+        """
+        if not chain_rules or not files:
+            return []
+        
+        manifest = [
+            {
+                'name': row['file_name'],
+                'path': row['file_path'],
+                'size': row['file_size'],
+                'fingerprint': row.get('fingerprint'),
+                'parent_transfer_id': row['id']
+            }
+            for row in files
+        ]
+        created_jobs = []
+        created_at = datetime.now(timezone.utc)
+        for idx, chain_rule in enumerate(chain_rules):
+            chain_job_data = JobCreate(
+                name=f"{parent_job.name} - Chain {idx + 1} ({len(manifest)} files)",
+                type=JobType.CHAINED,
+                source_endpoint_id=parent_job.source_endpoint_id,
+                source_path=parent_job.source_path,
+                destination_endpoint_id=chain_rule['endpoint_id'],
+                destination_path=chain_rule['path_template'],
+                file_pattern=None,
+                delete_source_after_transfer=False,
+                is_active=True,
+                config={
+                    'parent_job_id': parent_job.id,
+                    'chain_index': idx,
+                    'chain_rule': chain_rule,
+                    'chain_fanout': True,
+                    'wait_for_parent': (parent_job.config or {}).get('chain_fanout_wait', True) is not False,
+                    'transfer_mode': 'batch',
+                    'file_manifest': manifest
+                }
+            )
+            chain_job = Job(
+                id=str(uuid.uuid4()),
+                **chain_job_data.model_dump(),
+                parent_job_id=parent_job.id,
+                status=JobStatus.PENDING,
+                created_at=created_at
+            )
+            db.add(chain_job)
+            created_jobs.append(chain_job)
+        
+        await db.commit()
+        logger.info(
+            f"Created {len(created_jobs)} fan-out chain jobs for {len(manifest)} files "
+            f"(parent job {parent_job.id})"
+        )
+        return created_jobs
+    
     @staticmethod
     async def _create_per_file_chain_jobs(
         parent_job: Job,
@@ -0,0 +1,177 @@
+"""
+Adaptive (AIMD) concurrency per endpoint.
+
+An endpoint's max_concurrent_transfers is a ceiling, not always the best
+setting: a throttling S3 bucket or a saturated NAS gets slower, not faster,
+with more parallel transfers. Each finished transfer nudges the endpoint's
+limit up by 1/limit (about +1 per round of transfers) until it reaches the
+ceiling; an error that looks like rate limiting, AIMD_ERROR_THRESHOLD
+other errors in a row, or per-stream throughput falling well below its
+moving average, cuts it by AIMD_DECREASE_FACTOR.
+The state lives in Redis so all workers share one limit per endpoint.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import math
+import re
+
+from app.core.config import settings
+from app.services.redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+# Error text that means the endpoint is rate limiting us rather than the transfer being broken.
+# Status codes only count next to "status"/"HTTP"/"error", so file names and
+# byte counts containing 429 or 503 don't; rclone flags like --timeout don't either.
+# Resets and timeouts are left out: they come from any network fault and
+# count as plain errors.
+THROTTLE_PATTERN = re.compile(
+    r"\bslow ?down\b|\bthrottl(?:ed|ing)\b|too many requests|\brate limit|rate exceeded|requestlimitexceeded"
+    r"|service unavailable|\b(?:status(?: ?code)?|http(?: error)?|error)[ :=]*(?:429|503)\b",
+    re.IGNORECASE
+)
+
+# rclone wording that shows which side of a copy an error came from
+SOURCE_ERROR_PATTERN = re.compile(r"\bsource\b|failed to open|error reading", re.IGNORECASE)
+DESTINATION_ERROR_PATTERN = re.compile(
+    r"\bdestination\b|failed to upload|multipart upload|failed to (?:make|create) directory", re.IGNORECASE
+)
+
+# Weight of the newest sample in the per-stream throughput average
+RATE_WEIGHT = 0.2
+
+
+class ConcurrencyController:
+    """Keeps an AIMD concurrency limit per endpoint below its configured ceiling"""
+
+    @staticmethod
+    def classify_error(error: Optional[str]) -> str:
+        """'throttled' for errors caused by load on the endpoint, otherwise 'error'"""
+        return 'throttled' if THROTTLE_PATTERN.search(error or '') else 'error'
+
+    @staticmethod
+    def error_endpoints(error: Optional[str], source: Dict[str, str], destination: Dict[str, str]) -> List[str]:
+        """The endpoints an error shows it came from, or [] when it doesn't say
+
+        source and destination map each side's endpoint ID to the prefix of
+        its rclone remote name. An error naming just one side's remote, or
+        using rclone's wording for reading or writing, is put down to that
+        side.
+        """
+        message = error or ''
+        named = [
+            side for side in (source, destination)
+            if any(prefix in message for prefix in side.values())
+        ]
+        if len(named) == 1:
+            return list(named[0])
+        from_source = bool(SOURCE_ERROR_PATTERN.search(message))
+        if from_source != bool(DESTINATION_ERROR_PATTERN.search(message)):
+            return list(source if from_source else destination)
+        return []
+
+    @staticmethod
+    def effective_limit(ceiling: int, state: Optional[Dict[str, str]]) -> int:
+        """The whole number of slots an endpoint may use, never above its ceiling"""
+        if not state or 'limit' not in state:
+            initial = settings.AIMD_INITIAL_LIMIT
+            return min(ceiling, initial) if initial > 0 else ceiling
+        return min(ceiling, max(1, math.floor(float(state['limit']))))
+
+    async def effective_limits(self, ceilings: Dict[str, int]) -> Dict[str, int]:
+        """Current limits for endpoints, falling back to the ceilings if Redis has no answer"""
+        if not settings.ADAPTIVE_CONCURRENCY:
+            return ceilings
+        try:
+            states = await redis_manager.get_endpoint_concurrency(list(ceilings))
+        except Exception as e:
+            logger.warning(f"Adaptive concurrency state unavailable, using configured limits: {e}")
+            return ceilings
+        return {
+            endpoint_id: self.effective_limit(ceiling, states.get(endpoint_id))
+            for endpoint_id, ceiling in ceilings.items()
+        }
+
+    async def record_success(self, ceilings: Dict[str, int], bytes_transferred: int,
+                             seconds: float, streams: int = 1, measure: bool = True,
+                             rate_endpoint_ids: Optional[Iterable[str]] = None):
+        """Count a finished transfer toward raising the limits
+
+        Every endpoint gets the increase, but the throughput sample only goes
+        to rate_endpoint_ids (default: all), the side that limited the
+        transfer's speed, so a fast endpoint isn't judged by a slow partner.
+        Throughput is only compared when the transfer moved at least
+        AIMD_MIN_SAMPLE_BYTES, so small files (dominated by per-file
+        overhead) don't read as a slowdown. Server-side copies pass
+        measure=False since their speed says nothing about load.
+        """
+        rate = None
+        if measure and seconds > 0 and bytes_transferred >= settings.AIMD_MIN_SAMPLE_BYTES:
+            rate = bytes_transferred / seconds / max(1, streams)
+        if rate is None or rate_endpoint_ids is None:
+            await self._record(ceilings, 'ok', rate)
+            return
+        rate_endpoint_ids = set(rate_endpoint_ids)
+        measured = {endpoint_id: c for endpoint_id, c in ceilings.items() if endpoint_id in rate_endpoint_ids}
+        unmeasured = {endpoint_id: c for endpoint_id, c in ceilings.items() if endpoint_id not in rate_endpoint_ids}
+        await self._record(measured, 'ok', rate)
+        await self._record(unmeasured, 'ok', None)
+
+    async def record_failure(self, ceilings: Dict[str, int], error: Optional[str]):
+        """Count a failed transfer toward lowering the limits
+
+        Rate limiting lowers them straight away; other errors only after
+        AIMD_ERROR_THRESHOLD of them in a row, so one bad file doesn't.
+        """
+        await self._record(ceilings, self.classify_error(error), None)
+
+    async def _record(self, ceilings: Dict[str, int], outcome: str, rate: Optional[float]):
+        if not settings.ADAPTIVE_CONCURRENCY or not ceilings:
+            return
+        try:
+            limits = await redis_manager.update_endpoint_concurrency(
+                ceilings, outcome, rate,
+                initial=settings.AIMD_INITIAL_LIMIT,
+                factor=settings.AIMD_DECREASE_FACTOR,
+                cooldown=settings.AIMD_DECREASE_COOLDOWN,
+                drop=settings.AIMD_THROUGHPUT_DROP,
+                weight=RATE_WEIGHT,
+                error_threshold=settings.AIMD_ERROR_THRESHOLD
+            )
+        except Exception as e:
+            # Never fail a transfer over bookkeeping
+            logger.warning(f"Could not update adaptive concurrency for endpoints {list(ceilings)}: {e}")
+            return
+        if outcome != 'ok':
+            logger.info(f"Adaptive concurrency after {outcome} transfer: {limits}")
+
+    async def get_state(self, endpoint_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """Raw controller state per endpoint (limit, rate, last decision)"""
+        return await redis_manager.get_endpoint_concurrency(list(endpoint_ids))
+
+    async def describe(self, endpoint_id: str, ceiling: int) -> Dict[str, Any]:
+        """An endpoint's limit, slot usage and the controller's last decision"""
+        state = (await self.get_state([endpoint_id])).get(endpoint_id) or {}
+        decided_at = state.get('decided_at')
+        return {
+            'endpoint_id': endpoint_id,
+            'adaptive': settings.ADAPTIVE_CONCURRENCY,
+            'ceiling': ceiling,
+            'limit': self.effective_limit(ceiling, state) if settings.ADAPTIVE_CONCURRENCY else ceiling,
+            'active': await redis_manager.get_endpoint_slot_count(endpoint_id),
+            'waiting': await redis_manager.get_endpoint_waiter_count(endpoint_id),
+            'stream_rate': float(state['rate']) if float(state.get('rate') or 0) > 0 else None,
+            'last_decision': state.get('decision'),
+            'last_reason': state.get('reason'),
+            'decided_at': datetime.fromtimestamp(float(decided_at), timezone.utc) if decided_at else None,
+        }
+
+    async def reset(self, endpoint_id: str):
+        """Forget an endpoint's learned limit so it starts over"""
+        await redis_manager.reset_endpoint_concurrency(endpoint_id)
+        logger.info(f"Reset adaptive concurrency for endpoint {endpoint_id}")
+
+
+# Global instance
+concurrency_controller = ConcurrencyController()
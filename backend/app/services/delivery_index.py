@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models.delivered_file import DeliveredFile
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryIndex:
+    """
+    Files known to be at a destination, shared by every job.
+    
+    find_delivered() picks out files whose destination path already holds
+    the same version (same size and hash, or the same source modification
+    time when there is no hash), so they can be completed without copying.
+    Files dispatched for transfer are remembered with file_dispatched(),
+    staged once they arrive with file_transferred() and written with flush().
+    The destination itself is not checked, so a file deleted there since its
+    delivery is skipped too; dedup is therefore off unless DEDUP_MAX_AGE_HOURS
+    is set.
+    """
+    
+    # Staged entries at which callers should flush
+    FLUSH_SIZE = 500
+    
+    def __init__(self, destination_endpoint_id: str, check: bool = True):
+        self.destination_endpoint_id = destination_endpoint_id
+        # False records deliveries without skipping anything (force_copy)
+        self.check = check
+        self.skipped = 0
+        # Source file path -> (destination path, listed file) for files being transferred
+        self._pending: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._staged: Dict[str, Dict[str, Any]] = {}
+    
+    @classmethod
+    def for_job(cls, job: Job) -> Optional['DeliveryIndex']:
+        """The index for a job's destination, None when DEDUP_MAX_AGE_HOURS is 0
+        
+        Jobs with config "force_copy" always copy. Move jobs do too, since a
+        skipped file would never be deleted from the source.
+        """
+        if settings.DEDUP_MAX_AGE_HOURS <= 0:
+            return None
+        check = not (job.config or {}).get('force_copy') and not job.delete_source_after_transfer
+        return cls(job.destination_endpoint_id, check=check)
+    
+    @staticmethod
+    def fingerprint(file_info: Dict[str, Any]) -> Optional[str]:
+        """What identifies a listed file's version besides its size"""
+        # Chain manifests pass on the fingerprint the parent listed
+        if file_info.get('fingerprint'):
+            return file_info['fingerprint']
+        if file_info.get('hash'):
+            return file_info['hash']
+        if file_info.get('mod_time'):
+            return f"mtime:{file_info['mod_time']}"
+        return None
+    
+    async def find_delivered(self, db, files: List[Tuple[str, Dict[str, Any]]]) -> Set[str]:
+        """Destination paths, of the (destination path, listed file) pairs given, that already hold that version"""
+        if not self.check or not files:
+            return set()
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.DEDUP_MAX_AGE_HOURS)
+        result = await db.execute(
+            select(
+                DeliveredFile.destination_path,
+                DeliveredFile.size,
+                DeliveredFile.fingerprint
+            ).where(
+                DeliveredFile.destination_endpoint_id == self.destination_endpoint_id,
+                DeliveredFile.destination_path.in_([destination_path for destination_path, _ in files]),
+                DeliveredFile.delivered_at >= cutoff
+            )
+        )
+        known = {row.destination_path: row for row in result}
+        
+        delivered = set()
+        for destination_path, file_info in files:
+            entry = known.get(destination_path)
+            fingerprint = self.fingerprint(file_info)
+            if entry and fingerprint and entry.size == file_info['size'] and entry.fingerprint == fingerprint:
+                delivered.add(destination_path)
+        self.skipped += len(delivered)
+        return delivered
+    
+    def file_dispatched(self, file_path: str, destination_path: str, file_info: Dict[str, Any]):
+        """Remember where a file is being transferred to, to record it once it arrives"""
+        if self.fingerprint(file_info):
+            self._pending[file_path] = (destination_path, file_info)
+    
+    def file_transferred(self, file_path: str, transfer_id: Optional[str] = None) -> int:
+        """Stage a delivered file; returns how many are staged"""
+        pending = self._pending.pop(file_path, None)
+        if pending:
+            destination_path, file_info = pending
+            self._staged[destination_path] = {
+                'destination_endpoint_id': self.destination_endpoint_id,
+                'destination_path': destination_path,
+                'size': file_info['size'],
+                'fingerprint': self.fingerprint(file_info),
+                'transfer_id': transfer_id,
+            }
+        return len(self._staged)
+    
+    def file_failed(self, file_path: str):
+        """Forget a file that didn't transfer"""
+        self._pending.pop(file_path, None)
+    
+    async def flush(self, db):
+        """Upsert staged deliveries (the caller commits)"""
+        if not self._staged:
+            return
+        entries = list(self._staged.values())
+        self._staged = {}
+        stmt = insert(DeliveredFile).values(entries)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DeliveredFile.destination_endpoint_id, DeliveredFile.destination_path],
+            set_={
+                'size': stmt.excluded.size,
+                'fingerprint': stmt.excluded.fingerprint,
+                'transfer_id': stmt.excluded.transfer_id,
+                'delivered_at': func.now(),
+            }
+        )
+        await db.execute(stmt)
+        logger.info(f"Recorded {len(entries)} delivered files for endpoint {self.destination_endpoint_id}")
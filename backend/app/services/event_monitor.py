@@ -16,6 +16,7 @@ from app.models.transfer_template import TransferTemplate, EventType
 from app.models.job import Job, JobType, JobStatus
 from app.schemas.job import JobCreate
 from app.services.redis_manager import RedisManager
+from app.services.stats_counters import stats_counters
 # from app.services.chain_job_service import ChainJobService  # PHASE 3: Now handled by worker
 
 logger = logging.getLogger(__name__)
@@ -147,7 +148,7 @@ class EventMonitor(ABC):
             await self.redis_manager.enqueue_job(job.id)
             
             # Update template statistics
-            template.total_triggers += 1
+            await stats_counters.record_template(template.id, total_triggers=1)
             template.last_triggered = datetime.now(timezone.utc)
             await db.commit()
             
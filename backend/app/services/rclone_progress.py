@@ -0,0 +1,182 @@
+"""
+Streaming parser for rclone's JSON log output.
+
+Run rclone with `--use-json-log --stats 1s -v` and feed the process to
+RcloneOutputStream to get typed events as they happen: overall progress
+once per stats interval, one event per finished file, errors, and the
+address of the process's rc server when it was started with one.
+"""
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Union
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TransferProgress:
+    """Overall progress from one rclone stats line"""
+    bytes: int
+    total_bytes: int
+    speed: float  # bytes/sec
+    eta: Optional[float]  # seconds, None while rclone can't estimate it
+    transfers: int
+    total_transfers: int
+    errors: int
+    elapsed: float
+
+    @classmethod
+    def from_stats(cls, stats: dict) -> 'TransferProgress':
+        """Build from an rclone stats block (JSON log `stats` or RC core/stats)"""
+        return cls(
+            bytes=stats.get('bytes') or 0,
+            total_bytes=stats.get('totalBytes') or 0,
+            speed=stats.get('speed') or 0.0,
+            eta=stats.get('eta'),
+            transfers=stats.get('transfers') or 0,
+            total_transfers=stats.get('totalTransfers') or 0,
+            errors=stats.get('errors') or 0,
+            elapsed=stats.get('elapsedTime') or 0.0
+        )
+
+    @property
+    def percentage(self) -> float:
+        if not self.total_bytes:
+            return 0.0
+        return min(100.0, self.bytes * 100.0 / self.total_bytes)
+
+
+@dataclass
+class FileCompleted:
+    """A file rclone finished copying (or moving)"""
+    path: str
+    message: str
+    size: Optional[int] = None
+
+
+@dataclass
+class TransferError:
+    """An error rclone logged, with the file it concerns if any"""
+    message: str
+    path: Optional[str] = None
+
+
+@dataclass
+class RcServing:
+    """The process's rc server is listening (with --rc-addr port 0, on the port it picked)"""
+    port: int
+
+
+RcloneEvent = Union[TransferProgress, FileCompleted, TransferError, RcServing]
+
+ERROR_LEVELS = ('error', 'critical')
+COMPLETED_PREFIXES = ('Copied', 'Moved', 'Multi-thread Copied')
+# "Serving remote control on http://127.0.0.1:41234/" (older rclone puts the URLs in brackets)
+RC_SERVING_PATTERN = re.compile(r"^Serving remote control on \[?https?://[^\s\]]*:(\d+)")
+
+
+def parse_log_line(line: str) -> Optional[RcloneEvent]:
+    """Parse one line of rclone --use-json-log output
+
+    Returns None for lines that carry no event (other log messages, or lines
+    that aren't JSON).
+    """
+    line = line.strip()
+    if not line.startswith('{'):
+        return None
+    try:
+        entry = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+    stats = entry.get('stats')
+    if isinstance(stats, dict):
+        return TransferProgress.from_stats(stats)
+
+    message = (entry.get('msg') or '').strip()
+    if entry.get('level') in ERROR_LEVELS:
+        return TransferError(message=message, path=entry.get('object'))
+    serving = RC_SERVING_PATTERN.match(message)
+    if serving:
+        return RcServing(port=int(serving.group(1)))
+    if entry.get('object') and message.startswith(COMPLETED_PREFIXES):
+        return FileCompleted(path=entry['object'], message=message, size=entry.get('size'))
+    return None
+
+
+class RcloneOutputStream:
+    """
+    Reads stdout and stderr of an rclone process concurrently and yields
+    parsed events in arrival order.
+
+    Buffering is bounded: at most max_pending events wait to be consumed.
+    When the buffer is full, progress events are dropped (a fresher one
+    follows within a stats interval); file and error events apply
+    backpressure instead, so none are lost. The last tail_lines error
+    messages and non-JSON lines are kept for error reporting.
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process, max_pending: int = 100, tail_lines: int = 10):
+        self.process = process
+        self.error_tail = deque(maxlen=tail_lines)
+        self.dropped_progress = 0
+        self._events: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        pipes = [pipe for pipe in (self.process.stdout, self.process.stderr) if pipe is not None]
+        readers = [asyncio.create_task(self._read_pipe(pipe)) for pipe in pipes]
+        open_pipes = len(readers)
+        try:
+            while open_pipes:
+                event = await self._events.get()
+                if event is None:
+                    open_pipes -= 1
+                    continue
+                yield event
+        finally:
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+
+    async def _read_pipe(self, pipe: asyncio.StreamReader):
+        try:
+            while True:
+                try:
+                    raw_line = await pipe.readline()
+                except ValueError as e:
+                    # A line over the StreamReader limit was discarded; keep reading
+                    logger.warning(f"Skipping unreadable rclone output: {e}")
+                    continue
+                if not raw_line:
+                    break
+                line = raw_line.decode(errors='replace').strip()
+                if not line:
+                    continue
+                event = parse_log_line(line)
+                if event is None:
+                    if not line.startswith('{'):
+                        self.error_tail.append(line)
+                    continue
+                if isinstance(event, TransferError):
+                    self.error_tail.append(event.message)
+                if isinstance(event, TransferProgress) and self._events.full():
+                    self.dropped_progress += 1
+                    continue
+                await self._events.put(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reading rclone output: {e}")
+        # End of this pipe
+        await self._events.put(None)
+
+    def error_summary(self) -> str:
+        """The last error lines rclone printed, for failure messages"""
+        return '\n'.join(self.error_tail)
@@ -1,17 +1,38 @@
 import httpx
 import asyncio
+import hashlib
+import hmac
 import json
 import tempfile
 import os
-from typing import Dict, Any, Optional, List
+import shutil
+import uuid
+from collections import deque
+from typing import AsyncIterator, Dict, Any, Optional, List, Set, Tuple
 from datetime import datetime
 import logging
 
 from app.core.config import settings
+from app.services.redis_manager import redis_manager
 
 logger = logging.getLogger(__name__)
 
 
+# Default --transfers/--checkers for batch transfers per endpoint type.
+# Remote protocols with expensive handshakes benefit most from a few parallel
+# streams over one connection pool; object stores handle much higher fan-out.
+BATCH_TUNING_DEFAULTS = {
+    'local': {'transfers': 8, 'checkers': 8},
+    'smb': {'transfers': 4, 'checkers': 8},
+    'sftp': {'transfers': 4, 'checkers': 8},
+    's3': {'transfers': 16, 'checkers': 16},
+    'default': {'transfers': 4, 'checkers': 8},
+}
+
+# StreamReader line limit for lsjson output (one file entry per line)
+LSJSON_LINE_LIMIT = 1024 * 1024
+
+
 class RcloneService:
     """Wrapper for Rclone RC (Remote Control) API and CLI"""
     
@@ -24,47 +45,213 @@ class RcloneService:
         # Store temporary config file path
         self.config_file = None
         self.remotes_config = {}
+        # sha256 of the config file content last written
+        self._config_hash: Optional[str] = None
+        # Serializes config file updates from concurrent transfers
+        self._config_lock = asyncio.Lock()
+        # Remote name -> IDs of the jobs using it; replaced versions go once unused
+        self._remote_users: Dict[str, Set[str]] = {}
     
-    async def _request(self, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Make a request to the Rclone RC API"""
-        async with httpx.AsyncClient() as client:
-            try:
+    # One pooled keep-alive client per process, shared by every RcloneService
+    _http_client: Optional[httpx.AsyncClient] = None
+    _request_slots: Optional[asyncio.Semaphore] = None
+    
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        """The shared RC API client, created on first use"""
+        if cls._http_client is None or cls._http_client.is_closed:
+            cls._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.RCLONE_RC_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.RCLONE_RC_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.RCLONE_RC_KEEPALIVE_EXPIRY
+                ),
+                timeout=settings.RCLONE_RC_TIMEOUT
+            )
+            cls._request_slots = asyncio.Semaphore(settings.RCLONE_RC_MAX_CONNECTIONS)
+        return cls._http_client
+    
+    @classmethod
+    async def close_http_client(cls):
+        """Close the shared RC API client (call on shutdown)"""
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
+            cls._request_slots = None
+    
+    async def _request(self, endpoint: str, data: Optional[Dict[str, Any]] = None,
+                       timeout: Optional[float] = None, base_url: Optional[str] = None) -> Dict[str, Any]:
+        """Make a request to the Rclone RC API
+        
+        Requests share one pooled client; at most RCLONE_RC_MAX_CONNECTIONS
+        are in flight at once. timeout overrides RCLONE_RC_TIMEOUT for this call.
+        """
+        client = self._get_http_client()
+        try:
+            async with self._request_slots:
                 response = await client.post(
-                    f"{self.base_url}/{endpoint}",
+                    f"{base_url or self.base_url}/{endpoint}",
                     json=data or {},
-                    auth=self.auth,
-                    timeout=30.0
+                    auth=self.auth if base_url is None else None,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
                 )
-                response.raise_for_status()
-                return response.json()
-            except httpx.RequestError as e:
-                logger.error(f"Rclone RC request failed: {e}")
-                raise Exception(f"Failed to connect to Rclone: {str(e)}")
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Rclone RC HTTP error: {e}")
-                raise Exception(f"Rclone error: {str(e)}")
-    
-    async def configure_remote(self, name: str, config: Dict[str, Any]):
-        """Configure a remote for use with rclone"""
-        logger.info(f"configure_remote called for {name} with config: {config}")
-        # Store config for later use
-        self.remotes_config[name] = config
-        
-        # Create/update config file
-        await self._update_config_file()
+            response.raise_for_status()
+            return response.json()
+        except httpx.RequestError as e:
+            logger.error(f"Rclone RC request failed: {e}")
+            raise Exception(f"Failed to connect to Rclone: {str(e)}")
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Rclone RC HTTP error: {e}")
+            raise Exception(f"Rclone error: {str(e)}")
+    
+    async def rc_batch(self, calls: List[Tuple[str, Dict[str, Any]]],
+                       timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Run several RC calls in one job/batch request
+        
+        Returns one result per call, in order. A call that failed comes back
+        as a dict with an "error" key instead of raising.
+        """
+        inputs = [{"_path": path, **params} for path, params in calls]
+        result = await self._request("job/batch", {"inputs": inputs}, timeout=timeout)
+        return result.get("results", [])
+    
+    @staticmethod
+    def remote_name_for(endpoint_id: str, config: Dict[str, Any]) -> str:
+        """Remote name for one version of an endpoint's config
+        
+        Editing the endpoint yields a new name, so a registered remote never
+        changes under transfers that are using it. The version is an HMAC
+        keyed by SECRET_KEY: the name shows up in logs and on rclone command
+        lines, and a plain hash of the config would let anyone test guesses
+        at its credentials.
+        """
+        content = json.dumps(config, sort_keys=True, default=str).encode()
+        version = hmac.new(settings.SECRET_KEY.encode(), content, hashlib.sha256).hexdigest()
+        return f"{RcloneService.remote_name_prefix(endpoint_id)}{version[:12]}"
+    
+    @staticmethod
+    def remote_name_prefix(endpoint_id: str) -> str:
+        """What every version of an endpoint's remote name starts with"""
+        return f"endpoint-{endpoint_id}-"
+    
+    @staticmethod
+    def _version_prefix(name: str) -> Optional[str]:
+        """The part of an endpoint remote's name shared by all its config versions"""
+        if not name.startswith("endpoint-"):
+            return None
+        return f"{name.rsplit('-', 1)[0]}-"
+    
+    def _replaced_remotes(self) -> List[str]:
+        """Remotes that a later-registered version of the same endpoint replaced and no job uses"""
+        replaced = []
+        newest: Dict[str, str] = {}
+        # remotes_config is in registration order
+        for name in reversed(list(self.remotes_config)):
+            prefix = self._version_prefix(name)
+            if prefix is None:
+                continue
+            if prefix in newest and not self._remote_users.get(name):
+                replaced.append(name)
+            newest.setdefault(prefix, name)
+        return replaced
+    
+    def _drop_replaced_remotes(self) -> bool:
+        """Forget replaced, unused remotes; returns whether any went"""
+        replaced = self._replaced_remotes()
+        for name in replaced:
+            logger.info(f"Removing remote {name}, replaced by a newer config version")
+            del self.remotes_config[name]
+        return bool(replaced)
+    
+    async def configure_remote(self, name: str, config: Dict[str, Any], user: Optional[str] = None):
+        """Configure a remote for use with rclone
+        
+        user (a job ID) keeps the remote configured until release_remotes is
+        called for it, even after a newer version of the endpoint's config
+        is registered.
+        
+        Raises if an SMB password can't be obscured: rclone rejects plain
+        text passwords, and they must never end up in the config file.
+        """
+        async with self._config_lock:
+            if user:
+                self._remote_users.setdefault(name, set()).add(user)
+            if self.remotes_config.get(name) == config:
+                # Already registered (the usual case: once per file)
+                return
+            logger.info(f"Configuring remote {name} (type {config.get('type')})")
+            password = config.get('password', config.get('pass', '')) if config.get('type') == 'smb' else None
+            if password:
+                try:
+                    # Cached, so writing the config file below can't fail on it
+                    await self.obscure(password)
+                except Exception as e:
+                    raise Exception(f"Cannot configure SMB remote {name}: password could not be obscured ({e})") from e
+            # Store config for later use; older versions of the endpoint's remote
+            # go once no job uses them
+            self.remotes_config[name] = config
+            self._drop_replaced_remotes()
+            
+            # Create/update config file
+            await self._update_config_file()
+    
+    async def release_remotes(self, user: str):
+        """Stop keeping remotes configured for a job, dropping replaced versions it held"""
+        async with self._config_lock:
+            for name in list(self._remote_users):
+                self._remote_users[name].discard(user)
+                if not self._remote_users[name]:
+                    del self._remote_users[name]
+            if self._drop_replaced_remotes():
+                await self._update_config_file()
+    
+    # rclone obscure output per secret, shared by every RcloneService in the process
+    _obscured_secrets: Dict[str, str] = {}
+    
+    @classmethod
+    async def obscure(cls, secret: str) -> str:
+        """Obscure a secret for an rclone config file, running `rclone obscure` once per secret"""
+        if secret in cls._obscured_secrets:
+            return cls._obscured_secrets[secret]
+        obscure_process = await asyncio.create_subprocess_exec(
+            "rclone", "obscure", secret,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await obscure_process.communicate()
+        if obscure_process.returncode != 0:
+            raise Exception(f"rclone obscure failed: {stderr.decode()}")
+        cls._obscured_secrets[secret] = stdout.decode().strip()
+        return cls._obscured_secrets[secret]
     
     async def _update_config_file(self):
-        """Update the rclone config file with current remotes"""
+        """Update the rclone config file with current remotes
+        
+        The file is only rewritten when its content changes.
+        """
+        config_content = await self._render_config()
+        content_hash = hashlib.sha256(config_content.encode()).hexdigest()
+        if content_hash == self._config_hash and self.config_file and os.path.exists(self.config_file):
+            return
+        
         if not self.config_file:
             # Create temporary config file
             fd, self.config_file = tempfile.mkstemp(suffix='.conf', prefix='rclone_')
             os.close(fd)
         
-        # Build config content
+        # Write config file atomically - transfers running in parallel may be
+        # starting rclone against it while we rewrite it
+        tmp_file = f"{self.config_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(config_content)
+        os.replace(tmp_file, self.config_file)
+        self._config_hash = content_hash
+        logger.info(f"Wrote rclone config with {len(self.remotes_config)} remotes: {list(self.remotes_config.keys())}")
+    
+    async def _render_config(self) -> str:
+        """Build the rclone config file content for the current remotes"""
         config_content = ""
-        logger.info(f"Updating config file with {len(self.remotes_config)} remotes: {list(self.remotes_config.keys())}")
         for name, config in self.remotes_config.items():
-            logger.info(f"Processing remote {name} with type {config.get('type')}")
             if config['type'] == 'local':
                 # Local doesn't need a section in config
                 continue
@@ -83,28 +270,8 @@ class RcloneService:
                 config_content += f"user = {config.get('user', '')}\n"
                 # Obscure password using rclone's method as the documentation requires
                 password = config.get('password', config.get('pass', ''))
-                logger.info(f"Processing SMB password for endpoint {config.get('name')}: {password[:3]}...{password[-3:]} (length: {len(password)})")
                 if password:
-                    # Use rclone obscure command to properly encode the password
-                    try:
-                        obscure_process = await asyncio.create_subprocess_exec(
-                            "rclone", "obscure", password,
-                            stdout=asyncio.subprocess.PIPE,
-                            stderr=asyncio.subprocess.PIPE
-                        )
-                        stdout, stderr = await obscure_process.communicate()
-                        if obscure_process.returncode == 0:
-                            obscured_password = stdout.decode().strip()
-                            logger.info(f"Raw password input: '{password}'")
-                            logger.info(f"Full obscured output: '{obscured_password}'")
-                            logger.info(f"Successfully obscured password: {obscured_password[:10]}...")
-                            config_content += f"pass = {obscured_password}\n"
-                        else:
-                            logger.error(f"Failed to obscure password: {stderr.decode()}")
-                            config_content += f"pass = {password}\n"  # Fallback to plain text
-                    except Exception as e:
-                        logger.error(f"Error running rclone obscure: {e}")
-                        config_content += f"pass = {password}\n"  # Fallback to plain text
+                    config_content += f"pass = {await self.obscure(password)}\n"
                 else:
                     config_content += "pass = \n"
                 config_content += f"domain = {config.get('domain', 'WORKGROUP')}\n"
@@ -131,13 +298,21 @@ class RcloneService:
                     config_content += f"known_hosts_file = {config.get('known_hosts_file', '')}\n"
             
             config_content += "\n"
-        
-        # Write config file
-        with open(self.config_file, 'w') as f:
-            f.write(config_content)
+        return config_content
     
     async def list_files(self, remote_name: str, path: str, pattern: str = "*") -> List[Dict[str, Any]]:
         """List files in a directory"""
+        return [entry async for entry in self.iter_files(remote_name, path, pattern)]
+    
+    async def iter_files(self, remote_name: str, path: str, pattern: str = "*",
+                         hashes: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """List files in a directory, yielding each one as rclone lsjson prints it
+        
+        lsjson writes one entry per line, so entries are parsed as they arrive
+        and memory use doesn't depend on the size of the directory. Closing
+        the iterator early stops the listing. hashes adds each file's hash,
+        which some backends (local, SMB) have to read the whole file for.
+        """
         full_path = self._build_path(remote_name, path)
         cmd = [
             "rclone", "lsjson",
@@ -145,48 +320,73 @@ class RcloneService:
             "--include", pattern,
             full_path
         ]
+        if hashes:
+            cmd.insert(2, "--hash")
         
         logger.info(f"Listing files: {' '.join(cmd)}")
-        logger.info(f"Full path: {full_path}")
         
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=LSJSON_LINE_LIMIT
+        )
+        # stderr is drained alongside stdout so rclone never blocks on it
+        stderr_tail = deque(maxlen=20)
+        
+        async def drain_stderr():
+            async for raw_line in process.stderr:
+                stderr_tail.append(raw_line.decode(errors='replace').strip())
+        
+        stderr_task = asyncio.create_task(drain_stderr())
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
+            async for raw_line in process.stdout:
+                line = raw_line.decode(errors='replace').strip().rstrip(',')
+                if not line.startswith('{'):
+                    # The enclosing "[" and "]"
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.error(f"Failed to parse rclone lsjson entry: {line[:200]}")
+                    continue
+                if not entry.get('IsDir', False):  # Only return files, not directories
+                    yield self._to_file_entry(entry)
             
+            await process.wait()
+            await stderr_task
             if process.returncode != 0:
-                error_msg = stderr.decode().strip()
-                logger.error(f"Rclone list failed: {error_msg}")
+                error_msg = '\n'.join(stderr_tail)
+                logger.error(f"Rclone list failed for {full_path}: {error_msg}")
                 raise Exception(f"Rclone list failed: {error_msg}")
-            
-            # Handle empty output
-            if not stdout:
-                logger.warning(f"No output from rclone list for path: {full_path}")
-                return []
-            
-            files = json.loads(stdout.decode())
-            # Transform to expected format
-            return [
-                {
-                    'name': f['Name'],
-                    'path': f.get('Path', f['Name']),  # Use Name if Path not present
-                    'size': f.get('Size', 0),
-                    'is_dir': f.get('IsDir', False)
-                }
-                for f in files
-                if not f.get('IsDir', False)  # Only return files, not directories
-            ]
-            
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse rclone output: {stdout.decode()[:200]}...")
-            return []
-        except Exception as e:
-            logger.error(f"Failed to list files at {full_path}: {e}")
-            raise
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr_task.cancel()
+    
+    @staticmethod
+    def _to_file_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Transform one lsjson / operations/list entry to the expected format"""
+        file_hashes = entry.get('Hashes') or {}
+        hash_type = min(file_hashes) if file_hashes else None
+        return {
+            'name': entry['Name'],
+            'path': entry.get('Path', entry['Name']),  # Use Name if Path not present
+            'size': entry.get('Size', 0),
+            'is_dir': entry.get('IsDir', False),
+            'mod_time': entry.get('ModTime'),
+            'hash': f"{hash_type}:{file_hashes[hash_type]}" if hash_type else None
+        }
+    
+    @staticmethod
+    def _to_file_list(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Transform lsjson / operations/list entries to the expected format"""
+        return [
+            RcloneService._to_file_entry(f)
+            for f in entries
+            if not f.get('IsDir', False)  # Only return files, not directories
+        ]
     
     def _build_path(self, remote_name: str, path: str) -> str:
         """Build the path for rclone command"""
@@ -233,14 +433,55 @@ class RcloneService:
             # For other remotes, use remote:path format
             return f"{remote_name}:{path}"
     
-    async def start_transfer(self, source: str, dest: str, delete_source: bool = False) -> asyncio.subprocess.Process:
-        """Start a file transfer and return the process handle"""
+    @staticmethod
+    def _bandwidth_args(bwlimit: Optional[int], live_bwlimit: bool) -> List[str]:
+        """rclone flags for a bandwidth limit and, if live_bwlimit, a loopback rc server to change it
+        
+        The rc server binds port 0, so two transfers can never race for a
+        port; rclone logs the port it got (rclone_progress.RcServing).
+        """
+        args = []
+        if bwlimit:
+            args.extend(["--bwlimit", f"{bwlimit}B"])
+        elif hasattr(settings, 'RCLONE_BANDWIDTH_LIMIT'):
+            # Add bandwidth limit if configured
+            args.extend(["--bwlimit", settings.RCLONE_BANDWIDTH_LIMIT])
+        if live_bwlimit:
+            args.extend(["--rc", "--rc-addr", "127.0.0.1:0", "--rc-no-auth"])
+        return args
+    
+    async def set_bandwidth_limit(self, rc_port: int, bytes_per_second: int):
+        """Change the bandwidth limit of a running transfer started with live_bwlimit"""
+        await self._request(
+            "core/bwlimit",
+            {"rate": f"{bytes_per_second}B"},
+            timeout=5.0,
+            base_url=f"http://127.0.0.1:{rc_port}"
+        )
+    
+    async def start_transfer(
+        self,
+        source: str,
+        dest: str,
+        delete_source: bool = False,
+        bwlimit: Optional[int] = None,
+        live_bwlimit: bool = False,
+        server_side: bool = False,
+        tuning_args: Optional[List[str]] = None
+    ) -> asyncio.subprocess.Process:
+        """Start a file transfer and return the process handle
+        
+        bwlimit (bytes/sec) caps the transfer; with live_bwlimit it can be
+        changed while running via set_bandwidth_limit, on the rc port rclone
+        reports in its log. server_side lets rclone copy
+        between two remotes of the same account without downloading the file.
+        tuning_args are extra flags from transfer_tuning (streams, buffers, chunks).
+        """
         cmd = [
             "rclone", "copy",
             "--config", self.config_file,
-            "--progress",
+            "--use-json-log",  # Parsed by rclone_progress.RcloneOutputStream
             "--stats", "1s",
-            "--stats-one-line",  # Easier to parse
             "-v",  # Verbose for better debugging
             "--checksum",  # Enable checksum verification
             # Note: rclone uses temporary files by default (no --inplace flag)
@@ -252,9 +493,10 @@ class RcloneService:
             # Use move instead of copy
             cmd[1] = "move"
         
-        # Add bandwidth limit if configured
-        if hasattr(settings, 'RCLONE_BANDWIDTH_LIMIT'):
-            cmd.extend(["--bwlimit", settings.RCLONE_BANDWIDTH_LIMIT])
+        cmd.extend(self._bandwidth_args(bwlimit, live_bwlimit))
+        if server_side:
+            cmd.append("--server-side-across-configs")
+        cmd.extend(tuning_args or [])
         
         logger.info(f"Starting transfer: {' '.join(cmd)}")
         logger.info(f"Source: {source}")
@@ -268,38 +510,96 @@ class RcloneService:
         
         return process
     
-    async def get_transfer_progress(self, process: asyncio.subprocess.Process) -> Optional[Dict[str, Any]]:
-        """Get progress from a running rclone process"""
+    async def start_batch_transfer(
+        self,
+        source: str,
+        dest: str,
+        files: List[str],
+        transfers: int = 4,
+        checkers: int = 8,
+        delete_source: bool = False,
+        bwlimit: Optional[int] = None,
+        live_bwlimit: bool = False,
+        server_side: bool = False,
+        tuning_args: Optional[List[str]] = None
+    ) -> Tuple[asyncio.subprocess.Process, str]:
+        """Start one rclone copy for many files and return the process and its work directory
+        
+        The files (paths relative to source) are written to a --files-from-raw
+        manifest in a temporary work directory, which also receives rclone's
+        --combined per-file report (see read_batch_report). rclone logs as JSON
+        on stderr so live results can be read with rclone_progress.RcloneOutputStream.
+        bwlimit, live_bwlimit, server_side and tuning_args work as in start_transfer.
+        The caller removes the work directory when done.
+        """
+        work_dir = tempfile.mkdtemp(prefix='rclone_batch_')
+        manifest_file = os.path.join(work_dir, 'files.txt')
+        with open(manifest_file, 'w') as f:
+            for file_path in files:
+                f.write(f"{file_path}\n")
+        
+        cmd = [
+            "rclone", "move" if delete_source else "copy",
+            "--config", self.config_file,
+            "--files-from-raw", manifest_file,
+            "--no-traverse",  # Don't list the destination, only check the listed files
+            "--combined", os.path.join(work_dir, 'combined.txt'),
+            "--transfers", str(transfers),
+            "--checkers", str(checkers),
+            "--use-json-log",
+            "--stats", "1s",
+            "-v",
+            "--checksum",
+            source,
+            dest
+        ]
+        
+        cmd.extend(self._bandwidth_args(bwlimit, live_bwlimit))
+        if server_side:
+            cmd.append("--server-side-across-configs")
+        cmd.extend(tuning_args or [])
+        
+        logger.info(f"Starting batch transfer of {len(files)} files: {' '.join(cmd)}")
+        
         try:
-            # Read a line from stdout (rclone outputs JSON progress)
-            line = await asyncio.wait_for(process.stdout.readline(), timeout=0.1)
-            if not line:
-                return None
-            
-            # Parse JSON progress
-            data = json.loads(line.decode().strip())
-            
-            # Extract progress info
-            stats = data.get('stats', {})
-            return {
-                'bytes': stats.get('bytes', 0),
-                'percentage': stats.get('progress', 0),
-                'rate': stats.get('speed', 0),
-                'eta': stats.get('eta', None)
-            }
-            
-        except asyncio.TimeoutError:
-            return None
-        except json.JSONDecodeError:
-            return None
-        except Exception as e:
-            logger.error(f"Error reading progress: {e}")
-            return None
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        
+        return process, work_dir
+    
+    @staticmethod
+    def read_batch_report(work_dir: str) -> Dict[str, str]:
+        """Read the --combined report of a finished batch transfer
+        
+        Maps each file rclone handled to its status symbol: "=" identical
+        (already at destination), "+" copied new, "*" copied over a changed
+        file, "!" error. Listed files missing from the source don't appear.
+        """
+        report = {}
+        report_file = os.path.join(work_dir, 'combined.txt')
+        if not os.path.exists(report_file):
+            return report
+        with open(report_file) as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if len(line) > 2 and line[1] == ' ':
+                    report[line[2:]] = line[0]
+        return report
     
     async def test_remote_connection(self, name: str, config: Dict[str, Any]) -> bool:
-        """Test if a remote configuration is valid"""
-        # Temporarily configure the remote
-        await self.configure_remote("test", config)
+        """Test if a remote configuration is valid
+        
+        The test remote lives in its own config file, so it never touches the
+        remotes running transfers use.
+        """
+        tester = RcloneService()
+        await tester.configure_remote("test", config)
         
         # Try to list the root directory
         try:
@@ -315,26 +615,191 @@ class RcloneService:
                 # SMB paths need to include the share name
                 share = config.get('share', '')
                 if share:
-                    await self.list_files("test", share, "*")
+                    await tester.list_files("test", share, "*")
                 else:
                     # Try to list available shares
-                    await self.list_files("test", "", "*")
+                    await tester.list_files("test", "", "*")
                 return True
             elif config.get('type') == 'sftp':
                 # For SFTP, try to list home directory
-                await self.list_files("test", ".", "*")
+                await tester.list_files("test", ".", "*")
                 return True
             else:
                 # For other remotes, try to list root
-                await self.list_files("test", "/", "*")
+                await tester.list_files("test", "/", "*")
                 return True
         except Exception as e:
             logger.error(f"Remote test failed: {e}")
             return False
         finally:
-            # Remove test remote
-            self.remotes_config.pop("test", None)
-            await self._update_config_file()
+            tester.remove_config_file()
+    
+    # rcd execution engine: listings and transfers run as jobs in a long-lived
+    # `rclone rcd`, so its connection pools stay warm between transfers.
+    # Remotes live in the rcd, shared by all workers, under the same
+    # per-endpoint-version names as in the local config file.
+    
+    # rcd remotes this process has created
+    _rc_remotes: Set[str] = set()
+    
+    async def configure_rc_remote(self, name: str, config: Dict[str, Any], user: str):
+        """Create the rcd remote for a remote configured with configure_remote
+        
+        The rcd is shared by every worker, so the jobs using each remote are
+        registered in Redis. Once a newer version of an endpoint's config is
+        registered, older versions are deleted as soon as no running job
+        uses them (see release_rc_remotes).
+        """
+        if config['type'] == 'local':
+            # Local paths are used as-is (they must be visible to the rcd)
+            return
+        while (registered := await redis_manager.use_rc_remote(name, user)) < 0:
+            # Another worker is deleting this version; create it again afterwards
+            await asyncio.sleep(0.5)
+        if registered or name not in self._rc_remotes:
+            await self._request("config/create", {
+                "name": name,
+                "type": config['type'],
+                "parameters": self._rc_remote_parameters(config),
+                # rcd obscures the password fields itself
+                "opt": {"obscure": True, "nonInteractive": True}
+            })
+            self._rc_remotes.add(name)
+        if registered:
+            # A new version may have replaced remotes no job is using
+            await self.release_rc_remotes()
+    
+    async def release_rc_remotes(self, user: str = ""):
+        """Stop counting a job as a user of rcd remotes; delete replaced ones left unused"""
+        replaced = await redis_manager.release_rc_remotes(user)
+        for name in replaced:
+            try:
+                await self._request("config/delete", {"name": name})
+                logger.info(f"Deleted rcd remote {name}, replaced by a newer config version")
+            except Exception as e:
+                # Left in the rcd; only costs memory
+                logger.warning(f"Could not delete rcd remote {name}: {e}")
+            self._rc_remotes.discard(name)
+        await redis_manager.finish_rc_remote_deletion(replaced)
+    
+    @staticmethod
+    def _rc_remote_parameters(config: Dict[str, Any]) -> Dict[str, Any]:
+        """rclone backend parameters for a remote config, as written by _update_config_file"""
+        if config['type'] == 's3':
+            return {
+                "provider": "AWS",
+                "access_key_id": config.get('access_key_id', ''),
+                "secret_access_key": config.get('secret_access_key', ''),
+                "region": config.get('region', ''),
+            }
+        if config['type'] == 'smb':
+            parameters = {
+                "host": config.get('host', ''),
+                "user": config.get('user', ''),
+                "pass": config.get('password', config.get('pass', '')),
+                "domain": config.get('domain', 'WORKGROUP'),
+            }
+            if config.get('share'):
+                parameters["share"] = config['share']
+            return parameters
+        if config['type'] == 'sftp':
+            parameters = {
+                "host": config.get('host', ''),
+                "user": config.get('user', ''),
+                "port": str(config.get('port', 22)),
+            }
+            if config.get('key_file'):
+                parameters["key_file"] = config['key_file']
+                if config.get('key_passphrase'):
+                    parameters["key_file_pass"] = config['key_passphrase']
+            else:
+                parameters["pass"] = config.get('pass', '')
+            if config.get('known_hosts_file'):
+                parameters["known_hosts_file"] = config['known_hosts_file']
+            return parameters
+        return {}
+    
+    @staticmethod
+    def _split_file_path(path: str) -> Tuple[str, str]:
+        """Split remote:dir/file into the fs (remote:dir) and the file name"""
+        if '/' in path:
+            fs, file_name = path.rsplit('/', 1)
+            return (fs or '/'), file_name
+        remote, _, file_name = path.rpartition(':')
+        return f"{remote}:", file_name
+    
+    async def rc_list_files(self, remote_name: str, path: str, pattern: str = "*",
+                            hashes: bool = False) -> List[Dict[str, Any]]:
+        """List files in a directory through the rcd (same result as list_files)
+        
+        Runs as an async rcd job polled through rc_job_monitor like transfers,
+        so a large listing isn't cut off by RCLONE_RC_TIMEOUT.
+        """
+        full_path = self._build_path(remote_name, path)
+        logger.info(f"Listing files via rcd: {full_path} ({pattern})")
+        group = f"list/{uuid.uuid4().hex}"
+        result = await self._request("operations/list", {
+            "fs": full_path,
+            "remote": "",
+            "opt": {"filesOnly": True, "showHash": hashes},
+            "_filter": {"IncludeRule": [pattern]},
+            "_async": True,
+            "_group": group
+        })
+        rc_job_id = result['jobid']
+        try:
+            while True:
+                status, _ = await rc_job_monitor.poll(rc_job_id, group)
+                if status.get('finished'):
+                    break
+        except asyncio.CancelledError:
+            await asyncio.shield(self.stop_rc_job(rc_job_id))
+            raise
+        finally:
+            try:
+                await asyncio.shield(self.delete_rc_stats(group))
+            except Exception as e:
+                logger.warning(f"Could not delete rcd stats group {group}: {e}")
+        
+        if not status.get('success'):
+            raise Exception(f"Rclone listing failed: {status.get('error') or 'unknown error'}")
+        return self._to_file_list((status.get('output') or {}).get("list") or [])
+    
+    async def start_rc_transfer(self, source: str, dest: str, group: str, delete_source: bool = False,
+                                server_side: bool = False, rc_config: Optional[Dict[str, Any]] = None) -> int:
+        """Start copying (or moving) one file into the dest directory as an async rcd job
+        
+        Same semantics as start_transfer. Progress is reported under the given
+        stats group (get_rc_stats); returns the rcd job ID.
+        """
+        src_fs, file_name = self._split_file_path(source)
+        result = await self._request("operations/movefile" if delete_source else "operations/copyfile", {
+            "srcFs": src_fs,
+            "srcRemote": file_name,
+            "dstFs": dest,
+            "dstRemote": file_name,
+            "_async": True,
+            "_group": group,
+            "_config": {"CheckSum": True, "ServerSideAcrossConfigs": server_side, **(rc_config or {})}
+        })
+        logger.info(f"Started rcd job {result['jobid']}: {source} -> {dest}")
+        return result["jobid"]
+    
+    async def get_rc_job_status(self, rc_job_id: int) -> Dict[str, Any]:
+        """Get an rcd job's status (finished, success, error, ...)"""
+        return await self._request("job/status", {"jobid": rc_job_id})
+    
+    async def get_rc_stats(self, group: str) -> Dict[str, Any]:
+        """Get transfer stats for one stats group"""
+        return await self._request("core/stats", {"group": group})
+    
+    async def stop_rc_job(self, rc_job_id: int):
+        """Cancel a running rcd job"""
+        await self._request("job/stop", {"jobid": rc_job_id})
+    
+    async def delete_rc_stats(self, group: str):
+        """Drop a finished stats group from the rcd"""
+        await self._request("core/stats-delete", {"group": group})
     
     # Keep existing RC API methods for compatibility
     async def list_remotes(self) -> List[str]:
@@ -387,14 +852,92 @@ class RcloneService:
             logger.error(f"Failed to get transfer stats: {e}")
             return {}
     
-    def __del__(self):
-        """Cleanup temporary config file"""
+    def remove_config_file(self):
+        """Delete this service's temporary config file"""
         if self.config_file and os.path.exists(self.config_file):
             try:
                 os.unlink(self.config_file)
             except Exception:
                 pass
+        self.config_file = None
+        self._config_hash = None
+    
+    def __del__(self):
+        """Cleanup temporary config file"""
+        self.remove_config_file()
+
+
+class RcJobMonitor:
+    """
+    Polls the status and stats of every running rcd job together.
+    
+    Each transfer awaits poll() for its job; once per interval all pending
+    polls go to the rcd as a single job/batch request instead of two
+    requests per transfer. Falls back to concurrent single calls on an rcd
+    without job/batch.
+    """
+    
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._rclone = RcloneService()
+        self._pending: List[Tuple[int, str, asyncio.Future]] = []
+        self._ticker: Optional[asyncio.Task] = None
+        self._batch_supported = True
+    
+    async def poll(self, rc_job_id: int, group: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Wait for the next tick and return the job's (job/status, core/stats)"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((rc_job_id, group, future))
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.create_task(self._tick())
+        return await future
+    
+    async def _tick(self):
+        while self._pending:
+            await asyncio.sleep(self.interval)
+            polls = [poll for poll in self._pending if not poll[2].done()]
+            self._pending = []
+            if not polls:
+                continue
+            try:
+                results = await self._fetch(polls)
+            except Exception as e:
+                for _, _, future in polls:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (rc_job_id, _, future), (status, stats) in zip(polls, results):
+                if future.done():
+                    continue
+                if 'error' in status and 'finished' not in status:
+                    future.set_exception(Exception(f"Rclone error for job {rc_job_id}: {status['error']}"))
+                else:
+                    future.set_result((status, stats if 'error' not in stats else {}))
+    
+    async def _fetch(self, polls) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        calls = []
+        for rc_job_id, group, _ in polls:
+            calls.append(("job/status", {"jobid": rc_job_id}))
+            calls.append(("core/stats", {"group": group}))
+        
+        if self._batch_supported:
+            try:
+                results = await self._rclone.rc_batch(calls)
+                return list(zip(results[::2], results[1::2]))
+            except Exception as e:
+                logger.warning(f"rcd job/batch unavailable, polling jobs individually: {e}")
+                self._batch_supported = False
+        
+        async def single(path, params):
+            try:
+                return await self._rclone._request(path, params)
+            except Exception as e:
+                return {"error": str(e)}
+        
+        results = await asyncio.gather(*(single(path, params) for path, params in calls))
+        return list(zip(results[::2], results[1::2]))
 
 
 # Global instance
-rclone_service = RcloneService()
\ No newline at end of file
+rclone_service = RcloneService()
+rc_job_monitor = RcJobMonitor(settings.RCLONE_RC_POLL_INTERVAL)
\ No newline at end of file
@@ -1,16 +1,414 @@
 import json
-from typing import Optional, List
+import time
+from datetime import datetime
+from typing import Any, Optional, List, Dict
 from redis import asyncio as aioredis
 
 from app.core.config import settings
 
 
+# Move every delayed job whose time has come onto the ready queue and ring the
+# doorbell once per job. Atomic, so any number of workers can run it at once.
+PROMOTE_DELAYED_JOBS_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('ZADD', KEYS[2], 0, job_id)
+    redis.call('LPUSH', KEYS[3], 1)
+end
+if #due > 0 then
+    redis.call('LTRIM', KEYS[3], 0, tonumber(ARGV[3]) - 1)
+end
+return #due
+"""
+
+# Lua helper: forget every endpoint a job is parked on, so a stale parked
+# entry can never put an already claimed job back on the queue.
+# Parked sets are named by endpoint ID (prefix + id), which assumes a single
+# Redis instance rather than a cluster.
+FORGET_PARKED_JOB_LUA = """
+local function forget_parked(parked_hash, parked_prefix, job_id)
+    local endpoint_ids = redis.call('HGET', parked_hash, job_id)
+    if endpoint_ids then
+        for endpoint_id in string.gmatch(endpoint_ids, '[^,]+') do
+            redis.call('ZREM', parked_prefix .. endpoint_id, job_id)
+        end
+        redis.call('HDEL', parked_hash, job_id)
+    end
+end
+"""
+
+# Pop the best ready job and lease it to a worker in one step, so two workers
+# can never claim the same job and a claimed job is never only in memory.
+CLAIM_JOB_SCRIPT = FORGET_PARKED_JOB_LUA + """
+local popped = redis.call('ZPOPMIN', KEYS[1], 1)
+if #popped == 0 then
+    return false
+end
+local job_id = popped[1]
+redis.call('ZADD', KEYS[2], ARGV[2], job_id)
+redis.call('HSET', KEYS[3], job_id, ARGV[1])
+redis.call('SADD', KEYS[4], job_id)
+forget_parked(KEYS[5], ARGV[3], job_id)
+return job_id
+"""
+
+# Extend the leases a worker still owns; return the jobs it has lost
+# (reaped after a missed heartbeat and possibly claimed by another worker).
+RENEW_JOB_LEASES_SCRIPT = """
+local lost = {}
+for i = 3, #ARGV do
+    local job_id = ARGV[i]
+    if redis.call('HGET', KEYS[2], job_id) == ARGV[1] then
+        redis.call('ZADD', KEYS[1], ARGV[2], job_id)
+    else
+        redis.call('SREM', KEYS[3], job_id)
+        table.insert(lost, job_id)
+    end
+end
+return lost
+"""
+
+# Drop a worker's lease on a job; optionally put the job back on the ready queue.
+RELEASE_JOB_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    redis.call('SREM', KEYS[3], ARGV[1])
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('SREM', KEYS[3], ARGV[1])
+if ARGV[3] == '1' then
+    redis.call('ZADD', KEYS[4], 0, ARGV[1])
+    redis.call('LPUSH', KEYS[5], 1)
+    redis.call('LTRIM', KEYS[5], 0, tonumber(ARGV[4]) - 1)
+end
+return 1
+"""
+
+# Requeue every job whose lease has expired (its worker crashed or hung).
+REAP_EXPIRED_LEASES_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job_id in ipairs(expired) do
+    local owner = redis.call('HGET', KEYS[2], job_id)
+    if owner then
+        redis.call('SREM', ARGV[3] .. owner, job_id)
+    end
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('HDEL', KEYS[2], job_id)
+    redis.call('ZADD', KEYS[3], 0, job_id)
+    redis.call('LPUSH', KEYS[4], 1)
+end
+if #expired > 0 then
+    redis.call('LTRIM', KEYS[4], 0, tonumber(ARGV[4]) - 1)
+end
+return expired
+"""
+
+# Try to take a slot on every listed endpoint at once (all or nothing).
+# KEYS[1] is the waiter ticket counter, then (slots, waiters, waiter leases)
+# per endpoint. ARGV: holder, now, slot lease expiry, waiter lease expiry,
+# then one limit per endpoint.
+# A slot is granted only if fewer holders than the limit hold live leases AND
+# the caller is within the first `free` waiters, so waiters are served FIFO.
+# On failure the caller keeps (or takes) its place in each endpoint's queue.
+ACQUIRE_ENDPOINT_SLOTS_SCRIPT = """
+local n = (#KEYS - 1) / 3
+local holder = ARGV[1]
+local now = tonumber(ARGV[2])
+local granted = true
+for i = 1, n do
+    local slots, waiters, waiter_leases = KEYS[3 * i - 1], KEYS[3 * i], KEYS[3 * i + 1]
+    redis.call('ZREMRANGEBYSCORE', slots, '-inf', now)
+    local stale = redis.call('ZRANGEBYSCORE', waiter_leases, '-inf', now)
+    for _, waiter in ipairs(stale) do
+        redis.call('ZREM', waiters, waiter)
+        redis.call('ZREM', waiter_leases, waiter)
+    end
+    if not redis.call('ZSCORE', slots, holder) then
+        local free = tonumber(ARGV[4 + i]) - redis.call('ZCARD', slots)
+        local ahead = redis.call('ZRANK', waiters, holder) or redis.call('ZCARD', waiters)
+        if free <= ahead then
+            granted = false
+        end
+    end
+end
+if granted then
+    for i = 1, n do
+        redis.call('ZADD', KEYS[3 * i - 1], ARGV[3], holder)
+        redis.call('ZREM', KEYS[3 * i], holder)
+        redis.call('ZREM', KEYS[3 * i + 1], holder)
+    end
+    return 1
+end
+local ticket = false
+for i = 1, n do
+    if not redis.call('ZSCORE', KEYS[3 * i], holder) then
+        ticket = ticket or redis.call('INCR', KEYS[1])
+        redis.call('ZADD', KEYS[3 * i], ticket, holder)
+    end
+    redis.call('ZADD', KEYS[3 * i + 1], ARGV[4], holder)
+end
+return 0
+"""
+
+# Give back a holder's slots. For each endpoint with free capacity, wake the
+# waiters now at the front of its queue and move jobs parked on it back to the
+# ready queue. KEYS: ready, delayed, doorbell, parked hash, then (slots,
+# waiters, parked) per endpoint. ARGV: holder, now, wake key prefix, doorbell
+# max length, parked key prefix, then one limit per endpoint.
+RELEASE_ENDPOINT_SLOTS_SCRIPT = FORGET_PARKED_JOB_LUA + """
+local n = (#KEYS - 4) / 3
+local rang = false
+for i = 1, n do
+    local slots, waiters, parked = KEYS[3 * i + 2], KEYS[3 * i + 3], KEYS[3 * i + 4]
+    redis.call('ZREM', slots, ARGV[1])
+    redis.call('ZREMRANGEBYSCORE', slots, '-inf', ARGV[2])
+    local free = tonumber(ARGV[5 + i]) - redis.call('ZCARD', slots)
+    if free > 0 then
+        for _, waiter in ipairs(redis.call('ZRANGE', waiters, 0, free - 1)) do
+            local wake_key = ARGV[3] .. waiter
+            redis.call('LPUSH', wake_key, 1)
+            redis.call('EXPIRE', wake_key, 60)
+        end
+        for _, job_id in ipairs(redis.call('ZRANGE', parked, 0, free - 1)) do
+            forget_parked(KEYS[4], ARGV[5], job_id)
+            redis.call('ZREM', KEYS[2], job_id)
+            redis.call('ZADD', KEYS[1], 'NX', 0, job_id)
+            redis.call('LPUSH', KEYS[3], 1)
+            rang = true
+        end
+    end
+end
+if rang then
+    redis.call('LTRIM', KEYS[3], 0, tonumber(ARGV[4]) - 1)
+end
+return 1
+"""
+
+# Park a job until one of its throttled endpoints frees a slot. Endpoints
+# count as throttled when queued waiters already claim every free slot.
+# Returns 0 without parking if every endpoint has room. A delayed-queue entry
+# is the fallback should no release ever come (e.g. the holder died).
+# KEYS: delayed, parked hash, then (slots, waiters) per endpoint.
+# ARGV: job, now, fallback time, parked key prefix, then (endpoint ID, limit)
+# per endpoint.
+PARK_JOB_SCRIPT = FORGET_PARKED_JOB_LUA + """
+local n = (#KEYS - 2) / 2
+local now = tonumber(ARGV[2])
+local blocked = {}
+for i = 1, n do
+    local slots, waiters = KEYS[2 * i + 1], KEYS[2 * i + 2]
+    redis.call('ZREMRANGEBYSCORE', slots, '-inf', now)
+    local free = tonumber(ARGV[4 + 2 * i]) - redis.call('ZCARD', slots)
+    if free <= redis.call('ZCARD', waiters) then
+        table.insert(blocked, ARGV[3 + 2 * i])
+    end
+end
+if #blocked == 0 then
+    return 0
+end
+forget_parked(KEYS[2], ARGV[4], ARGV[1])
+for _, endpoint_id in ipairs(blocked) do
+    redis.call('ZADD', ARGV[4] .. endpoint_id, now, ARGV[1])
+end
+redis.call('HSET', KEYS[2], ARGV[1], table.concat(blocked, ','))
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+return 1
+"""
+
+# Extend a holder's slot leases; returns how many it still held.
+RENEW_ENDPOINT_SLOTS_SCRIPT = """
+local renewed = 0
+for i = 1, #KEYS do
+    if redis.call('ZSCORE', KEYS[i], ARGV[1]) then
+        redis.call('ZADD', KEYS[i], ARGV[2], ARGV[1])
+        renewed = renewed + 1
+    end
+end
+return renewed
+"""
+
+# Take up to ARGV[1] dirty statistics counters, deleting them as they are
+# read so increments made after this point count toward the next flush.
+# KEYS: dirty set. ARGV: batch size, counter key prefix. Returns
+# {member, {field, value, ...}} pairs.
+TAKE_STATS_COUNTERS_SCRIPT = """
+local taken = {}
+for _, member in ipairs(redis.call('SPOP', KEYS[1], tonumber(ARGV[1]))) do
+    local key = ARGV[2] .. member
+    table.insert(taken, {member, redis.call('HGETALL', key)})
+    redis.call('DEL', key)
+end
+return taken
+"""
+
+# AIMD step for endpoint concurrency, one state hash per endpoint. Success
+# adds 1/limit (so +1 per limit's worth of transfers) up to the ceiling;
+# throttling, a per-stream rate below drop x its moving average, or
+# error_threshold errors in a row multiply the limit by factor, at most once
+# per cooldown. A success resets the error run.
+# KEYS: state hash per endpoint. ARGV: now, outcome ("ok", "error" or
+# "throttled"), per-stream rate (bytes/sec, -1 if not measured), initial
+# limit (0 = ceiling), factor, cooldown, drop, averaging weight, error
+# threshold, then one ceiling per endpoint. Returns the new limits.
+UPDATE_CONCURRENCY_SCRIPT = """
+local now, outcome, rate = tonumber(ARGV[1]), ARGV[2], tonumber(ARGV[3])
+local initial, factor, cooldown = tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6])
+local drop, weight, error_threshold = tonumber(ARGV[7]), tonumber(ARGV[8]), tonumber(ARGV[9])
+local limits = {}
+for i, key in ipairs(KEYS) do
+    local ceiling = tonumber(ARGV[9 + i])
+    local state = redis.call('HMGET', key, 'limit', 'rate', 'decreased_at', 'errors')
+    local limit = tonumber(state[1]) or (initial > 0 and initial or ceiling)
+    limit = math.min(limit, ceiling)
+    local average = tonumber(state[2]) or 0
+    local decreased_at = tonumber(state[3]) or 0
+    local errors = tonumber(state[4]) or 0
+    local reason = outcome
+    if outcome == 'ok' then
+        errors = 0
+    elseif outcome == 'error' then
+        errors = errors + 1
+    end
+    if rate > 0 then
+        if outcome == 'ok' and average > 0 and rate < average * drop then
+            reason = 'throughput'
+        end
+        average = average > 0 and average * (1 - weight) + rate * weight or rate
+    end
+    local decision = nil
+    if reason == 'ok' then
+        if limit < ceiling then
+            limit = math.min(ceiling, limit + 1 / math.floor(limit))
+            decision = 'increase'
+        end
+    elseif reason == 'error' and errors < error_threshold then
+        -- Not a run of errors yet; one bad file says little about the endpoint
+    elseif now - decreased_at >= cooldown and limit > 1 then
+        limit = math.max(1, limit * factor)
+        decreased_at = now
+        errors = 0
+        decision = 'decrease'
+    end
+    redis.call('HSET', key, 'limit', limit, 'rate', average, 'decreased_at', decreased_at,
+        'errors', errors, 'ceiling', ceiling, 'updated_at', now)
+    if decision then
+        redis.call('HSET', key, 'decision', decision, 'reason', reason, 'decided_at', now)
+    end
+    table.insert(limits, tostring(limit))
+end
+return limits
+"""
+
+
+# Register a job as a user of an rcd remote. KEYS: remote registry (name ->
+# first-registration time, or "deleting:<time>" while a worker deletes it),
+# the remote's users. ARGV: name, job, now, seconds after which a deletion
+# is presumed abandoned. Returns 1 if newly registered (create it in the
+# rcd), 0 if already registered, -1 while it is being deleted (retry).
+USE_RC_REMOTE_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], ARGV[1])
+if state and string.sub(state, 1, 9) == 'deleting:' then
+    if tonumber(string.sub(state, 10)) > tonumber(ARGV[3]) - tonumber(ARGV[4]) then
+        return -1
+    end
+    state = false
+end
+redis.call('SADD', KEYS[2], ARGV[2])
+if state then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+return 1
+"""
+
+# Drop a job from every rcd remote's users (ARGV[1], may be empty), then mark
+# for deletion each remote that a later-registered version of the same
+# endpoint replaced and that no job with a live lease still uses. Users whose
+# lease expired (their worker died) are forgotten. KEYS: remote registry, job
+# leases. ARGV: job, now, users key prefix. Returns the names to delete.
+RELEASE_RC_REMOTES_SCRIPT = """
+local entries = redis.call('HGETALL', KEYS[1])
+local registered = {}
+local newest = {}
+for i = 1, #entries, 2 do
+    local name, state = entries[i], entries[i + 1]
+    if ARGV[1] ~= '' then
+        redis.call('SREM', ARGV[3] .. name, ARGV[1])
+    end
+    local prefix = string.match(name, '^(.*%-)[^%-]*$')
+    if prefix and string.sub(state, 1, 9) ~= 'deleting:' then
+        local at = tonumber(state)
+        registered[name] = prefix
+        if not newest[prefix] or at > newest[prefix][2] then
+            newest[prefix] = {name, at}
+        end
+    end
+end
+local deleting = {}
+for name, prefix in pairs(registered) do
+    if newest[prefix][1] ~= name then
+        local users = ARGV[3] .. name
+        for _, job_id in ipairs(redis.call('SMEMBERS', users)) do
+            local lease = redis.call('ZSCORE', KEYS[2], job_id)
+            if not lease or tonumber(lease) <= tonumber(ARGV[2]) then
+                redis.call('SREM', users, job_id)
+            end
+        end
+        if redis.call('SCARD', users) == 0 then
+            redis.call('HSET', KEYS[1], name, 'deleting:' .. ARGV[2])
+            table.insert(deleting, name)
+        end
+    end
+end
+return deleting
+"""
+
+
 class RedisManager:
     def __init__(self):
         self.redis: Optional[aioredis.Redis] = None
+        # Jobs ready to run, scored by priority (lower = sooner)
         self.job_queue_key = "ctf_rclone:job_queue"
+        # Jobs waiting out a delay, scored by the time they become ready
+        self.delayed_job_queue_key = "ctf_rclone:job_queue:delayed"
+        # One token per enqueue; idle workers block on it instead of polling
+        self.job_doorbell_key = "ctf_rclone:job_queue:doorbell"
+        self.doorbell_max_length = 1000
+        # Claimed jobs: lease expiry per job, owning worker per job, and each worker's jobs
+        self.job_leases_key = "ctf_rclone:job_leases"
+        self.job_lease_owners_key = "ctf_rclone:job_lease_owners"
+        self.worker_jobs_prefix = "ctf_rclone:worker_jobs:"
         self.job_status_prefix = "ctf_rclone:job_status:"
-        self.endpoint_counters_prefix = "ctf_rclone:endpoint_counters:"
+        # Endpoint transfer slots: live leases per endpoint, FIFO wait queue,
+        # waiter liveness, and a per-waiter wakeup list
+        self.endpoint_slots_prefix = "ctf_rclone:endpoint_slots:"
+        self.endpoint_waiters_prefix = "ctf_rclone:endpoint_waiters:"
+        self.endpoint_waiter_leases_prefix = "ctf_rclone:endpoint_waiter_leases:"
+        self.slot_wake_prefix = "ctf_rclone:slot_wake:"
+        self.slot_ticket_key = "ctf_rclone:slot_tickets"
+        # Jobs parked until an endpoint frees a slot, and the endpoints each parked job waits on
+        self.endpoint_parked_prefix = "ctf_rclone:endpoint_parked:"
+        self.parked_jobs_key = "ctf_rclone:parked_jobs"
+        # Active transfers sharing each endpoint's bandwidth budget (holder -> lease expiry)
+        self.endpoint_bandwidth_prefix = "ctf_rclone:endpoint_bandwidth:"
+        # Adaptive (AIMD) concurrency state per endpoint
+        self.endpoint_concurrency_prefix = "ctf_rclone:endpoint_concurrency:"
+        # Live transfer progress, written every second and flushed to Postgres in batches
+        self.transfer_progress_prefix = "ctf_rclone:transfer_progress:"
+        self.job_progress_prefix = "ctf_rclone:job_progress:"  # transfer ID -> bytes in flight
+        self.dirty_progress_key = "ctf_rclone:progress_dirty"
+        self.progress_ttl = 86400
+        # Endpoint and template counter increments not yet applied to Postgres
+        # ("<kind>:<id>" -> field -> delta), and the counters that have some
+        self.stats_counters_prefix = "ctf_rclone:stats:"
+        self.dirty_stats_key = "ctf_rclone:stats_dirty"
+        # Remotes created in the shared rcd (name -> first registration time)
+        # and the jobs using each; replaced versions are deleted once unused
+        self.rc_remotes_key = "ctf_rclone:rc_remotes"
+        self.rc_remote_users_prefix = "ctf_rclone:rc_remote_users:"
+        self.rc_remote_delete_timeout = 60
         
     async def connect(self):
         """Initialize Redis connection"""
@@ -33,41 +431,160 @@ class RedisManager:
             priority: Priority score (lower = higher priority)
             delay: Delay in seconds before job is available for processing
         """
-        import time
-        score = priority
         if delay > 0:
-            # Use timestamp as score for delayed jobs
-            score = time.time() + delay
-        return await self.redis.zadd(self.job_queue_key, {job_id: score})
+            # Delayed jobs wait in their own set until promote_delayed_jobs moves them
+            return await self.redis.zadd(self.delayed_job_queue_key, {job_id: time.time() + delay})
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.job_queue_key, {job_id: priority})
+            pipe.zrem(self.delayed_job_queue_key, job_id)
+            pipe.lpush(self.job_doorbell_key, 1)
+            pipe.ltrim(self.job_doorbell_key, 0, self.doorbell_max_length - 1)
+            added, *_ = await pipe.execute()
+        return added
     
-    async def dequeue_job(self) -> Optional[str]:
-        """Get the highest priority job from the queue
+    async def enqueue_jobs(self, job_ids: List[str], priority: int = 0) -> int:
+        """Add several jobs to the ready queue in one round trip"""
+        if not job_ids:
+            return 0
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.job_queue_key, {job_id: priority for job_id in job_ids})
+            pipe.zrem(self.delayed_job_queue_key, *job_ids)
+            pipe.lpush(self.job_doorbell_key, *[1] * min(len(job_ids), self.doorbell_max_length))
+            pipe.ltrim(self.job_doorbell_key, 0, self.doorbell_max_length - 1)
+            added, *_ = await pipe.execute()
+        return added
+    
+    async def claim_job(self, worker_id: str, lease_seconds: int, timeout: int = 0) -> Optional[str]:
+        """Atomically take the highest priority ready job and lease it to a worker
+        
+        The worker must renew the lease (renew_job_leases) while it runs the job
+        and release it (release_job) when done; otherwise reap_expired_leases
+        puts the job back on the queue once the lease expires.
         
-        Only returns jobs that are ready to run (score <= current time)
+        Args:
+            worker_id: Unique ID of the claiming worker
+            lease_seconds: How long the lease lasts without renewal
+            timeout: Seconds to block waiting for a job when the queue is empty
         """
-        import time
-        current_time = time.time()
-        
-        # Get jobs with score less than current time
-        result = await self.redis.zrangebyscore(
-            self.job_queue_key, 
-            '-inf', 
-            current_time, 
-            start=0, 
-            num=1,
-            withscores=True
+        async def claim() -> Optional[str]:
+            return await self.redis.eval(
+                CLAIM_JOB_SCRIPT,
+                5,
+                self.job_queue_key,
+                self.job_leases_key,
+                self.job_lease_owners_key,
+                f"{self.worker_jobs_prefix}{worker_id}",
+                self.parked_jobs_key,
+                worker_id,
+                time.time() + lease_seconds,
+                self.endpoint_parked_prefix
+            )
+        
+        return await self._wait_for_job(claim, timeout)
+    
+    async def _wait_for_job(self, take_job, timeout: int) -> Optional[str]:
+        """Take a job with take_job, blocking on the doorbell for up to timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job_id = await take_job()
+            if job_id:
+                return job_id
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            
+            # Nothing ready - sleep on the doorbell until someone enqueues a job.
+            # Tokens left by jobs another worker already took just loop back here.
+            await self.redis.blpop(self.job_doorbell_key, timeout=remaining)
+    
+    async def renew_job_leases(self, worker_id: str, job_ids: List[str], lease_seconds: int) -> List[str]:
+        """Extend a worker's leases on its running jobs
+        
+        Returns:
+            Job IDs whose lease the worker no longer holds (already reaped)
+        """
+        if not job_ids:
+            return []
+        return await self.redis.eval(
+            RENEW_JOB_LEASES_SCRIPT,
+            3,
+            self.job_leases_key,
+            self.job_lease_owners_key,
+            f"{self.worker_jobs_prefix}{worker_id}",
+            worker_id,
+            time.time() + lease_seconds,
+            *job_ids
         )
+    
+    async def release_job(self, job_id: str, worker_id: str, requeue: bool = False) -> bool:
+        """Release a worker's lease on a job, optionally putting it back on the queue
+        
+        Returns:
+            False if the worker no longer held the lease
+        """
+        released = await self.redis.eval(
+            RELEASE_JOB_SCRIPT,
+            5,
+            self.job_leases_key,
+            self.job_lease_owners_key,
+            f"{self.worker_jobs_prefix}{worker_id}",
+            self.job_queue_key,
+            self.job_doorbell_key,
+            job_id,
+            worker_id,
+            '1' if requeue else '0',
+            self.doorbell_max_length
+        )
+        return bool(released)
+    
+    async def reap_expired_leases(self, batch_size: int = 100) -> List[str]:
+        """Requeue jobs whose worker stopped renewing their lease
         
+        Returns:
+            IDs of the requeued jobs
+        """
+        return await self.redis.eval(
+            REAP_EXPIRED_LEASES_SCRIPT,
+            4,
+            self.job_leases_key,
+            self.job_lease_owners_key,
+            self.job_queue_key,
+            self.job_doorbell_key,
+            time.time(),
+            batch_size,
+            self.worker_jobs_prefix,
+            self.doorbell_max_length
+        )
+    
+    async def promote_delayed_jobs(self, batch_size: int = 100) -> int:
+        """Move delayed jobs that are due onto the ready queue
+        
+        Returns:
+            Number of jobs promoted
+        """
+        return await self.redis.eval(
+            PROMOTE_DELAYED_JOBS_SCRIPT,
+            3,
+            self.delayed_job_queue_key,
+            self.job_queue_key,
+            self.job_doorbell_key,
+            time.time(),
+            batch_size,
+            self.doorbell_max_length
+        )
+    
+    async def get_next_delayed_job_time(self) -> Optional[float]:
+        """Get the time the next delayed job becomes ready, if any"""
+        result = await self.redis.zrange(self.delayed_job_queue_key, 0, 0, withscores=True)
         if result:
-            job_id = result[0][0]
-            # Remove the job from queue
-            await self.redis.zrem(self.job_queue_key, job_id)
-            return job_id
+            return result[0][1]
         return None
     
     async def get_queue_length(self) -> int:
-        """Get the number of jobs in the queue"""
-        return await self.redis.zcard(self.job_queue_key)
+        """Get the number of jobs in the queue (ready and delayed)"""
+        return await self.redis.zcard(self.job_queue_key) + await self.redis.zcard(self.delayed_job_queue_key)
     
     async def set_job_status(self, job_id: str, status: dict) -> None:
         """Store job status in Redis with TTL"""
@@ -86,31 +603,371 @@ class RedisManager:
             return json.loads(data)
         return None
     
-    async def increment_endpoint_counter(self, endpoint_id: str) -> int:
-        """Increment active transfer counter for an endpoint"""
-        key = f"{self.endpoint_counters_prefix}{endpoint_id}"
-        return await self.redis.incr(key)
-    
-    async def decrement_endpoint_counter(self, endpoint_id: str) -> int:
-        """Decrement active transfer counter for an endpoint"""
-        key = f"{self.endpoint_counters_prefix}{endpoint_id}"
-        value = await self.redis.decr(key)
-        # Ensure counter doesn't go negative
-        if value < 0:
-            await self.redis.set(key, 0)
-            return 0
-        return value
-    
-    async def get_endpoint_counter(self, endpoint_id: str) -> int:
-        """Get current active transfer count for an endpoint"""
-        key = f"{self.endpoint_counters_prefix}{endpoint_id}"
-        value = await self.redis.get(key)
-        return int(value) if value else 0
-    
-    async def reset_endpoint_counter(self, endpoint_id: str) -> None:
-        """Reset endpoint counter to 0"""
-        key = f"{self.endpoint_counters_prefix}{endpoint_id}"
-        await self.redis.set(key, 0)
+    async def try_acquire_endpoint_slots(
+        self,
+        endpoint_limits: Dict[str, int],
+        holder_id: str,
+        lease_seconds: int,
+        wait_lease_seconds: int
+    ) -> bool:
+        """Atomically take one slot on each endpoint, or join their wait queues
+        
+        Args:
+            endpoint_limits: Endpoint ID -> max concurrent slots
+            holder_id: Unique ID for this slot holder
+            lease_seconds: Slot lease length; renew with renew_endpoint_slots
+            wait_lease_seconds: How long a queued waiter keeps its place without retrying
+            
+        Returns:
+            True if every slot was granted, False if queued
+        """
+        now = time.time()
+        keys = [self.slot_ticket_key]
+        limits = []
+        for endpoint_id, limit in endpoint_limits.items():
+            keys.extend([
+                f"{self.endpoint_slots_prefix}{endpoint_id}",
+                f"{self.endpoint_waiters_prefix}{endpoint_id}",
+                f"{self.endpoint_waiter_leases_prefix}{endpoint_id}",
+            ])
+            limits.append(limit)
+        granted = await self.redis.eval(
+            ACQUIRE_ENDPOINT_SLOTS_SCRIPT,
+            len(keys),
+            *keys,
+            holder_id,
+            now,
+            now + lease_seconds,
+            now + wait_lease_seconds,
+            *limits
+        )
+        return bool(granted)
+    
+    async def release_endpoint_slots(self, endpoint_limits: Dict[str, int], holder_id: str) -> None:
+        """Release a holder's slots, waking the next waiters and any parked jobs"""
+        keys = [self.job_queue_key, self.delayed_job_queue_key, self.job_doorbell_key, self.parked_jobs_key]
+        for endpoint_id in endpoint_limits:
+            keys.extend([
+                f"{self.endpoint_slots_prefix}{endpoint_id}",
+                f"{self.endpoint_waiters_prefix}{endpoint_id}",
+                f"{self.endpoint_parked_prefix}{endpoint_id}",
+            ])
+        await self.redis.eval(
+            RELEASE_ENDPOINT_SLOTS_SCRIPT,
+            len(keys),
+            *keys,
+            holder_id,
+            time.time(),
+            self.slot_wake_prefix,
+            self.doorbell_max_length,
+            self.endpoint_parked_prefix,
+            *endpoint_limits.values()
+        )
+    
+    async def park_job(self, job_id: str, endpoint_limits: Dict[str, int], recheck_after: int) -> bool:
+        """Park a job until a throttled endpoint releases a slot
+        
+        Args:
+            job_id: The job to park
+            endpoint_limits: Endpoint ID -> max concurrent slots for the job's endpoints
+            recheck_after: Seconds after which the job is requeued even if no release woke it
+            
+        Returns:
+            True if parked, False if every endpoint has room and the job should run now
+        """
+        now = time.time()
+        keys = [self.delayed_job_queue_key, self.parked_jobs_key]
+        endpoint_args = []
+        for endpoint_id, limit in endpoint_limits.items():
+            keys.extend([
+                f"{self.endpoint_slots_prefix}{endpoint_id}",
+                f"{self.endpoint_waiters_prefix}{endpoint_id}",
+            ])
+            endpoint_args.extend([endpoint_id, limit])
+        parked = await self.redis.eval(
+            PARK_JOB_SCRIPT,
+            len(keys),
+            *keys,
+            job_id,
+            now,
+            now + recheck_after,
+            self.endpoint_parked_prefix,
+            *endpoint_args
+        )
+        return bool(parked)
+    
+    @staticmethod
+    def _bandwidth_members(holder_id: str, streams: int) -> List[str]:
+        """Budget entries for a holder: one per stream it runs"""
+        return [holder_id] + [f"{holder_id}#{stream}" for stream in range(1, streams)]
+    
+    async def join_bandwidth_share(self, endpoint_ids: List[str], holder_id: str, lease_seconds: int,
+                                   streams: int = 1) -> Dict[str, int]:
+        """Register (or renew) a transfer's streams on each endpoint's bandwidth budget
+        
+        Returns:
+            Endpoint ID -> number of live streams sharing its budget
+        """
+        now = time.time()
+        members = {member: now + lease_seconds for member in self._bandwidth_members(holder_id, streams)}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for endpoint_id in endpoint_ids:
+                key = f"{self.endpoint_bandwidth_prefix}{endpoint_id}"
+                pipe.zremrangebyscore(key, "-inf", now)
+                pipe.zadd(key, members)
+                pipe.zcard(key)
+            results = await pipe.execute()
+        return {endpoint_id: results[3 * i + 2] for i, endpoint_id in enumerate(endpoint_ids)}
+    
+    async def leave_bandwidth_share(self, endpoint_ids: List[str], holder_id: str, streams: int = 1) -> None:
+        """Remove a finished transfer's streams from its endpoints' bandwidth budgets"""
+        members = self._bandwidth_members(holder_id, streams)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for endpoint_id in endpoint_ids:
+                pipe.zrem(f"{self.endpoint_bandwidth_prefix}{endpoint_id}", *members)
+            await pipe.execute()
+    
+    async def get_endpoint_parked_count(self, endpoint_id: str) -> int:
+        """Get the number of jobs parked on an endpoint"""
+        return await self.redis.zcard(f"{self.endpoint_parked_prefix}{endpoint_id}")
+    
+    async def renew_endpoint_slots(self, endpoint_ids: List[str], holder_id: str, lease_seconds: int) -> int:
+        """Extend a holder's slot leases; returns how many slots it still held"""
+        keys = [f"{self.endpoint_slots_prefix}{endpoint_id}" for endpoint_id in endpoint_ids]
+        return await self.redis.eval(
+            RENEW_ENDPOINT_SLOTS_SCRIPT,
+            len(keys),
+            *keys,
+            holder_id,
+            time.time() + lease_seconds
+        )
+    
+    async def cancel_endpoint_slot_wait(self, endpoint_ids: List[str], holder_id: str) -> None:
+        """Leave the wait queues of endpoints we gave up waiting for"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for endpoint_id in endpoint_ids:
+                pipe.zrem(f"{self.endpoint_waiters_prefix}{endpoint_id}", holder_id)
+                pipe.zrem(f"{self.endpoint_waiter_leases_prefix}{endpoint_id}", holder_id)
+            pipe.delete(f"{self.slot_wake_prefix}{holder_id}")
+            await pipe.execute()
+    
+    async def wait_for_slot_wakeup(self, holder_id: str, timeout: float) -> bool:
+        """Block until a release wakes this waiter or the timeout passes"""
+        result = await self.redis.blpop(f"{self.slot_wake_prefix}{holder_id}", timeout=timeout)
+        return result is not None
+    
+    async def get_endpoint_slot_count(self, endpoint_id: str) -> int:
+        """Get the number of live (unexpired) slot leases for an endpoint"""
+        key = f"{self.endpoint_slots_prefix}{endpoint_id}"
+        return await self.redis.zcount(key, f"({time.time()}", "+inf")
+    
+    async def get_endpoint_waiter_count(self, endpoint_id: str) -> int:
+        """Get the number of holders queued for an endpoint's slots"""
+        return await self.redis.zcard(f"{self.endpoint_waiters_prefix}{endpoint_id}")
+    
+    async def reset_endpoint_slots(self, endpoint_id: str) -> None:
+        """Drop all slot leases for an endpoint"""
+        await self.redis.delete(f"{self.endpoint_slots_prefix}{endpoint_id}")
+    
+    async def use_rc_remote(self, name: str, job_id: str) -> int:
+        """Register a job as a user of an rcd remote
+        
+        Returns:
+            1 if the remote is new (create it), 0 if registered, -1 while it is being deleted
+        """
+        return await self.redis.eval(
+            USE_RC_REMOTE_SCRIPT,
+            2,
+            self.rc_remotes_key,
+            f"{self.rc_remote_users_prefix}{name}",
+            name,
+            job_id,
+            time.time(),
+            self.rc_remote_delete_timeout
+        )
+    
+    async def release_rc_remotes(self, job_id: str = "") -> List[str]:
+        """Stop counting a job as a user of rcd remotes
+        
+        Returns:
+            Replaced remotes no running job uses any more; delete them from the
+            rcd, then call finish_rc_remote_deletion
+        """
+        return await self.redis.eval(
+            RELEASE_RC_REMOTES_SCRIPT,
+            2,
+            self.rc_remotes_key,
+            self.job_leases_key,
+            job_id,
+            time.time(),
+            self.rc_remote_users_prefix
+        )
+    
+    async def finish_rc_remote_deletion(self, names: List[str]) -> None:
+        """Forget rcd remotes returned by release_rc_remotes once they are deleted"""
+        if not names:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(self.rc_remotes_key, *names)
+            pipe.delete(*[f"{self.rc_remote_users_prefix}{name}" for name in names])
+            await pipe.execute()
+    
+    async def update_endpoint_concurrency(self, ceilings: Dict[str, int], outcome: str, rate: Optional[float],
+                                          initial: int, factor: float, cooldown: float, drop: float,
+                                          weight: float, error_threshold: int = 1) -> Dict[str, float]:
+        """Apply one transfer outcome to each endpoint's adaptive concurrency limit
+        
+        Args:
+            ceilings: Endpoint ID -> configured max concurrency
+            outcome: "ok", "error" or "throttled"
+            rate: Per-stream throughput of the transfer in bytes/sec, None if not measured
+            initial, factor, cooldown, drop, weight, error_threshold: AIMD parameters
+                (see UPDATE_CONCURRENCY_SCRIPT)
+            
+        Returns:
+            Endpoint ID -> new (fractional) limit
+        """
+        if not ceilings:
+            return {}
+        endpoint_ids = list(ceilings)
+        limits = await self.redis.eval(
+            UPDATE_CONCURRENCY_SCRIPT,
+            len(endpoint_ids),
+            *[f"{self.endpoint_concurrency_prefix}{endpoint_id}" for endpoint_id in endpoint_ids],
+            time.time(), outcome, rate if rate else -1, initial, factor, cooldown, drop, weight, error_threshold,
+            *[ceilings[endpoint_id] for endpoint_id in endpoint_ids]
+        )
+        return {endpoint_id: float(limit) for endpoint_id, limit in zip(endpoint_ids, limits)}
+    
+    async def get_endpoint_concurrency(self, endpoint_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """Get adaptive concurrency state; endpoints without any are left out"""
+        if not endpoint_ids:
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for endpoint_id in endpoint_ids:
+                pipe.hgetall(f"{self.endpoint_concurrency_prefix}{endpoint_id}")
+            results = await pipe.execute()
+        return {endpoint_id: raw for endpoint_id, raw in zip(endpoint_ids, results) if raw}
+    
+    async def reset_endpoint_concurrency(self, endpoint_id: str) -> None:
+        """Forget an endpoint's adaptive concurrency state"""
+        await self.redis.delete(f"{self.endpoint_concurrency_prefix}{endpoint_id}")
+    
+    async def set_transfer_progress(self, transfer_id: str, job_id: str, progress: Dict[str, Any]) -> None:
+        """Store a running transfer's live progress and mark it for flushing
+        
+        Args:
+            transfer_id: The transfer
+            job_id: The transfer's job, whose in-flight byte total is updated too
+            progress: bytes_transferred, progress_percentage, transfer_rate and eta
+        """
+        key = f"{self.transfer_progress_prefix}{transfer_id}"
+        job_key = f"{self.job_progress_prefix}{job_id}"
+        mapping = {
+            field: value.isoformat() if isinstance(value, datetime) else ("" if value is None else value)
+            for field, value in progress.items()
+        }
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self.progress_ttl)
+            pipe.hset(job_key, transfer_id, progress.get('bytes_transferred') or 0)
+            pipe.expire(job_key, self.progress_ttl)
+            pipe.sadd(self.dirty_progress_key, transfer_id)
+            await pipe.execute()
+    
+    async def get_transfer_progress(self, transfer_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get live progress for transfers; transfers without any are left out"""
+        if not transfer_ids:
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for transfer_id in transfer_ids:
+                pipe.hgetall(f"{self.transfer_progress_prefix}{transfer_id}")
+            results = await pipe.execute()
+        return {
+            transfer_id: self._decode_progress(raw)
+            for transfer_id, raw in zip(transfer_ids, results)
+            if raw
+        }
+    
+    async def get_job_in_flight_bytes(self, job_ids: List[str]) -> Dict[str, int]:
+        """Get bytes copied so far by each job's still-running transfers"""
+        if not job_ids:
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hvals(f"{self.job_progress_prefix}{job_id}")
+            results = await pipe.execute()
+        return {job_id: sum(int(value) for value in values) for job_id, values in zip(job_ids, results)}
+    
+    async def take_dirty_transfer_progress(self, batch_size: int = 500) -> Dict[str, Dict[str, Any]]:
+        """Take up to batch_size transfers whose progress changed since the last flush"""
+        transfer_ids = await self.redis.spop(self.dirty_progress_key, batch_size)
+        return await self.get_transfer_progress(transfer_ids or [])
+    
+    async def clear_transfer_progress(self, transfer_id: str, job_id: str) -> None:
+        """Forget a finished transfer's live progress"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(f"{self.transfer_progress_prefix}{transfer_id}")
+            pipe.hdel(f"{self.job_progress_prefix}{job_id}", transfer_id)
+            pipe.srem(self.dirty_progress_key, transfer_id)
+            await pipe.execute()
+    
+    @staticmethod
+    def _decode_progress(raw: Dict[str, str]) -> Dict[str, Any]:
+        """Turn a progress hash back into Transfer column values"""
+        return {
+            'bytes_transferred': int(raw.get('bytes_transferred') or 0),
+            'progress_percentage': float(raw.get('progress_percentage') or 0),
+            'transfer_rate': float(raw['transfer_rate']) if raw.get('transfer_rate') else None,
+            'eta': datetime.fromisoformat(raw['eta']) if raw.get('eta') else None,
+        }
+    
+    async def incr_stats(self, kind: str, deltas: Dict[str, Dict[str, int]]) -> None:
+        """Add to statistics counters and mark them for flushing
+        
+        Args:
+            kind: What the counters belong to ('endpoint' or 'template')
+            deltas: ID -> counter field -> amount to add
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for object_id, fields in deltas.items():
+                member = f"{kind}:{object_id}"
+                for field, amount in fields.items():
+                    if amount:
+                        pipe.hincrby(f"{self.stats_counters_prefix}{member}", field, amount)
+                pipe.sadd(self.dirty_stats_key, member)
+            await pipe.execute()
+    
+    async def get_stats(self, kind: str, object_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """Get unflushed counter increments; IDs without any are left out"""
+        if not object_ids:
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for object_id in object_ids:
+                pipe.hgetall(f"{self.stats_counters_prefix}{kind}:{object_id}")
+            results = await pipe.execute()
+        return {
+            object_id: {field: int(value) for field, value in raw.items()}
+            for object_id, raw in zip(object_ids, results)
+            if raw
+        }
+    
+    async def take_dirty_stats(self, batch_size: int = 500) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Take up to batch_size counters with unflushed increments
+        
+        Returns kind -> ID -> field -> delta. The taken increments are removed
+        from Redis; give them back with incr_stats if they can't be applied.
+        """
+        taken = await self.redis.eval(
+            TAKE_STATS_COUNTERS_SCRIPT, 1, self.dirty_stats_key, batch_size, self.stats_counters_prefix
+        )
+        stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for member, flat in taken:
+            kind, object_id = member.split(':', 1)
+            fields = {flat[i]: int(flat[i + 1]) for i in range(0, len(flat), 2)}
+            if fields:
+                stats.setdefault(kind, {})[object_id] = fields
+        return stats
     
     async def publish_event(self, channel: str, message: dict) -> None:
         """Publish event to Redis pub/sub channel"""
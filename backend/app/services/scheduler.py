@@ -117,6 +117,8 @@ class JobScheduler:
                 status=JobStatus.QUEUED,
                 is_active=True,
                 config={
+                    # Per-job options (e.g. sync_mode) carry over to each run
+                    **(job.config or {}),
                     'scheduled_job_id': job.id,
                     'scheduled_execution': True
                 },
@@ -128,7 +130,7 @@ class JobScheduler:
             await db.commit()
             
             # Queue the job for processing
-            await self.redis_manager.queue_job(execution_job.id)
+            await self.redis_manager.enqueue_job(execution_job.id)
             
             logger.info(f"Queued execution job {execution_job.id} for scheduled job {job.id}")
             
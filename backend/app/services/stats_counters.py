@@ -0,0 +1,107 @@
+from typing import Dict, Iterable
+import logging
+
+from sqlalchemy import bindparam, update
+
+from app.models.endpoint import Endpoint
+from app.models.transfer_template import TransferTemplate
+from app.services.redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+
+class StatsCounters:
+    """
+    Endpoint and template usage counters, accumulated in Redis.
+
+    Incrementing the counter columns directly makes every finished file (or
+    triggered template) take a row lock on the same few hot rows. Instead,
+    increments are added up in Redis and flush() applies them to Postgres
+    in one batched UPDATE per table. API reads add the unflushed part back
+    with merge_endpoints / merge_templates.
+    """
+
+    # Counter columns that may be incremented, by kind
+    COUNTERS = {
+        'endpoint': (Endpoint, ('total_transfers', 'failed_transfers', 'total_bytes_transferred')),
+        'template': (TransferTemplate, ('total_triggers', 'successful_transfers', 'failed_transfers')),
+    }
+
+    async def record_transfers(self, endpoint_ids: Iterable[str], count: int, bytes_transferred: int):
+        """Count successful transfers against each of the endpoints"""
+        if not count:
+            return
+        deltas = {'total_transfers': count, 'total_bytes_transferred': bytes_transferred}
+        await redis_manager.incr_stats('endpoint', {endpoint_id: deltas for endpoint_id in set(endpoint_ids)})
+
+    async def record_template(self, template_id: str, **deltas: int):
+        """Add to a template's counters, e.g. record_template(id, total_triggers=1)"""
+        await redis_manager.incr_stats('template', {template_id: deltas})
+
+    async def flush(self, db, batch_size: int = 500) -> int:
+        """Apply unflushed increments to Postgres; returns how many rows were updated
+
+        Each batch becomes one executemany UPDATE per table, adding to the
+        column values already there. If a batch can't be written, its
+        increments go back to Redis for the next flush.
+        """
+        flushed = 0
+        while True:
+            taken = await redis_manager.take_dirty_stats(batch_size=batch_size)
+            if not taken:
+                return flushed
+            try:
+                for kind, deltas in taken.items():
+                    if kind in self.COUNTERS:
+                        await self._apply(db, kind, deltas)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                for kind, deltas in taken.items():
+                    await redis_manager.incr_stats(kind, deltas)
+                raise
+            flushed += sum(len(deltas) for deltas in taken.values())
+
+    async def _apply(self, db, kind: str, deltas: Dict[str, Dict[str, int]]):
+        model, fields = self.COUNTERS[kind]
+        table = model.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('b_id'))
+            .values({
+                field: table.c[field] + bindparam(f"b_{field}")
+                for field in fields
+            })
+        )
+        rows = [
+            {'b_id': object_id, **{f"b_{field}": counts.get(field, 0) for field in fields}}
+            for object_id, counts in deltas.items()
+        ]
+        await db.execute(stmt, rows)
+
+    async def merge_endpoints(self, responses: list) -> list:
+        """Add unflushed increments to EndpointResponse counters"""
+        return await self._merge('endpoint', responses)
+
+    async def merge_templates(self, responses: list) -> list:
+        """Add unflushed increments to TransferTemplateResponse counters"""
+        return await self._merge('template', responses)
+
+    async def _merge(self, kind: str, responses: list) -> list:
+        try:
+            pending = await redis_manager.get_stats(kind, [r.id for r in responses])
+        except Exception as e:
+            logger.warning(f"Unflushed {kind} statistics unavailable: {e}")
+            return responses
+        return [
+            r.model_copy(update={
+                field: (getattr(r, field) or 0) + delta
+                for field, delta in pending[r.id].items()
+                if field in self.COUNTERS[kind][1]
+            }) if r.id in pending else r
+            for r in responses
+        ]
+
+
+# Global instance
+stats_counters = StatsCounters()
@@ -0,0 +1,126 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models.job import Job
+from app.models.sync_manifest import SyncManifestEntry
+
+logger = logging.getLogger(__name__)
+
+
+class SyncManifest:
+    """
+    Incremental sync state for one job's source -> destination pair.
+    
+    filter_changed() drops listed files whose size, modification time and
+    hash (where both sides have one) match their last successful transfer.
+    Transferred files are staged with file_transferred() and written with
+    flush(), so the manifest only ever records files that arrived.
+    """
+    
+    # Staged entries at which callers should flush
+    FLUSH_SIZE = 500
+    
+    def __init__(self, scope: str, source_endpoint_id: str):
+        self.scope = scope
+        self.source_endpoint_id = source_endpoint_id
+        self.unchanged = 0
+        # Listed version of files handed out for transfer, by path
+        self._listed: Dict[str, Dict[str, Any]] = {}
+        self._staged: Dict[str, Dict[str, Any]] = {}
+    
+    @classmethod
+    def for_job(cls, job: Job) -> Optional['SyncManifest']:
+        """The manifest for a job in incremental sync mode, None for a full sync
+        
+        Set per job with config "sync_mode" ("full" or "incremental"),
+        falling back to SYNC_MODE.
+        """
+        mode = (job.config or {}).get('sync_mode') or settings.SYNC_MODE
+        if mode != 'incremental':
+            return None
+        return cls(cls.scope_for(job), job.source_endpoint_id)
+    
+    @staticmethod
+    def scope_for(job: Job) -> str:
+        """Manifest key for a job's source and destination"""
+        key = json.dumps([job.source_endpoint_id, job.source_path, job.destination_endpoint_id, job.destination_path])
+        return hashlib.sha256(key.encode()).hexdigest()
+    
+    @staticmethod
+    def is_changed(entry: Optional[Any], file_info: Dict[str, Any]) -> bool:
+        """Whether a listed file differs from its manifest entry (None if never transferred)"""
+        if entry is None or entry.size != file_info['size']:
+            return True
+        for field in ('mod_time', 'hash'):
+            listed = file_info.get(field)
+            recorded = getattr(entry, field)
+            if listed and recorded and listed != recorded:
+                return True
+        return False
+    
+    async def filter_changed(self, db, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The listed files that are new or changed since their last successful transfer"""
+        if not files:
+            return []
+        result = await db.execute(
+            select(
+                SyncManifestEntry.file_path,
+                SyncManifestEntry.size,
+                SyncManifestEntry.mod_time,
+                SyncManifestEntry.hash
+            ).where(
+                SyncManifestEntry.scope == self.scope,
+                SyncManifestEntry.file_path.in_([file_info['path'] for file_info in files])
+            )
+        )
+        known = {row.file_path: row for row in result}
+        
+        changed = [file_info for file_info in files if self.is_changed(known.get(file_info['path']), file_info)]
+        self.unchanged += len(files) - len(changed)
+        for file_info in changed:
+            self._listed[file_info['path']] = file_info
+        return changed
+    
+    def file_transferred(self, file_path: str) -> int:
+        """Stage a transferred file's listed version; returns how many are staged"""
+        file_info = self._listed.pop(file_path, None)
+        if file_info:
+            self._staged[file_path] = {
+                'scope': self.scope,
+                'file_path': file_path,
+                'source_endpoint_id': self.source_endpoint_id,
+                'size': file_info['size'],
+                'mod_time': file_info.get('mod_time'),
+                'hash': file_info.get('hash'),
+            }
+        return len(self._staged)
+    
+    def file_failed(self, file_path: str):
+        """Forget a file that didn't transfer, so the next run picks it up again"""
+        self._listed.pop(file_path, None)
+    
+    async def flush(self, db):
+        """Upsert staged entries (the caller commits)"""
+        if not self._staged:
+            return
+        entries = list(self._staged.values())
+        self._staged = {}
+        stmt = insert(SyncManifestEntry).values(entries)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SyncManifestEntry.scope, SyncManifestEntry.file_path],
+            set_={
+                'size': stmt.excluded.size,
+                'mod_time': stmt.excluded.mod_time,
+                'hash': stmt.excluded.hash,
+                'synced_at': func.now(),
+            }
+        )
+        await db.execute(stmt)
+        logger.info(f"Recorded {len(entries)} transferred files in sync manifest {self.scope[:12]}")
@@ -1,8 +1,11 @@
 import asyncio
-from typing import Dict
+from typing import Dict, List, Optional
 import logging
-from datetime import datetime
+import time
+import uuid
 
+from app.core.config import settings
+from app.services.concurrency_controller import concurrency_controller
 from app.services.redis_manager import redis_manager
 from app.core.database import AsyncSessionLocal
 from app.models.endpoint import Endpoint
@@ -14,7 +17,9 @@ logger = logging.getLogger(__name__)
 class ThrottleController:
     """
     Controls concurrent transfer limits per endpoint.
-    Uses Redis for distributed counting across multiple workers.
+    Uses leased Redis slots shared by all workers, with FIFO waiters.
+    max_concurrent_transfers is the ceiling; with ADAPTIVE_CONCURRENCY the
+    limit actually enforced is the one concurrency_controller has learned.
     """
     
     def __init__(self):
@@ -32,62 +37,141 @@ class ThrottleController:
                 
         logger.info(f"Loaded throttle limits for {len(self.endpoint_limits)} endpoints")
     
-    async def acquire_slot(self, endpoint_id: str, timeout: int = 30) -> bool:
+    async def _get_ceilings(self, endpoint_ids: List[str]) -> Dict[str, int]:
+        """Get configured limits for endpoints (duplicates collapsed), reloading limits if unknown"""
+        if any(endpoint_id not in self.endpoint_limits for endpoint_id in endpoint_ids):
+            # Reload limits if endpoint not found
+            await self.load_endpoint_limits()
+        # Default to 5
+        return {endpoint_id: self.endpoint_limits.get(endpoint_id, 5) for endpoint_id in endpoint_ids}
+    
+    async def _get_limits(self, endpoint_ids: List[str]) -> Dict[str, int]:
+        """Get the slot limits to enforce for endpoints (adaptive, capped by the configured ones)"""
+        return await concurrency_controller.effective_limits(await self._get_ceilings(endpoint_ids))
+    
+    async def acquire_slot(
+        self,
+        endpoint_id: str,
+        timeout: Optional[float] = 30,
+        holder_id: Optional[str] = None
+    ) -> Optional[str]:
+        """Acquire a leased transfer slot for one endpoint (see acquire_slots)"""
+        return await self.acquire_slots([endpoint_id], timeout=timeout, holder_id=holder_id)
+    
+    async def acquire_slots(
+        self,
+        endpoint_ids: List[str],
+        timeout: Optional[float] = 30,
+        holder_id: Optional[str] = None
+    ) -> Optional[str]:
         """
-        Try to acquire a transfer slot for an endpoint.
+        Acquire a leased transfer slot on every endpoint at once.
+        
+        Slots are taken all or nothing, so a holder never sits on one endpoint
+        while waiting for another and two transfers can't deadlock. An endpoint
+        listed twice (source == destination) takes a single slot. Waiters queue
+        in FIFO order by a global ticket and are woken by releases rather than
+        polling. Leases expire unless renewed with renew_slots, so slots held by
+        a crashed worker come back on their own.
         
         Args:
-            endpoint_id: The endpoint to acquire a slot for
-            timeout: Maximum time to wait for a slot (seconds)
+            endpoint_ids: The endpoints to acquire slots for
+            timeout: Maximum time to wait for the slots (seconds), None to wait forever
+            holder_id: Holder ID to use, generated if not given
             
         Returns:
-            True if slot acquired, False if timeout
+            The holder ID if the slots were acquired, None on timeout
         """
-        # Get limit for endpoint
-        limit = self.endpoint_limits.get(endpoint_id)
-        if limit is None:
-            # Reload limits if endpoint not found
-            await self.load_endpoint_limits()
-            limit = self.endpoint_limits.get(endpoint_id, 5)  # Default to 5
-        
-        start_time = datetime.utcnow()
+        limits = await self._get_limits(endpoint_ids)
+        holder_id = holder_id or uuid.uuid4().hex
+        deadline = None if timeout is None else time.monotonic() + timeout
+        poll = settings.SLOT_WAIT_POLL_INTERVAL
         
-        while (datetime.utcnow() - start_time).total_seconds() < timeout:
-            # Get current count
-            current = await redis_manager.get_endpoint_counter(endpoint_id)
-            
-            if current < limit:
-                # Try to increment
-                new_count = await redis_manager.increment_endpoint_counter(endpoint_id)
+        try:
+            while True:
+                if await redis_manager.try_acquire_endpoint_slots(
+                    limits, holder_id, settings.SLOT_LEASE_SECONDS, poll * 3
+                ):
+                    logger.info(f"Acquired slots for endpoints {list(limits)} as {holder_id}")
+                    return holder_id
                 
-                # Check if we got the slot (handle race condition)
-                if new_count <= limit:
-                    logger.info(f"Acquired slot for endpoint {endpoint_id}: {new_count}/{limit}")
-                    return True
-                else:
-                    # Over limit, decrement back
-                    await redis_manager.decrement_endpoint_counter(endpoint_id)
-            
-            # Wait before retry
-            await asyncio.sleep(1)
+                remaining = poll if deadline is None else deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # A release wakes us; the poll interval only covers holders that died
+                await redis_manager.wait_for_slot_wakeup(holder_id, timeout=min(remaining, poll))
+        except BaseException:
+            await redis_manager.cancel_endpoint_slot_wait(list(limits), holder_id)
+            raise
         
-        logger.warning(f"Timeout acquiring slot for endpoint {endpoint_id}")
-        return False
+        await redis_manager.cancel_endpoint_slot_wait(list(limits), holder_id)
+        logger.warning(f"Timeout acquiring slots for endpoints {list(limits)}")
+        return None
     
-    async def release_slot(self, endpoint_id: str):
-        """Release a transfer slot for an endpoint"""
-        count = await redis_manager.decrement_endpoint_counter(endpoint_id)
-        logger.info(f"Released slot for endpoint {endpoint_id}: {count} remaining")
+    async def renew_slots(self, endpoint_ids: List[str], holder_id: str) -> bool:
+        """Extend slot leases; returns False if any lease had already expired"""
+        endpoint_ids = list(dict.fromkeys(endpoint_ids))
+        renewed = await redis_manager.renew_endpoint_slots(
+            endpoint_ids, holder_id, settings.SLOT_LEASE_SECONDS
+        )
+        if renewed < len(endpoint_ids):
+            logger.warning(f"Slot lease on endpoints {endpoint_ids} held by {holder_id} had expired")
+        return renewed == len(endpoint_ids)
+    
+    async def release_slots(self, endpoint_ids: List[str], holder_id: str):
+        """Release transfer slots and wake the next waiters and parked jobs"""
+        limits = await self._get_limits(endpoint_ids)
+        await redis_manager.release_endpoint_slots(limits, holder_id)
+        logger.info(f"Released slots for endpoints {list(limits)} held by {holder_id}")
+    
+    async def release_slot(self, endpoint_id: str, holder_id: str):
+        """Release a transfer slot for one endpoint"""
+        await self.release_slots([endpoint_id], holder_id)
+    
+    async def park_job(self, job_id: str, endpoint_ids: List[str]) -> bool:
+        """
+        Park a job on the wait list of whichever of its endpoints are full.
+        
+        The job goes back on the ready queue as soon as one of those endpoints
+        releases a slot, or after SLOT_PARK_RECHECK_SECONDS at the latest.
+        
+        Returns:
+            True if parked, False if all endpoints have room and the job should run now
+        """
+        limits = await self._get_limits(endpoint_ids)
+        parked = await redis_manager.park_job(job_id, limits, settings.SLOT_PARK_RECHECK_SECONDS)
+        if parked:
+            logger.info(f"Job {job_id} parked until endpoints {list(limits)} free a slot")
+        return parked
+    
+    async def record_success(self, endpoint_ids: List[str], bytes_transferred: int,
+                             seconds: float, streams: int = 1, measure: bool = True,
+                             rate_endpoint_ids: Optional[List[str]] = None):
+        """Feed a finished transfer to the adaptive limits of its endpoints
+        
+        Its throughput only counts for rate_endpoint_ids (default: all of them).
+        """
+        await concurrency_controller.record_success(
+            await self._get_ceilings(endpoint_ids), bytes_transferred, seconds,
+            streams=streams, measure=measure, rate_endpoint_ids=rate_endpoint_ids
+        )
+    
+    async def record_failure(self, endpoint_ids: List[str], error: Optional[str]):
+        """Feed a failed transfer to the adaptive limits of the endpoints the error came from"""
+        await concurrency_controller.record_failure(await self._get_ceilings(endpoint_ids), error)
     
     async def get_endpoint_status(self, endpoint_id: str) -> Dict[str, int]:
         """Get current status for an endpoint"""
-        current = await redis_manager.get_endpoint_counter(endpoint_id)
-        limit = self.endpoint_limits.get(endpoint_id, 5)
+        current = await redis_manager.get_endpoint_slot_count(endpoint_id)
+        ceiling = self.endpoint_limits.get(endpoint_id, 5)
+        limit = (await concurrency_controller.effective_limits({endpoint_id: ceiling}))[endpoint_id]
         
         return {
             "current": current,
             "limit": limit,
-            "available": max(0, limit - current)
+            "ceiling": ceiling,
+            "available": max(0, limit - current),
+            "waiting": await redis_manager.get_endpoint_waiter_count(endpoint_id)
         }
     
     async def get_all_endpoint_status(self) -> Dict[str, Dict[str, int]]:
@@ -99,10 +183,10 @@ class ThrottleController:
         
         return status
     
-    async def reset_endpoint_counter(self, endpoint_id: str):
-        """Reset counter for an endpoint (admin use)"""
-        await redis_manager.reset_endpoint_counter(endpoint_id)
-        logger.warning(f"Reset counter for endpoint {endpoint_id}")
+    async def reset_endpoint_slots(self, endpoint_id: str):
+        """Drop all slot leases for an endpoint (admin use)"""
+        await redis_manager.reset_endpoint_slots(endpoint_id)
+        logger.warning(f"Reset slots for endpoint {endpoint_id}")
     
     async def update_endpoint_limit(self, endpoint_id: str, new_limit: int):
         """Update the limit for an endpoint"""
@@ -111,34 +195,61 @@ class ThrottleController:
     
     async def check_can_acquire(self, endpoint_id: str) -> bool:
         """Check if a slot can be acquired without actually acquiring it"""
-        current = await redis_manager.get_endpoint_counter(endpoint_id)
-        limit = self.endpoint_limits.get(endpoint_id, 5)
+        current = await redis_manager.get_endpoint_slot_count(endpoint_id)
+        ceiling = self.endpoint_limits.get(endpoint_id, 5)
+        limit = (await concurrency_controller.effective_limits({endpoint_id: ceiling}))[endpoint_id]
         return current < limit
-    
-    async def can_start_transfer(self, source_endpoint_id: str, destination_endpoint_id: str) -> bool:
-        """Check if transfer can start for both endpoints"""
-        source_can_start = await self.check_can_acquire(source_endpoint_id)
-        dest_can_start = await self.check_can_acquire(destination_endpoint_id)
-        return source_can_start and dest_can_start
 
 
 class TransferSlot:
-    """Context manager for acquiring/releasing transfer slots"""
+    """Context manager for acquiring/releasing leased transfer slots
     
-    def __init__(self, throttle_controller: ThrottleController, endpoint_id: str):
+    Takes one slot on each given endpoint (all or nothing) and renews the
+    leases in the background for as long as they are held.
+    """
+    
+    def __init__(
+        self,
+        throttle_controller: ThrottleController,
+        *endpoint_ids: str,
+        timeout: Optional[float] = 30,
+        holder_id: Optional[str] = None
+    ):
         self.controller = throttle_controller
-        self.endpoint_id = endpoint_id
-        self.acquired = False
+        self.endpoint_ids = list(endpoint_ids)
+        self.timeout = timeout
+        self.requested_holder_id = holder_id
+        self.holder_id: Optional[str] = None
+        self._renew_task: Optional[asyncio.Task] = None
     
     async def __aenter__(self):
-        self.acquired = await self.controller.acquire_slot(self.endpoint_id)
-        if not self.acquired:
-            raise Exception(f"Failed to acquire transfer slot for endpoint {self.endpoint_id}")
+        self.holder_id = await self.controller.acquire_slots(
+            self.endpoint_ids, timeout=self.timeout, holder_id=self.requested_holder_id
+        )
+        if not self.holder_id:
+            raise Exception(f"Failed to acquire transfer slots for endpoints {self.endpoint_ids}")
+        self._renew_task = asyncio.create_task(self._renew_lease())
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.acquired:
-            await self.controller.release_slot(self.endpoint_id)
+        if self._renew_task:
+            self._renew_task.cancel()
+            try:
+                await self._renew_task
+            except asyncio.CancelledError:
+                pass
+        if self.holder_id:
+            # Shielded so a cancelled transfer still hands its slots back
+            await asyncio.shield(self.controller.release_slots(self.endpoint_ids, self.holder_id))
+    
+    async def _renew_lease(self):
+        interval = max(1, settings.SLOT_LEASE_SECONDS // 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.controller.renew_slots(self.endpoint_ids, self.holder_id)
+            except Exception as e:
+                logger.error(f"Error renewing slot leases for endpoints {self.endpoint_ids}: {e}")
 
 
 # Global instance
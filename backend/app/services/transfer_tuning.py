@@ -0,0 +1,138 @@
+"""
+rclone tuning per endpoint type and file-size class.
+
+Multi-GB masters move fastest as a few wide transfers (large S3 chunks,
+several streams per file, big buffers); thousands of small sidecar files
+as many narrow ones. A profile is picked from the listed file sizes, and
+an endpoint's config can override any of its values per size class under
+"tuning", e.g. {"tuning": {"large": {"multi_thread_streams": 16}}}.
+"""
+from statistics import median_low
+from typing import Any, Dict, List, Optional
+
+from app.models.endpoint import Endpoint
+
+# Upper size bound (bytes) of each class; the last class has none
+SIZE_CLASSES = (
+    ('small', 64 * 1024 * 1024),
+    ('medium', 1024 * 1024 * 1024),
+    ('large', None),
+)
+
+TUNING_PROFILES = {
+    's3': {
+        'small': {'transfers': 32, 'multi_thread_streams': 1, 'buffer_size': '4M',
+                  's3_chunk_size': '5M', 's3_upload_concurrency': 2},
+        'medium': {'transfers': 16, 'multi_thread_streams': 4, 'buffer_size': '16M',
+                   's3_chunk_size': '16M', 's3_upload_concurrency': 4},
+        'large': {'transfers': 4, 'multi_thread_streams': 8, 'buffer_size': '64M',
+                  's3_chunk_size': '64M', 's3_upload_concurrency': 16},
+    },
+    'local': {
+        'small': {'transfers': 16, 'multi_thread_streams': 1, 'buffer_size': '4M'},
+        'medium': {'transfers': 8, 'multi_thread_streams': 4, 'buffer_size': '16M'},
+        'large': {'transfers': 4, 'multi_thread_streams': 4, 'buffer_size': '32M'},
+    },
+    'smb': {
+        'small': {'transfers': 8, 'multi_thread_streams': 1, 'buffer_size': '4M'},
+        'medium': {'transfers': 4, 'multi_thread_streams': 2, 'buffer_size': '16M'},
+        'large': {'transfers': 2, 'multi_thread_streams': 4, 'buffer_size': '32M'},
+    },
+    'sftp': {
+        'small': {'transfers': 8, 'multi_thread_streams': 1, 'buffer_size': '4M'},
+        'medium': {'transfers': 4, 'multi_thread_streams': 2, 'buffer_size': '16M'},
+        'large': {'transfers': 2, 'multi_thread_streams': 4, 'buffer_size': '32M'},
+    },
+    'default': {
+        'small': {'transfers': 8, 'multi_thread_streams': 1, 'buffer_size': '4M'},
+        'medium': {'transfers': 4, 'multi_thread_streams': 4, 'buffer_size': '16M'},
+        'large': {'transfers': 2, 'multi_thread_streams': 4, 'buffer_size': '16M'},
+    },
+}
+
+# Profile keys and the rclone flags they become ('transfers' is passed by the caller)
+RCLONE_FLAGS = {
+    'multi_thread_streams': '--multi-thread-streams',
+    'buffer_size': '--buffer-size',
+    's3_chunk_size': '--s3-chunk-size',
+    's3_upload_concurrency': '--s3-upload-concurrency',
+}
+
+# Transfer-wide options the rcd accepts in a call's _config
+RC_CONFIG_KEYS = {
+    'multi_thread_streams': 'MultiThreadStreams',
+    'buffer_size': 'BufferSize',
+}
+
+# Limited by the weaker endpoint rather than taken from the destination
+SHARED_LIMITS = ('transfers', 'multi_thread_streams')
+
+
+class TransferTuning:
+    """Picks rclone options for a transfer from its endpoints and file sizes"""
+
+    @staticmethod
+    def size_class(size: int) -> str:
+        """The size class of a file"""
+        for name, limit in SIZE_CLASSES:
+            if limit is None or size < limit:
+                return name
+        return SIZE_CLASSES[-1][0]
+
+    def profile(self, endpoint: Endpoint, size_class: str) -> Dict[str, Any]:
+        """An endpoint's profile for a size class, with its config overrides applied"""
+        profiles = TUNING_PROFILES.get(endpoint.type.value, TUNING_PROFILES['default'])
+        overrides = ((endpoint.config or {}).get('tuning') or {}).get(size_class) or {}
+        return {**profiles[size_class], **overrides}
+
+    def for_pair(self, source: Endpoint, dest: Endpoint, size_class: str) -> Dict[str, Any]:
+        """Options for copying files of one size class between two endpoints
+
+        Destination values win (they decide how uploads are chunked), except
+        parallelism, which neither endpoint's profile may exceed.
+        """
+        source_profile = self.profile(source, size_class)
+        dest_profile = self.profile(dest, size_class)
+        tuning = {**source_profile, **dest_profile}
+        for key in SHARED_LIMITS:
+            limits = [p[key] for p in (source_profile, dest_profile) if key in p]
+            if limits:
+                tuning[key] = min(limits)
+        return tuning
+
+    def for_files(self, source: Endpoint, dest: Endpoint, sizes: List[int]) -> Dict[str, Any]:
+        """Options for one rclone invocation copying files of the given sizes
+
+        Per-file options (streams, chunks, buffers) follow the largest file
+        so it can saturate the link; how many files run at once follows the
+        typical one, so a batch of small files still fans out.
+        """
+        if not sizes:
+            return self.for_pair(source, dest, 'medium')
+        tuning = self.for_pair(source, dest, self.size_class(max(sizes)))
+        typical = self.for_pair(source, dest, self.size_class(median_low(sizes)))
+        if 'transfers' in typical:
+            tuning['transfers'] = typical['transfers']
+        return tuning
+
+    @staticmethod
+    def rclone_args(tuning: Optional[Dict[str, Any]]) -> List[str]:
+        """rclone command line flags for a tuning"""
+        args = []
+        for key, flag in RCLONE_FLAGS.items():
+            if tuning and tuning.get(key) is not None:
+                args.extend([flag, str(tuning[key])])
+        return args
+
+    @staticmethod
+    def rc_config(tuning: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """rcd _config entries for a tuning (backend options like S3 chunks can't be set per call)"""
+        return {
+            rc_key: tuning[key]
+            for key, rc_key in RC_CONFIG_KEYS.items()
+            if tuning and tuning.get(key) is not None
+        }
+
+
+# Global instance
+transfer_tuning = TransferTuning()
@@ -2,7 +2,11 @@
 """
 Initialize the database by creating all tables.
 Run this before starting the application for the first time.
+
+With --upgrade, existing tables and data are kept: missing tables are
+created and columns added since the database was set up are added.
 """
+import argparse
 import asyncio
 import sys
 from pathlib import Path
@@ -10,7 +14,7 @@ from pathlib import Path
 # Add parent directory to path so we can import our app
 sys.path.append(str(Path(__file__).parent))
 
-from app.core.database import engine, Base
+from app.core.database import engine, Base, upgrade_schema
 
 async def init_database():
     """Create all database tables"""
@@ -31,5 +35,20 @@ async def init_database():
     print("- transfer_templates")
     print("- settings")
 
+async def upgrade_database():
+    """Create missing tables and add missing columns, keeping all data"""
+    print("Upgrading database tables...")
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await upgrade_schema(conn)
+    
+    print("Database tables upgraded successfully!")
+
 if __name__ == "__main__":
-    asyncio.run(init_database())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create (or upgrade) the database tables")
+    parser.add_argument("--upgrade", action="store_true", help="Keep existing data and only add what is missing")
+    if parser.parse_args().upgrade:
+        asyncio.run(upgrade_database())
+    else:
+        asyncio.run(init_database())
\ No newline at end of file
@@ -152,7 +152,8 @@ async def test_worker_config():
     processor = JobProcessor()
     
     # Test SMB configuration
-    smb_config = await processor._configure_endpoint(smb_endpoint, "smb_remote")
+    smb_remote = await processor._configure_endpoint(smb_endpoint)
+    smb_config = processor.rclone_service.remotes_config[smb_remote]
     print(f"\nSMB Config: {smb_config}")
     assert smb_config['type'] == 'smb'
     assert smb_config['host'] == '192.168.1.100'
@@ -161,7 +162,8 @@ async def test_worker_config():
     assert smb_config['domain'] == 'WORKGROUP'
     
     # Test SFTP configuration
-    sftp_config = await processor._configure_endpoint(sftp_endpoint, "sftp_remote")
+    sftp_remote = await processor._configure_endpoint(sftp_endpoint)
+    sftp_config = processor.rclone_service.remotes_config[sftp_remote]
     print(f"SFTP Config: {sftp_config}")
     assert sftp_config['type'] == 'sftp'
     assert sftp_config['host'] == 'sftp.example.com'
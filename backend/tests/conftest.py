@@ -96,6 +96,17 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     await redis_manager.disconnect()
 
 
+@pytest_asyncio.fixture(scope="function")
+async def fake_redis_manager(monkeypatch):
+    """The global redis_manager backed by an in-memory Redis (Lua scripts included)."""
+    import fakeredis
+    
+    fake = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    monkeypatch.setattr(redis_manager, "redis", fake)
+    yield redis_manager
+    await fake.aclose()
+
+
 @pytest.fixture
 def test_data_dir(tmp_path):
     """Create temporary directory for test data."""
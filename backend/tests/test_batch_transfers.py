@@ -0,0 +1,133 @@
+"""Tests for how batch transfer results are applied to each file"""
+import contextlib
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import worker
+from app.core.config import settings
+from app.models.endpoint import EndpointType
+from app.models.transfer import TransferStatus
+from app.services.bandwidth_governor import bandwidth_governor
+from app.services.throttle_controller import ThrottleController
+from worker import JobProcessor
+
+
+def make_job():
+    source, dest = (
+        SimpleNamespace(id=endpoint_id, type=EndpointType.SMB, config={}, max_concurrent_transfers=None)
+        for endpoint_id in ("src", "dst")
+    )
+    return SimpleNamespace(
+        id="job-1", source_endpoint=source, destination_endpoint=dest, source_endpoint_id="src",
+        destination_endpoint_id="dst", source_path="/in", destination_path="/out",
+        delete_source_after_transfer=False
+    )
+
+
+def make_transfer(name):
+    return SimpleNamespace(
+        id=f"t-{name}", file_name=name, file_path=name, file_size=10, server_side=True,
+        status=TransferStatus.PENDING, started_at=None, destination_path=None
+    )
+
+
+@pytest.fixture
+def batch(monkeypatch, tmp_path):
+    """A processor whose batch rclone run exits with batch.process.returncode"""
+    processor = JobProcessor()
+    processor._configure_endpoint = AsyncMock(return_value="remote")
+    processor._build_remote_path = Mock(side_effect=lambda remote, endpoint, base, path: f"{remote}:{base}")
+    processor.throttle_controller = Mock(record_failure=AsyncMock(), record_success=AsyncMock())
+
+    @contextlib.asynccontextmanager
+    async def two_slots(job, key, wanted):
+        yield min(wanted, 2)
+
+    @contextlib.asynccontextmanager
+    async def no_limits(*args):
+        yield SimpleNamespace(rate=None)
+
+    processor._transfer_slots = two_slots
+    processor._bandwidth_allocation = no_limits
+
+    process = Mock(stdout=None, stderr=None, returncode=0, wait=AsyncMock())
+    work_dir = tmp_path / "batch"
+    work_dir.mkdir()
+    processor.rclone_service.start_batch_transfer = AsyncMock(return_value=(process, str(work_dir)))
+    monkeypatch.setattr(worker, "stats_counters", Mock(record_transfers=AsyncMock()))
+
+    db = Mock(commit=AsyncMock())
+    failures = {}
+
+    async def record_failure(transfer, error, commit=True):
+        failures[transfer.file_name] = str(error)
+
+    async def run(transfers):
+        return await processor._execute_batch_transfers(db, make_job(), transfers, AsyncMock(), record_failure)
+
+    return SimpleNamespace(processor=processor, process=process, db=db, failures=failures, run=run)
+
+
+class TestBatchTransferResults:
+    """Test the error each file of a batch is failed with"""
+
+    @pytest.mark.asyncio
+    async def test_failed_run_without_report_fails_files_with_rclone_error(self, batch):
+        batch.process.returncode = 1
+
+        await batch.run([make_transfer("a.mp4"), make_transfer("b.mp4")])
+
+        assert batch.failures == {
+            "a.mp4": "rclone exited with code 1", "b.mp4": "rclone exited with code 1"
+        }
+
+    @pytest.mark.asyncio
+    async def test_clean_run_reports_unlisted_files_missing(self, batch):
+        await batch.run([make_transfer("a.mp4")])
+
+        assert batch.failures == {"a.mp4": "File not found at source: a.mp4"}
+
+    @pytest.mark.asyncio
+    async def test_unreadable_report_fails_the_group(self, batch):
+        batch.processor.rclone_service.read_batch_report = Mock(side_effect=OSError("disk full"))
+
+        await batch.run([make_transfer("a.mp4"), make_transfer("b.mp4")])
+
+        assert batch.failures == {"a.mp4": "disk full", "b.mp4": "disk full"}
+        batch.db.commit.assert_awaited()
+
+    @pytest.mark.asyncio
+    async def test_rclone_runs_only_as_many_transfers_as_slots_held(self, batch):
+        await batch.run([make_transfer(f"{name}.mp4") for name in "abcd"])
+
+        assert batch.processor.rclone_service.start_batch_transfer.call_args.kwargs["transfers"] == 2
+
+
+class TestBatchSlots:
+    """Test that a batch holds one slot and bandwidth share per file it copies at once"""
+
+    @pytest.mark.asyncio
+    async def test_takes_the_free_slots_up_to_the_streams_wanted(self, fake_redis_manager, monkeypatch):
+        monkeypatch.setattr(settings, "ADAPTIVE_CONCURRENCY", False)
+        processor = JobProcessor()
+        processor.throttle_controller = ThrottleController()
+        processor.throttle_controller.endpoint_limits = {"src": 3, "dst": 2}
+
+        async with processor._transfer_slots(make_job(), "batch:a", 4) as held:
+            assert held == 2
+            assert await fake_redis_manager.get_endpoint_slot_count("src") == 2
+            assert await fake_redis_manager.get_endpoint_slot_count("dst") == 2
+
+        assert await fake_redis_manager.get_endpoint_slot_count("dst") == 0
+
+    @pytest.mark.asyncio
+    async def test_bandwidth_is_shared_per_stream(self, fake_redis_manager):
+        budgets = {"dst": 300}
+        assert await bandwidth_governor.get_share(budgets, "single") == 300
+
+        assert await bandwidth_governor.get_share(budgets, "batch", streams=2) == 200
+        assert await bandwidth_governor.get_share(budgets, "single") == 100
+
+        await bandwidth_governor.release(budgets, "batch", streams=2)
+        assert await bandwidth_governor.get_share(budgets, "single") == 300
@@ -0,0 +1,81 @@
+"""Tests for dispatching chain jobs while the parent job runs"""
+import contextlib
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import worker
+from app.models.job import JobStatus
+from worker import JobProcessor
+
+
+@pytest.fixture
+def chain_session(monkeypatch):
+    """The session chain jobs are created in, and the Redis queue they go on"""
+    session = Mock()
+    session.add = Mock()
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+
+    @contextlib.asynccontextmanager
+    async def session_factory():
+        yield session
+
+    monkeypatch.setattr(worker, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(worker.redis_manager, "enqueue_jobs", AsyncMock())
+    return session
+
+
+def make_parent_job():
+    return SimpleNamespace(
+        id="parent-1", name="Parent", destination_endpoint_id="dst",
+        config={"chain_rules": [{"endpoint_id": "backup", "path_template": "/backup"}], "chain_mode": "grouped"}
+    )
+
+
+def make_transfer(name):
+    return SimpleNamespace(
+        id=f"t-{name}", file_name=name, file_size=1, fingerprint=None, destination_path=f"dst:/out/{name}"
+    )
+
+
+class TestChainDispatch:
+    """Test creating and queueing chain jobs in their own session"""
+
+    @pytest.mark.asyncio
+    async def test_dispatched_chain_jobs_are_queued(self, chain_session):
+        assert await JobProcessor()._dispatch_chain_jobs(make_parent_job(), [make_transfer("a.mp4")])
+
+        [chain_job] = [call.args[0] for call in chain_session.add.call_args_list]
+        assert chain_job.status == JobStatus.QUEUED
+        worker.redis_manager.enqueue_jobs.assert_awaited_once_with([chain_job.id])
+
+    @pytest.mark.asyncio
+    async def test_failed_dispatch_rolls_back_its_own_session(self, chain_session):
+        chain_session.commit.side_effect = RuntimeError("database down")
+
+        assert not await JobProcessor()._dispatch_chain_jobs(make_parent_job(), [make_transfer("a.mp4")])
+
+        chain_session.rollback.assert_awaited()
+        worker.redis_manager.enqueue_jobs.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_held_fanout_chain_jobs_are_not_queued(self, chain_session):
+        parent_job = make_parent_job()
+        parent_job.source_endpoint_id, parent_job.source_path = "src", "/ingest"
+        rows = [{"id": "t-a", "file_name": "a.mp4", "file_path": "a.mp4", "file_size": 1}]
+
+        [chain_job] = await JobProcessor()._dispatch_fanout_chain_jobs(parent_job, rows, queue=False)
+
+        assert chain_job.status == JobStatus.PENDING
+        worker.redis_manager.enqueue_jobs.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_releasing_held_chain_jobs_queues_only_pending_ones(self, chain_session):
+        # chain-2 was queued meanwhile, so the update only returns chain-1
+        chain_session.execute = AsyncMock(return_value=Mock(scalars=Mock(return_value=iter(["chain-1"]))))
+
+        await JobProcessor()._queue_held_chain_jobs(make_parent_job(), ["chain-1", "chain-2"])
+
+        chain_session.commit.assert_awaited_once()
+        worker.redis_manager.enqueue_jobs.assert_awaited_once_with(["chain-1"])
@@ -3,7 +3,11 @@ import pytest
 from unittest.mock import Mock, AsyncMock
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.models.job import JobStatus
+from app.models.transfer import TransferStatus
 from app.services.chain_job_service import ChainJobService
+from worker import JobProcessor
 
 
 class TestPerFileChainCreation:
@@ -139,4 +143,124 @@ class TestPerFileChainCreation:
         )
         
         assert result == []
-        db.commit.assert_not_called()
\ No newline at end of file
+        db.commit.assert_not_called()
+
+class TestGroupedChainCreation:
+    """Test one chain job per rule carrying a file manifest"""
+    
+    @pytest.mark.asyncio
+    async def test_one_job_per_rule_with_file_manifest(self):
+        """Each rule gets a single job listing every file and its parent transfer"""
+        parent_job = Mock(id="parent-123", name="Batch Job", destination_endpoint_id="endpoint-1")
+        transfers = [
+            Mock(id=f"transfer-{i}", destination_path=f"dest-remote:out/video{i}.mp4", file_size=i * 10,
+                 fingerprint=f"md5:{i}")
+            for i in range(1, 4)
+        ]
+        chain_rules = [
+            {"endpoint_id": "endpoint-2", "path_template": "/backup/{year}/{filename}"},
+            {"endpoint_id": "endpoint-3", "path_template": "/archive"}
+        ]
+        db = AsyncMock(spec=AsyncSession)
+        
+        result = await ChainJobService.create_chain_jobs(
+            parent_job, chain_rules, db, per_file_transfers=transfers, grouped=True
+        )
+        
+        assert len(result) == 2
+        job = result[0]
+        assert job.source_endpoint_id == "endpoint-1"
+        assert job.source_path == "out"
+        assert job.destination_path == "/backup/{year}/{filename}"  # Resolved per file by the worker
+        assert job.config['transfer_mode'] == 'batch'
+        assert job.config['file_manifest'] == [
+            {"name": f"video{i}.mp4", "path": f"video{i}.mp4", "size": i * 10,
+             "fingerprint": f"md5:{i}", "parent_transfer_id": f"transfer-{i}"}
+            for i in range(1, 4)
+        ]
+        assert result[1].destination_endpoint_id == "endpoint-3"
+        db.commit.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_files_in_different_directories_get_separate_jobs(self):
+        """Files are grouped by source directory so each job stays batchable"""
+        parent_job = Mock(id="parent-123", name="Batch Job", destination_endpoint_id="endpoint-1")
+        transfers = [
+            Mock(id="transfer-1", destination_path="/dest/2024/a.mp4", file_size=1),
+            Mock(id="transfer-2", destination_path="/dest/2025/b.mp4", file_size=2),
+            Mock(id="transfer-3", destination_path="/dest/2025/c.mp4", file_size=3)
+        ]
+        chain_rules = [{"endpoint_id": "endpoint-2", "path_template": "/backup"}]
+        db = AsyncMock(spec=AsyncSession)
+        
+        result = await ChainJobService.create_chain_jobs(
+            parent_job, chain_rules, db, per_file_transfers=transfers, grouped=True
+        )
+        
+        assert sorted((job.source_path, len(job.config['file_manifest'])) for job in result) == [
+            ("/dest/2024", 1), ("/dest/2025", 2)
+        ]
+
+
+class TestFanoutChainCreation:
+    """Test chain jobs that copy from the parent's source alongside it"""
+    
+    @pytest.mark.asyncio
+    async def test_chain_jobs_read_from_parent_source(self):
+        """Fan-out jobs use the parent's source and keep each file's parent transfer"""
+        parent_job = Mock(
+            id="parent-123",
+            name="Batch Job",
+            source_endpoint_id="source-endpoint",
+            source_path="/ingest",
+            destination_endpoint_id="endpoint-1",
+            config={}
+        )
+        rows = [
+            {"id": "transfer-1", "file_name": "a.mp4", "file_path": "a.mp4", "file_size": 10},
+            {"id": "transfer-2", "file_name": "b.mp4", "file_path": "sub/b.mp4", "file_size": 20,
+             "fingerprint": "md5:2"}
+        ]
+        chain_rules = [
+            {"endpoint_id": "endpoint-2", "path_template": "/backup"},
+            {"endpoint_id": "endpoint-3", "path_template": "/archive/{year}"}
+        ]
+        db = AsyncMock(spec=AsyncSession)
+        
+        result = await ChainJobService.create_fanout_chain_jobs(parent_job, chain_rules, rows, db)
+        
+        assert [job.destination_endpoint_id for job in result] == ["endpoint-2", "endpoint-3"]
+        for job in result:
+            assert job.source_endpoint_id == "source-endpoint"
+            assert job.source_path == "/ingest"
+            assert job.parent_job_id == "parent-123"
+            assert job.config['file_manifest'][1] == {
+                "name": "b.mp4", "path": "sub/b.mp4", "size": 20,
+                "fingerprint": "md5:2", "parent_transfer_id": "transfer-2"
+            }
+            assert job.config['wait_for_parent']
+        db.commit.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_files_wait_for_their_parent_transfer(self, monkeypatch):
+        """A fanned-out file is copied once its parent transfer succeeds, and failed if it doesn't"""
+        monkeypatch.setattr(settings, "CHAIN_DISPATCH_SECONDS", 0)
+        job = Mock(id="chain-1", parent_job_id="parent-123")
+        rows = [{"id": f"chain-{i}", "parent_transfer_id": f"transfer-{i}"} for i in range(1, 4)]
+        polls = [
+            [("transfer-1", TransferStatus.COMPLETED), ("transfer-2", TransferStatus.IN_PROGRESS),
+             ("transfer-3", TransferStatus.IN_PROGRESS)],
+            [("transfer-2", TransferStatus.FAILED), ("transfer-3", TransferStatus.IN_PROGRESS)],
+            [("transfer-3", TransferStatus.IN_PROGRESS)],
+        ]
+        db = AsyncMock(spec=AsyncSession)
+        # The parent stops running before transfer-3 completes
+        db.scalar.side_effect = [JobStatus.RUNNING, JobStatus.RUNNING, JobStatus.FAILED]
+        db.execute.side_effect = [Mock(all=Mock(return_value=poll)) for poll in polls]
+        
+        batches = [
+            ([row["id"] for row in ready], [row["id"] for row in failed])
+            async for ready, failed in JobProcessor()._wait_for_parent_transfers(db, job, rows)
+        ]
+        
+        assert batches == [(["chain-1"], []), ([], ["chain-2"]), ([], ["chain-3"])]
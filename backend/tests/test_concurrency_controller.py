@@ -0,0 +1,127 @@
+"""Tests for the adaptive (AIMD) endpoint concurrency controller"""
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from app.core.config import settings
+from app.services import concurrency_controller as controller_module
+from app.services.concurrency_controller import ConcurrencyController
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    manager = Mock()
+    manager.update_endpoint_concurrency = AsyncMock(return_value={})
+    manager.get_endpoint_concurrency = AsyncMock(return_value={})
+    monkeypatch.setattr(controller_module, "redis_manager", manager)
+    monkeypatch.setattr(settings, "ADAPTIVE_CONCURRENCY", True)
+    monkeypatch.setattr(settings, "AIMD_INITIAL_LIMIT", 0)
+    monkeypatch.setattr(settings, "AIMD_MIN_SAMPLE_BYTES", 1000)
+    return manager
+
+
+class TestConcurrencyController:
+    """Test limits and the samples fed to Redis"""
+
+    def test_classify_error(self):
+        assert ConcurrencyController.classify_error("SlowDown: Please reduce your request rate") == "throttled"
+        assert ConcurrencyController.classify_error("HTTP 429 Too Many Requests") == "throttled"
+        assert ConcurrencyController.classify_error("SlowDown: reduce your request rate\n\tstatus code: 503") == "throttled"
+        assert ConcurrencyController.classify_error("googleapi: Error 403: Rate Limit Exceeded") == "throttled"
+        assert ConcurrencyController.classify_error("directory not found") == "error"
+        assert ConcurrencyController.classify_error(None) == "error"
+
+    def test_network_faults_are_not_throttling(self):
+        assert ConcurrencyController.classify_error("read tcp 10.0.0.1:443: i/o timeout") == "error"
+        assert ConcurrencyController.classify_error("read: connection reset by peer") == "error"
+        assert ConcurrencyController.classify_error("dial tcp 10.0.0.1:22: connect: connection timed out") == "error"
+        assert ConcurrencyController.classify_error("context deadline exceeded") == "error"
+
+    def test_numbers_and_flags_are_not_throttling(self):
+        assert ConcurrencyController.classify_error("failed to open clip-503.mov: permission denied") == "error"
+        assert ConcurrencyController.classify_error("size mismatch: 4294 vs 429 bytes") == "error"
+        assert ConcurrencyController.classify_error("Usage: rclone copy ... --timeout duration") == "error"
+
+    def test_error_endpoints(self):
+        source, destination = {"src": "endpoint-src-"}, {"dst": "endpoint-dst-"}
+        errors = ConcurrencyController.error_endpoints
+        assert errors("endpoint-dst-1a2b:bucket/a.mp4: SlowDown", source, destination) == ["dst"]
+        assert errors("failed to open source object: 503 Service Unavailable", source, destination) == ["src"]
+        assert errors("multipart upload failed: SlowDown", source, destination) == ["dst"]
+        assert errors("connection reset by peer", source, destination) == []
+
+    @pytest.mark.asyncio
+    async def test_limits_never_exceed_the_ceiling(self, fake_redis):
+        fake_redis.get_endpoint_concurrency.return_value = {
+            "a": {"limit": "2.6"},
+            "b": {"limit": "12"},
+            "c": {"limit": "0.5"},
+        }
+
+        limits = await ConcurrencyController().effective_limits({"a": 8, "b": 4, "c": 3, "d": 5})
+
+        assert limits == {"a": 2, "b": 4, "c": 1, "d": 5}
+
+    @pytest.mark.asyncio
+    async def test_configured_limits_when_disabled_or_unavailable(self, fake_redis, monkeypatch):
+        fake_redis.get_endpoint_concurrency.side_effect = ConnectionError("redis down")
+        assert await ConcurrencyController().effective_limits({"a": 8}) == {"a": 8}
+
+        monkeypatch.setattr(settings, "ADAPTIVE_CONCURRENCY", False)
+        await ConcurrencyController().record_success({"a": 8}, 5000, 1.0)
+        fake_redis.update_endpoint_concurrency.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_throughput_is_per_stream_and_skips_small_samples(self, fake_redis):
+        controller = ConcurrencyController()
+        await controller.record_success({"a": 8}, 8000, 2.0, streams=4)
+        await controller.record_success({"a": 8}, 500, 2.0)
+        await controller.record_success({"a": 8}, 8000, 2.0, measure=False)
+
+        calls = fake_redis.update_endpoint_concurrency.await_args_list
+        assert [call.args[1:] for call in calls] == [("ok", 1000.0), ("ok", None), ("ok", None)]
+
+    @pytest.mark.asyncio
+    async def test_throughput_only_judges_the_rate_endpoints(self, fake_redis):
+        await ConcurrencyController().record_success({"local": 8, "s3": 4}, 8000, 1.0, rate_endpoint_ids=["s3"])
+
+        calls = fake_redis.update_endpoint_concurrency.await_args_list
+        assert [call.args[:3] for call in calls] == [({"s3": 4}, "ok", 8000.0), ({"local": 8}, "ok", None)]
+
+    @pytest.mark.asyncio
+    async def test_failures_are_recorded_by_kind(self, fake_redis):
+        controller = ConcurrencyController()
+        await controller.record_failure({"a": 8}, "source file not found")
+        assert fake_redis.update_endpoint_concurrency.await_args.args[:3] == ({"a": 8}, "error", None)
+
+        await controller.record_failure({"a": 8}, "503 Service Unavailable")
+        assert fake_redis.update_endpoint_concurrency.await_args.args[:3] == ({"a": 8}, "throttled", None)
+
+
+class TestConcurrencyScript:
+    """Test the AIMD step run in Redis"""
+
+    @staticmethod
+    async def step(manager, outcome, ceiling=8):
+        limits = await manager.update_endpoint_concurrency(
+            {"a": ceiling}, outcome, None, initial=0, factor=0.5, cooldown=0, drop=0.5, weight=0.2,
+            error_threshold=3
+        )
+        return limits["a"]
+
+    @pytest.mark.asyncio
+    async def test_throttling_backs_off_at_once(self, fake_redis_manager):
+        assert await self.step(fake_redis_manager, "throttled") == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_back_off_after_a_run_of_them(self, fake_redis_manager):
+        assert await self.step(fake_redis_manager, "error") == 8
+        assert await self.step(fake_redis_manager, "error") == 8
+        assert await self.step(fake_redis_manager, "error") == 4
+
+    @pytest.mark.asyncio
+    async def test_a_success_ends_the_error_run(self, fake_redis_manager):
+        await self.step(fake_redis_manager, "error")
+        await self.step(fake_redis_manager, "error")
+        assert await self.step(fake_redis_manager, "ok") == 8
+        assert await self.step(fake_redis_manager, "error") == 8
+        assert await self.step(fake_redis_manager, "error") == 8
@@ -0,0 +1,120 @@
+"""Tests for the cross-job delivery index"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.models.endpoint import EndpointType
+from app.models.transfer import TransferStatus
+from app.services.delivery_index import DeliveryIndex
+from worker import JobProcessor
+
+
+def listed(path, size=100, mod_time="2024-01-01T00:00:00Z", hash=None):
+    return {"name": path, "path": path, "size": size, "mod_time": mod_time, "hash": hash}
+
+
+def delivered(destination_path, size=100, fingerprint="mtime:2024-01-01T00:00:00Z"):
+    return SimpleNamespace(destination_path=destination_path, size=size, fingerprint=fingerprint)
+
+
+def make_job(delete_source=False, **config):
+    return SimpleNamespace(destination_endpoint_id="dst", delete_source_after_transfer=delete_source, config=config)
+
+
+class TestDeliveryIndex:
+    """Test skipping files already at their destination"""
+
+    def test_fingerprint_prefers_hash(self):
+        assert DeliveryIndex.fingerprint(listed("a", hash="md5:1")) == "md5:1"
+        assert DeliveryIndex.fingerprint(listed("a")) == "mtime:2024-01-01T00:00:00Z"
+        assert DeliveryIndex.fingerprint(listed("a", mod_time=None)) is None
+
+    def test_force_copy_and_moves_never_skip(self, monkeypatch):
+        monkeypatch.setattr(settings, "DEDUP_MAX_AGE_HOURS", 24)
+        assert DeliveryIndex.for_job(make_job()).check
+        assert not DeliveryIndex.for_job(make_job(force_copy=True)).check
+        assert not DeliveryIndex.for_job(make_job(delete_source=True)).check
+        monkeypatch.setattr(settings, "DEDUP_MAX_AGE_HOURS", 0)
+        assert DeliveryIndex.for_job(make_job()) is None
+
+    @pytest.mark.asyncio
+    async def test_only_the_same_version_counts_as_delivered(self):
+        index = DeliveryIndex("dst")
+        db = Mock()
+        db.execute = AsyncMock(return_value=[delivered("/out/same"), delivered("/out/resized", size=1)])
+
+        found = await index.find_delivered(db, [
+            ("/out/same", listed("same")),
+            ("/out/resized", listed("resized")),
+            ("/out/new", listed("new")),
+        ])
+
+        assert found == {"/out/same"}
+        assert index.skipped == 1
+
+    @pytest.mark.asyncio
+    async def test_records_only_files_that_arrived(self):
+        index = DeliveryIndex("dst", check=False)
+        db = Mock()
+        db.execute = AsyncMock()
+
+        assert await index.find_delivered(db, [("/out/a", listed("a"))]) == set()
+        db.execute.assert_not_called()
+
+        index.file_dispatched("a", "/out/a", listed("a"))
+        index.file_dispatched("b", "/out/b", listed("b"))
+        index.file_failed("b")
+        assert index.file_transferred("a", "transfer-a") == 1
+        assert index.file_transferred("b") == 1
+
+        await index.flush(db)
+        statement = db.execute.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (destination_endpoint_id, destination_path) DO UPDATE" in sql
+
+
+def make_chain_job(manifest):
+    """A grouped chain job as ChainJobService creates it"""
+    endpoint = SimpleNamespace(id="dst", type=EndpointType.LOCAL, config={"path": "/"})
+    return SimpleNamespace(
+        id="chain-job", source_endpoint=endpoint, destination_endpoint=endpoint,
+        destination_endpoint_id="dst", source_path="/out", destination_path="/backup",
+        delete_source_after_transfer=False, total_files=0, total_bytes=0,
+        config={"transfer_mode": "batch", "file_manifest": manifest}
+    )
+
+
+class TestChainDeliveries:
+    """Test that grouped chain jobs record and skip deliveries like listed jobs"""
+
+    @pytest.mark.asyncio
+    async def test_second_chain_run_skips_delivered_files(self, monkeypatch):
+        monkeypatch.setattr(settings, "DEDUP_MAX_AGE_HOURS", 24)
+        manifest = [
+            {"name": name, "path": name, "size": 100, "fingerprint": "md5:1", "parent_transfer_id": f"t-{name}"}
+            for name in ("a.mp4", "b.mp4")
+        ]
+        processor = JobProcessor()
+        processor._configure_endpoint = AsyncMock(return_value="dst-remote")
+
+        async def run_chain(already_delivered):
+            job = make_chain_job(manifest)
+            index = DeliveryIndex.for_job(job)
+            db = Mock()
+            db.execute = AsyncMock(side_effect=[already_delivered, None])
+            db.commit = AsyncMock()
+            [rows] = [chunk async for chunk in processor._create_transfer_chunks(db, job, None, index)]
+            return index, rows
+
+        # First run copies both files and remembers them for the index
+        index, rows = await run_chain([])
+        assert [row["status"] for row in rows] == [TransferStatus.PENDING] * 2
+        assert all(row["fingerprint"] == "md5:1" for row in rows)
+        assert index.file_transferred("a.mp4", rows[0]["id"]) == 1
+
+        # Re-delivering the same files skips what the first run delivered
+        index, rows = await run_chain([delivered("/backup/a.mp4", fingerprint="md5:1")])
+        assert [row["status"] for row in rows] == [TransferStatus.COMPLETED, TransferStatus.PENDING]
+        assert index.skipped == 1
@@ -0,0 +1,86 @@
+"""Tests for the per-endpoint transfer slot semaphore, run against the Redis scripts"""
+import pytest
+
+from app.core.config import settings
+from app.services.throttle_controller import ThrottleController
+
+
+async def acquire(manager, endpoint_limits, holder_id, lease_seconds=60):
+    return await manager.try_acquire_endpoint_slots(endpoint_limits, holder_id, lease_seconds, 60)
+
+
+class TestEndpointSlots:
+    """Test taking, queueing for and freeing endpoint slots"""
+
+    @pytest.mark.asyncio
+    async def test_slots_are_all_or_nothing_across_endpoints(self, fake_redis_manager):
+        manager = fake_redis_manager
+        assert await acquire(manager, {"src": 1}, "holder-a")
+
+        assert not await acquire(manager, {"src": 1, "dst": 1}, "holder-b")
+
+        # Queued for both, but holds neither
+        assert await manager.get_endpoint_slot_count("src") == 1
+        assert await manager.get_endpoint_slot_count("dst") == 0
+        assert await manager.get_endpoint_waiter_count("dst") == 1
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_served_in_ticket_order(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await acquire(manager, {"src": 1}, "holder-a")
+        assert not await acquire(manager, {"src": 1}, "holder-b")
+        assert not await acquire(manager, {"src": 1}, "holder-c")
+
+        await manager.release_endpoint_slots({"src": 1}, "holder-a")
+
+        assert not await acquire(manager, {"src": 1}, "holder-c")
+        assert await acquire(manager, {"src": 1}, "holder-b")
+        assert await manager.get_endpoint_waiter_count("src") == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_frees_its_slot(self, fake_redis_manager):
+        manager = fake_redis_manager
+        assert await acquire(manager, {"src": 1}, "holder-a", lease_seconds=-1)
+
+        assert await acquire(manager, {"src": 1}, "holder-b")
+        assert await manager.renew_endpoint_slots(["src"], "holder-a", 60) == 0
+
+    @pytest.mark.asyncio
+    async def test_same_source_and_destination_take_one_slot(self, fake_redis_manager, monkeypatch):
+        monkeypatch.setattr(settings, "ADAPTIVE_CONCURRENCY", False)
+        controller = ThrottleController()
+        controller.endpoint_limits = {"nas": 1}
+
+        holder_id = await controller.acquire_slots(["nas", "nas"], timeout=0)
+
+        assert holder_id
+        assert await fake_redis_manager.get_endpoint_slot_count("nas") == 1
+        assert await controller.acquire_slots(["nas"], timeout=0) is None
+
+        await controller.release_slots(["nas", "nas"], holder_id)
+        assert await fake_redis_manager.get_endpoint_slot_count("nas") == 0
+
+
+class TestParkedJobs:
+    """Test parking jobs on full endpoints until a slot frees up"""
+
+    @pytest.mark.asyncio
+    async def test_job_is_not_parked_while_endpoint_has_room(self, fake_redis_manager):
+        assert not await fake_redis_manager.park_job("job-1", {"src": 1}, recheck_after=60)
+
+    @pytest.mark.asyncio
+    async def test_release_moves_parked_job_to_ready_queue(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await acquire(manager, {"src": 1}, "holder-a")
+        assert await manager.park_job("job-1", {"src": 1, "dst": 1}, recheck_after=60)
+        assert await manager.redis.zrange(manager.delayed_job_queue_key, 0, -1) == ["job-1"]
+        assert await manager.get_endpoint_parked_count("src") == 1
+        assert await manager.get_endpoint_parked_count("dst") == 0
+
+        await manager.release_endpoint_slots({"src": 1}, "holder-a")
+
+        assert await manager.redis.zrange(manager.job_queue_key, 0, -1) == ["job-1"]
+        assert await manager.redis.zrange(manager.delayed_job_queue_key, 0, -1) == []
+        assert await manager.redis.hget(manager.parked_jobs_key, "job-1") is None
+        assert await manager.get_endpoint_parked_count("src") == 0
+        assert await manager.redis.llen(manager.job_doorbell_key) == 1
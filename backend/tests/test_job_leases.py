@@ -0,0 +1,102 @@
+"""Tests for leasing claimed jobs to workers, run against the Redis scripts"""
+import pytest
+
+
+async def ready_jobs(manager):
+    return await manager.redis.zrange(manager.job_queue_key, 0, -1)
+
+
+class TestClaimAndRelease:
+    """Test claiming jobs and handing them back"""
+
+    @pytest.mark.asyncio
+    async def test_claim_leases_highest_priority_job(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.enqueue_job("low", priority=5)
+        await manager.enqueue_job("high", priority=1)
+
+        assert await manager.claim_job("worker-a", lease_seconds=60) == "high"
+
+        assert await ready_jobs(manager) == ["low"]
+        assert await manager.redis.hget(manager.job_lease_owners_key, "high") == "worker-a"
+        assert await manager.redis.zscore(manager.job_leases_key, "high") is not None
+        assert await manager.redis.smembers(f"{manager.worker_jobs_prefix}worker-a") == {"high"}
+
+    @pytest.mark.asyncio
+    async def test_claim_on_empty_queue_returns_none(self, fake_redis_manager):
+        assert await fake_redis_manager.claim_job("worker-a", lease_seconds=60) is None
+
+    @pytest.mark.asyncio
+    async def test_release_drops_lease(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.enqueue_job("job-1")
+        await manager.claim_job("worker-a", lease_seconds=60)
+
+        assert await manager.release_job("job-1", "worker-a")
+
+        assert await ready_jobs(manager) == []
+        assert await manager.redis.zcard(manager.job_leases_key) == 0
+        assert await manager.redis.hget(manager.job_lease_owners_key, "job-1") is None
+        assert await manager.redis.scard(f"{manager.worker_jobs_prefix}worker-a") == 0
+
+    @pytest.mark.asyncio
+    async def test_release_with_requeue_puts_job_back(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.enqueue_job("job-1")
+        await manager.claim_job("worker-a", lease_seconds=60)
+
+        assert await manager.release_job("job-1", "worker-a", requeue=True)
+
+        assert await ready_jobs(manager) == ["job-1"]
+        assert await manager.claim_job("worker-b", lease_seconds=60) == "job-1"
+
+    @pytest.mark.asyncio
+    async def test_release_by_non_owner_is_refused(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.enqueue_job("job-1")
+        await manager.claim_job("worker-a", lease_seconds=60)
+
+        assert not await manager.release_job("job-1", "worker-b", requeue=True)
+
+        assert await ready_jobs(manager) == []
+        assert await manager.redis.hget(manager.job_lease_owners_key, "job-1") == "worker-a"
+
+
+class TestLeaseHeartbeat:
+    """Test renewing leases and reaping expired ones"""
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_requeued(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.enqueue_job("job-1")
+        assert await manager.claim_job("worker-a", lease_seconds=-1) == "job-1"
+
+        assert await manager.reap_expired_leases() == ["job-1"]
+
+        assert await ready_jobs(manager) == ["job-1"]
+        assert await manager.redis.hget(manager.job_lease_owners_key, "job-1") is None
+        assert not await manager.redis.sismember(f"{manager.worker_jobs_prefix}worker-a", "job-1")
+
+    @pytest.mark.asyncio
+    async def test_renewed_lease_is_not_reaped(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.enqueue_job("job-1")
+        await manager.claim_job("worker-a", lease_seconds=-1)
+
+        assert await manager.renew_job_leases("worker-a", ["job-1"], lease_seconds=60) == []
+        assert await manager.reap_expired_leases() == []
+
+        assert await ready_jobs(manager) == []
+        assert await manager.redis.hget(manager.job_lease_owners_key, "job-1") == "worker-a"
+
+    @pytest.mark.asyncio
+    async def test_renewal_reports_a_reaped_job_as_lost(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.enqueue_job("job-1")
+        await manager.claim_job("worker-a", lease_seconds=-1)
+        await manager.reap_expired_leases()
+        # Another worker picks the requeued job up
+        await manager.claim_job("worker-b", lease_seconds=60)
+
+        assert await manager.renew_job_leases("worker-a", ["job-1"], lease_seconds=60) == ["job-1"]
+        assert await manager.redis.hget(manager.job_lease_owners_key, "job-1") == "worker-b"
@@ -0,0 +1,29 @@
+"""Tests for the ready and delayed job queues, run against the Redis scripts"""
+import time
+
+import pytest
+
+
+class TestDelayedJobPromotion:
+    """Test moving due delayed jobs onto the ready queue"""
+
+    @pytest.mark.asyncio
+    async def test_only_due_jobs_are_promoted(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.redis.zadd(manager.delayed_job_queue_key, {"due": time.time() - 1})
+        await manager.enqueue_job("later", delay=60)
+
+        assert await manager.promote_delayed_jobs() == 1
+
+        assert await manager.redis.zrange(manager.job_queue_key, 0, -1) == ["due"]
+        assert await manager.redis.zrange(manager.delayed_job_queue_key, 0, -1) == ["later"]
+        assert await manager.redis.llen(manager.job_doorbell_key) == 1
+
+    @pytest.mark.asyncio
+    async def test_nothing_due_promotes_nothing(self, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.enqueue_job("later", delay=60)
+
+        assert await manager.promote_delayed_jobs() == 0
+        assert await manager.redis.zcard(manager.job_queue_key) == 0
+        assert await manager.get_queue_length() == 1
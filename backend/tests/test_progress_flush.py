@@ -0,0 +1,54 @@
+"""Tests for flushing live transfer progress from Redis to the transfers table"""
+import contextlib
+from datetime import datetime
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+import worker
+from worker import JobProcessor
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """The session flush_progress writes through"""
+    session = Mock(execute=AsyncMock(), commit=AsyncMock())
+
+    @contextlib.asynccontextmanager
+    async def session_factory():
+        yield session
+
+    monkeypatch.setattr(worker, "AsyncSessionLocal", session_factory)
+    return session
+
+
+class TestFlushProgress:
+    """Test the dirty-set progress flush"""
+
+    @pytest.mark.asyncio
+    async def test_flushed_progress_reaches_transfer_rows(self, fake_redis_manager, db):
+        eta = datetime(2026, 1, 1, 12, 0)
+        await fake_redis_manager.set_transfer_progress("t-1", "job-1", {
+            'bytes_transferred': 512, 'progress_percentage': 50.0, 'transfer_rate': 128.0, 'eta': eta
+        })
+
+        await JobProcessor().flush_progress()
+
+        (stmt, rows), _ = db.execute.await_args
+        assert "UPDATE transfers" in str(stmt)
+        assert rows == [{
+            'b_id': "t-1", 'b_bytes_transferred': 512, 'b_progress_percentage': 50.0,
+            'b_transfer_rate': 128.0, 'b_eta': eta
+        }]
+        db.commit.assert_awaited_once()
+        assert await fake_redis_manager.redis.scard(fake_redis_manager.dirty_progress_key) == 0
+
+    @pytest.mark.asyncio
+    async def test_unchanged_progress_is_not_flushed_again(self, fake_redis_manager, db):
+        await fake_redis_manager.set_transfer_progress("t-1", "job-1", {'bytes_transferred': 512})
+        processor = JobProcessor()
+        await processor.flush_progress()
+
+        await processor.flush_progress()
+
+        assert db.execute.await_count == 1
@@ -0,0 +1,51 @@
+"""Tests for batched polling of rcd jobs"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.rclone_service import RcJobMonitor
+
+
+class TestRcJobMonitor:
+    """Test that concurrent polls share one RC request per tick"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_polls_share_one_batch(self):
+        monitor = RcJobMonitor(interval=0.01)
+        monitor._rclone._request = AsyncMock(return_value={"results": [
+            {"finished": True, "success": True},
+            {"bytes": 10},
+            {"error": "job not found", "status": 500, "path": "job/status"},
+            {"bytes": 0},
+        ]})
+
+        first, second = await asyncio.gather(
+            monitor.poll(1, "transfer/a"),
+            monitor.poll(2, "transfer/b"),
+            return_exceptions=True
+        )
+
+        monitor._rclone._request.assert_awaited_once()
+        path, payload = monitor._rclone._request.call_args.args
+        assert path == "job/batch"
+        assert [call["_path"] for call in payload["inputs"]] == ["job/status", "core/stats"] * 2
+        assert first == ({"finished": True, "success": True}, {"bytes": 10})
+        assert isinstance(second, Exception)
+        assert "job not found" in str(second)
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_single_calls_without_batch(self):
+        monitor = RcJobMonitor(interval=0.01)
+
+        async def request(path, params=None, **kwargs):
+            if path == "job/batch":
+                raise Exception("Rclone error: 404 Not Found")
+            return {"finished": False} if path == "job/status" else {"bytes": 5}
+
+        monitor._rclone._request = AsyncMock(side_effect=request)
+
+        assert await monitor.poll(1, "transfer/a") == ({"finished": False}, {"bytes": 5})
+        assert await monitor.poll(1, "transfer/a") == ({"finished": False}, {"bytes": 5})
+        # job/batch is only tried once
+        paths = [call.args[0] for call in monitor._rclone._request.call_args_list]
+        assert paths.count("job/batch") == 1
@@ -0,0 +1,96 @@
+"""Tests for streaming rclone lsjson listings"""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.services import rclone_service
+from app.services.rclone_service import RcloneService
+
+
+def make_lsjson_process(entries, returncode=0, stderr=b""):
+    """A stand-in for `rclone lsjson` printing the given entries"""
+    process = Mock()
+    process.returncode = None
+    stdout = asyncio.StreamReader()
+    lines = ["["] + [json.dumps(entry) + "," for entry in entries[:-1]] + [json.dumps(entry) for entry in entries[-1:]] + ["]"]
+    stdout.feed_data(("\n".join(lines) + "\n").encode())
+    stdout.feed_eof()
+    process.stdout = stdout
+    process.stderr = asyncio.StreamReader()
+    process.stderr.feed_data(stderr)
+    process.stderr.feed_eof()
+
+    async def wait():
+        process.returncode = returncode
+        return returncode
+
+    process.wait = AsyncMock(side_effect=wait)
+    return process
+
+
+class TestIterFiles:
+    """Test parsing lsjson output as it streams in"""
+
+    @pytest.mark.asyncio
+    async def test_yields_files_and_skips_directories(self):
+        entries = [
+            {"Path": "a.mp4", "Name": "a.mp4", "Size": 10, "IsDir": False, "ModTime": "2024-01-01T00:00:00Z"},
+            {"Path": "sub", "Name": "sub", "Size": 0, "IsDir": True},
+            {"Path": "b.mp4", "Name": "b.mp4", "Size": 20, "IsDir": False, "Hashes": {"sha1": "bb", "md5": "aa"}},
+        ]
+        service = RcloneService()
+        await service.configure_remote("remote", {"type": "s3"})
+        with patch("asyncio.create_subprocess_exec", AsyncMock(return_value=make_lsjson_process(entries))):
+            files = [entry async for entry in service.iter_files("remote", "/data")]
+
+        assert files == [
+            {"name": "a.mp4", "path": "a.mp4", "size": 10, "is_dir": False, "mod_time": "2024-01-01T00:00:00Z", "hash": None},
+            {"name": "b.mp4", "path": "b.mp4", "size": 20, "is_dir": False, "mod_time": None, "hash": "md5:aa"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_failed_listing_raises_with_rclone_error(self):
+        process = make_lsjson_process([], returncode=3, stderr=b"ERROR : error listing: directory not found\n")
+        service = RcloneService()
+        await service.configure_remote("remote", {"type": "s3"})
+        with patch("asyncio.create_subprocess_exec", AsyncMock(return_value=process)):
+            with pytest.raises(Exception, match="directory not found"):
+                await service.list_files("remote", "/missing")
+
+
+class TestRcListFiles:
+    """Test listing through the rcd as a polled async job"""
+
+    @pytest.mark.asyncio
+    async def test_listing_runs_as_async_job(self, monkeypatch):
+        service = RcloneService()
+        service._request = AsyncMock(return_value={"jobid": 7})
+        statuses = iter([
+            {"finished": False},
+            {"finished": True, "success": True, "output": {"list": [
+                {"Path": "a.mp4", "Name": "a.mp4", "Size": 10, "IsDir": False, "ModTime": "2024-01-01T00:00:00Z"},
+            ]}},
+        ])
+        poll = AsyncMock(side_effect=lambda rc_job_id, group: (next(statuses), {}))
+        monkeypatch.setattr(rclone_service.rc_job_monitor, "poll", poll)
+
+        files = await service.rc_list_files("remote", "/in", "*.mp4")
+
+        assert [file["name"] for file in files] == ["a.mp4"]
+        path, payload = service._request.call_args_list[0].args
+        assert path == "operations/list"
+        assert payload["_async"] is True
+        assert poll.await_count == 2
+        assert poll.call_args.args[0] == 7
+        assert service._request.call_args.args == ("core/stats-delete", {"group": payload["_group"]})
+
+    @pytest.mark.asyncio
+    async def test_failed_listing_raises(self, monkeypatch):
+        service = RcloneService()
+        service._request = AsyncMock(return_value={"jobid": 7})
+        poll = AsyncMock(return_value=({"finished": True, "success": False, "error": "directory not found"}, {}))
+        monkeypatch.setattr(rclone_service.rc_job_monitor, "poll", poll)
+
+        with pytest.raises(Exception, match="directory not found"):
+            await service.rc_list_files("remote", "/missing")
@@ -0,0 +1,129 @@
+"""Tests for the streaming rclone JSON log parser"""
+import asyncio
+import json
+import pytest
+from unittest.mock import Mock
+
+from app.services.rclone_progress import (
+    RcloneOutputStream,
+    TransferProgress,
+    FileCompleted,
+    TransferError,
+    RcServing,
+    parse_log_line,
+)
+
+
+def stats_line(bytes_done, total=1000, eta=None):
+    return json.dumps({
+        "level": "info",
+        "msg": "\nTransferred: ...",
+        "stats": {
+            "bytes": bytes_done,
+            "totalBytes": total,
+            "speed": 250.5,
+            "eta": eta,
+            "transfers": 0,
+            "totalTransfers": 1,
+            "errors": 0,
+            "elapsedTime": 1.0
+        }
+    })
+
+
+def make_process(stdout_lines=(), stderr_lines=()):
+    """A stand-in for an rclone process whose pipes hold the given lines"""
+    process = Mock()
+    for name, lines in (("stdout", stdout_lines), ("stderr", stderr_lines)):
+        reader = asyncio.StreamReader()
+        for line in lines:
+            reader.feed_data((line + "\n").encode())
+        reader.feed_eof()
+        setattr(process, name, reader)
+    return process
+
+
+class TestParseLogLine:
+    """Test parsing individual rclone --use-json-log lines"""
+
+    def test_stats_line(self):
+        event = parse_log_line(stats_line(250, eta=3))
+        assert isinstance(event, TransferProgress)
+        assert event.bytes == 250
+        assert event.total_bytes == 1000
+        assert event.percentage == 25.0
+        assert event.speed == 250.5
+        assert event.eta == 3
+
+    def test_stats_without_total_has_zero_percentage(self):
+        event = parse_log_line(stats_line(0, total=0))
+        assert event.percentage == 0.0
+        assert event.eta is None
+
+    def test_file_completed(self):
+        line = json.dumps({"level": "info", "msg": "Copied (new)", "object": "a/b.mp4", "size": 42})
+        event = parse_log_line(line)
+        assert event == FileCompleted(path="a/b.mp4", message="Copied (new)", size=42)
+
+    def test_error_with_and_without_object(self):
+        event = parse_log_line(json.dumps({"level": "error", "msg": "Failed to copy: boom", "object": "x.mp4"}))
+        assert event == TransferError(message="Failed to copy: boom", path="x.mp4")
+        event = parse_log_line(json.dumps({"level": "critical", "msg": "fatal"}))
+        assert event == TransferError(message="fatal", path=None)
+
+    def test_rc_server_port(self):
+        line = json.dumps({"level": "notice", "msg": "Serving remote control on http://127.0.0.1:41234/"})
+        assert parse_log_line(line) == RcServing(port=41234)
+        line = json.dumps({"level": "notice", "msg": "Serving remote control on [http://127.0.0.1:5572/]"})
+        assert parse_log_line(line) == RcServing(port=5572)
+
+    def test_irrelevant_lines(self):
+        assert parse_log_line(json.dumps({"level": "notice", "msg": "Config file not found"})) is None
+        assert parse_log_line("Transferred: 1 / 1, 100%") is None
+        assert parse_log_line("{not json") is None
+        assert parse_log_line("") is None
+
+
+class TestRcloneOutputStream:
+    """Test reading events from both pipes of a process"""
+
+    @pytest.mark.asyncio
+    async def test_reads_events_from_both_pipes(self):
+        process = make_process(
+            stdout_lines=[json.dumps({"level": "info", "msg": "Copied (new)", "object": "a.mp4"})],
+            stderr_lines=[
+                stats_line(500),
+                "plain text line",
+                json.dumps({"level": "error", "msg": "Failed to copy", "object": "b.mp4"}),
+            ],
+        )
+        stream = RcloneOutputStream(process)
+        events = [event async for event in stream]
+
+        assert sorted(type(event).__name__ for event in events) == ["FileCompleted", "TransferError", "TransferProgress"]
+        assert stream.error_summary().splitlines() == ["plain text line", "Failed to copy"]
+
+    @pytest.mark.asyncio
+    async def test_error_tail_is_bounded(self):
+        lines = [json.dumps({"level": "error", "msg": f"error {i}"}) for i in range(25)]
+        stream = RcloneOutputStream(make_process(stderr_lines=lines), tail_lines=3)
+        events = [event async for event in stream]
+
+        assert len(events) == 25
+        assert stream.error_summary().splitlines() == ["error 22", "error 23", "error 24"]
+
+    @pytest.mark.asyncio
+    async def test_progress_is_dropped_when_consumer_falls_behind(self):
+        lines = [stats_line(i) for i in range(50)]
+        lines.append(json.dumps({"level": "info", "msg": "Copied (new)", "object": "a.mp4"}))
+        stream = RcloneOutputStream(make_process(stderr_lines=lines), max_pending=5)
+
+        events = []
+        async for event in stream:
+            events.append(event)
+            await asyncio.sleep(0.01)  # slow consumer
+
+        # File events are never dropped; stale progress is
+        assert isinstance(events[-1], FileCompleted)
+        assert stream.dropped_progress > 0
+        assert len(events) + stream.dropped_progress == 51
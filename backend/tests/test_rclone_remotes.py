@@ -0,0 +1,148 @@
+"""Tests for writing remotes to the rclone config file"""
+import hashlib
+import json
+import os
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.core.config import settings
+from app.services.rclone_service import RcloneService
+
+
+@pytest.fixture
+def rclone(monkeypatch):
+    monkeypatch.setattr(RcloneService, "_obscured_secrets", {})
+    service = RcloneService()
+    yield service
+    if service.config_file and os.path.exists(service.config_file):
+        os.remove(service.config_file)
+
+
+SMB_CONFIG = {"type": "smb", "host": "nas", "user": "media", "password": "hunter2"}
+
+
+class TestConfigureRemote:
+    """Test registering remotes"""
+
+    @pytest.mark.asyncio
+    async def test_smb_password_is_obscured(self, rclone):
+        with patch.object(RcloneService, "obscure", AsyncMock(return_value="obscured")):
+            await rclone.configure_remote("endpoint-1-abc", SMB_CONFIG)
+
+        with open(rclone.config_file) as f:
+            content = f.read()
+        assert "pass = obscured\n" in content
+        assert "hunter2" not in content
+
+    @pytest.mark.asyncio
+    async def test_unobscured_smb_password_fails_the_remote(self, rclone):
+        with patch.object(RcloneService, "obscure", AsyncMock(side_effect=Exception("rclone obscure failed: boom"))):
+            with pytest.raises(Exception, match="Cannot configure SMB remote endpoint-1-abc"):
+                await rclone.configure_remote("endpoint-1-abc", SMB_CONFIG)
+
+        assert "endpoint-1-abc" not in rclone.remotes_config
+        assert rclone.config_file is None
+
+    @pytest.mark.asyncio
+    async def test_new_config_version_replaces_the_old_remote(self, rclone):
+        old = RcloneService.remote_name_for("1", {"type": "sftp", "host": "a"})
+        new = RcloneService.remote_name_for("1", {"type": "sftp", "host": "b"})
+        other = RcloneService.remote_name_for("1-2", {"type": "sftp", "host": "a"})
+        for name, host in ((old, "a"), (other, "a"), (new, "b")):
+            await rclone.configure_remote(name, {"type": "sftp", "host": host})
+
+        assert list(rclone.remotes_config) == [other, new]
+        with open(rclone.config_file) as f:
+            assert f"[{old}]" not in f.read()
+
+    @pytest.mark.asyncio
+    async def test_old_version_stays_until_its_last_job_releases_it(self, rclone):
+        old, new = "endpoint-1-aaaaaaaaaaaa", "endpoint-1-bbbbbbbbbbbb"
+        await rclone.configure_remote(old, {"type": "sftp", "host": "a"}, user="job-1")
+        await rclone.configure_remote(new, {"type": "sftp", "host": "b"}, user="job-2")
+        # job-1 keeps using the version it started with
+        await rclone.configure_remote(old, {"type": "sftp", "host": "a"}, user="job-1")
+
+        assert list(rclone.remotes_config) == [old, new]
+
+        await rclone.release_remotes("job-1")
+
+        assert list(rclone.remotes_config) == [new]
+        with open(rclone.config_file) as f:
+            assert f"[{old}]" not in f.read()
+
+
+class TestRcRemotes:
+    """Test sharing remotes in the rcd between jobs on every worker"""
+
+    OLD, NEW = "endpoint-1-aaaaaaaaaaaa", "endpoint-1-bbbbbbbbbbbb"
+
+    @pytest.fixture
+    def rclone(self, rclone, fake_redis_manager, monkeypatch):
+        monkeypatch.setattr(RcloneService, "_rc_remotes", set())
+        rclone._request = AsyncMock(return_value={})
+        return rclone
+
+    async def lease(self, manager, job_id):
+        await manager.enqueue_job(job_id)
+        await manager.claim_job("worker-a", lease_seconds=60)
+
+    def deleted(self, rclone):
+        return [call.args[1]["name"] for call in rclone._request.call_args_list if call.args[0] == "config/delete"]
+
+    @pytest.mark.asyncio
+    async def test_unused_old_version_is_deleted(self, rclone):
+        await rclone.configure_rc_remote(self.OLD, {"type": "sftp", "host": "a"}, user="job-1")
+        await rclone.release_rc_remotes("job-1")
+        await rclone.configure_rc_remote(self.NEW, {"type": "sftp", "host": "b"}, user="job-2")
+
+        assert self.deleted(rclone) == [self.OLD]
+        assert RcloneService._rc_remotes == {self.NEW}
+
+    @pytest.mark.asyncio
+    async def test_old_version_stays_while_a_running_job_uses_it(self, rclone, fake_redis_manager):
+        await self.lease(fake_redis_manager, "job-1")
+        await rclone.configure_rc_remote(self.OLD, {"type": "sftp", "host": "a"}, user="job-1")
+        await rclone.configure_rc_remote(self.NEW, {"type": "sftp", "host": "b"}, user="job-2")
+
+        assert self.deleted(rclone) == []
+
+        await rclone.release_rc_remotes("job-1")
+
+        assert self.deleted(rclone) == [self.OLD]
+        assert await fake_redis_manager.redis.hkeys(fake_redis_manager.rc_remotes_key) == [self.NEW]
+
+    @pytest.mark.asyncio
+    async def test_jobs_of_dead_workers_do_not_hold_old_versions(self, rclone, fake_redis_manager):
+        # job-1 registered the old version but its lease is gone (worker died)
+        await rclone.configure_rc_remote(self.OLD, {"type": "sftp", "host": "a"}, user="job-1")
+        await rclone.configure_rc_remote(self.NEW, {"type": "sftp", "host": "b"}, user="job-2")
+
+        assert self.deleted(rclone) == [self.OLD]
+
+    @pytest.mark.asyncio
+    async def test_remote_being_deleted_is_created_again_once_gone(self, rclone, fake_redis_manager):
+        manager = fake_redis_manager
+        await manager.redis.hset(manager.rc_remotes_key, self.OLD, f"deleting:{time.time() - 120}")
+
+        await rclone.configure_rc_remote(self.OLD, {"type": "sftp", "host": "a"}, user="job-1")
+
+        assert rclone._request.call_args_list[0].args[0] == "config/create"
+        assert await manager.redis.smembers(f"{manager.rc_remote_users_prefix}{self.OLD}") == {"job-1"}
+
+
+class TestRemoteNames:
+    """Test naming remotes by endpoint and config version"""
+
+    def test_name_changes_with_config_but_does_not_expose_it(self, monkeypatch):
+        config = {"type": "s3", "access_key_id": "AKIA1", "secret_access_key": "secret"}
+        name = RcloneService.remote_name_for("1", config)
+
+        assert name.startswith("endpoint-1-")
+        assert name != RcloneService.remote_name_for("1", {**config, "secret_access_key": "rotated"})
+        plain_hash = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+        assert not name.endswith(plain_hash[:12])
+
+        monkeypatch.setattr(settings, "SECRET_KEY", "another-server")
+        assert RcloneService.remote_name_for("1", config) != name
@@ -0,0 +1,48 @@
+"""Tests for detecting endpoint pairs that can copy server-side"""
+from types import SimpleNamespace
+
+from app.core.database import SCHEMA_UPGRADES
+from app.models.endpoint import EndpointType
+from worker import JobProcessor
+
+
+def s3_endpoint(bucket, access_key="AKIA1", region="us-east-1"):
+    return SimpleNamespace(
+        type=EndpointType.S3,
+        config={"bucket": bucket, "access_key": access_key, "secret_key": "secret", "region": region}
+    )
+
+
+def local_endpoint(path="/"):
+    return SimpleNamespace(type=EndpointType.LOCAL, config={"path": path})
+
+
+def make_job(source, dest, source_path="", destination_path="", delete_source=False):
+    return SimpleNamespace(
+        source_endpoint=source, destination_endpoint=dest, source_path=source_path,
+        destination_path=destination_path, delete_source_after_transfer=delete_source
+    )
+
+
+class TestServerSideCopy:
+    """Test which jobs skip streaming files through the worker"""
+
+    def test_s3_buckets_of_the_same_account(self):
+        processor = JobProcessor()
+        assert processor._copies_server_side(make_job(s3_endpoint("a"), s3_endpoint("b")))
+        assert not processor._copies_server_side(make_job(s3_endpoint("a"), s3_endpoint("b", access_key="AKIA2")))
+        assert not processor._copies_server_side(make_job(s3_endpoint("a"), s3_endpoint("b", region="eu-west-1")))
+
+    def test_local_moves_within_one_filesystem(self, tmp_path):
+        processor = JobProcessor()
+        source, dest = str(tmp_path / "in"), str(tmp_path / "out/{year}")
+        assert processor._copies_server_side(make_job(local_endpoint(), local_endpoint(), source, dest, delete_source=True))
+        # Copies still read and write every byte
+        assert not processor._copies_server_side(make_job(local_endpoint(), local_endpoint(), source, dest))
+
+    def test_different_types_never_copy_server_side(self):
+        processor = JobProcessor()
+        assert not processor._copies_server_side(make_job(local_endpoint(), s3_endpoint("b"), "/in", "", True))
+
+    def test_existing_databases_get_the_server_side_column(self):
+        assert "ALTER TABLE transfers ADD COLUMN IF NOT EXISTS server_side BOOLEAN DEFAULT false" in SCHEMA_UPGRADES
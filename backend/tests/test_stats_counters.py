@@ -0,0 +1,86 @@
+"""Tests for the Redis-backed endpoint/template counters"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+from app.services import stats_counters as stats_module
+from app.services.stats_counters import StatsCounters
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    manager = Mock()
+    manager.incr_stats = AsyncMock()
+    manager.get_stats = AsyncMock(return_value={})
+    manager.take_dirty_stats = AsyncMock(return_value={})
+    monkeypatch.setattr(stats_module, "redis_manager", manager)
+    return manager
+
+
+def make_db():
+    db = Mock()
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+    db.rollback = AsyncMock()
+    return db
+
+
+class TestStatsCounters:
+    """Test accumulating and flushing counters"""
+
+    @pytest.mark.asyncio
+    async def test_transfers_count_once_per_endpoint(self, fake_redis):
+        counters = StatsCounters()
+        await counters.record_transfers(("a", "a"), 3, 300)
+        await counters.record_transfers(("a", "b"), 0, 0)
+
+        fake_redis.incr_stats.assert_awaited_once_with(
+            "endpoint", {"a": {"total_transfers": 3, "total_bytes_transferred": 300}}
+        )
+
+    @pytest.mark.asyncio
+    async def test_flush_is_one_statement_per_table(self, fake_redis):
+        fake_redis.take_dirty_stats.side_effect = [
+            {
+                "endpoint": {"a": {"total_transfers": 2}, "b": {"total_transfers": 1, "total_bytes_transferred": 5}},
+                "template": {"t": {"total_triggers": 4}},
+            },
+            {},
+        ]
+        db = make_db()
+
+        assert await StatsCounters().flush(db) == 3
+
+        assert db.execute.await_count == 2
+        endpoint_rows = db.execute.await_args_list[0].args[1]
+        assert endpoint_rows[0] == {
+            "b_id": "a", "b_total_transfers": 2, "b_failed_transfers": 0, "b_total_bytes_transferred": 0
+        }
+        db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_gives_increments_back(self, fake_redis):
+        taken = {"template": {"t": {"successful_transfers": 1}}}
+        fake_redis.take_dirty_stats.return_value = taken
+        db = make_db()
+        db.execute.side_effect = RuntimeError("database down")
+
+        with pytest.raises(RuntimeError):
+            await StatsCounters().flush(db)
+
+        db.rollback.assert_awaited_once()
+        fake_redis.incr_stats.assert_awaited_once_with("template", taken["template"])
+
+    @pytest.mark.asyncio
+    async def test_reads_include_unflushed_increments(self, fake_redis):
+        fake_redis.get_stats.return_value = {"a": {"total_transfers": 2}}
+        responses = [
+            SimpleNamespace(id="a", total_transfers=10),
+            SimpleNamespace(id="b", total_transfers=1),
+        ]
+        for response in responses:
+            response.model_copy = lambda update, r=response: SimpleNamespace(**{**vars(r), **update})
+
+        merged = await StatsCounters().merge_endpoints(responses)
+
+        assert [r.total_transfers for r in merged] == [12, 1]
@@ -0,0 +1,78 @@
+"""Tests for the incremental sync manifest"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.dialects import postgresql
+
+from app.services.sync_manifest import SyncManifest
+
+
+def listed(path, size=100, mod_time="2024-01-01T00:00:00Z", hash=None):
+    return {"name": path, "path": path, "size": size, "mod_time": mod_time, "hash": hash}
+
+
+def recorded(path, size=100, mod_time="2024-01-01T00:00:00Z", hash=None):
+    return SimpleNamespace(file_path=path, size=size, mod_time=mod_time, hash=hash)
+
+
+class TestIsChanged:
+    """Test comparing a listed file with its manifest entry"""
+
+    def test_new_file(self):
+        assert SyncManifest.is_changed(None, listed("a"))
+
+    def test_unchanged_file(self):
+        assert not SyncManifest.is_changed(recorded("a"), listed("a"))
+
+    def test_size_or_mod_time_change(self):
+        assert SyncManifest.is_changed(recorded("a"), listed("a", size=101))
+        assert SyncManifest.is_changed(recorded("a"), listed("a", mod_time="2024-01-02T00:00:00Z"))
+
+    def test_hash_compared_only_when_both_known(self):
+        assert SyncManifest.is_changed(recorded("a", hash="md5:1"), listed("a", hash="md5:2"))
+        assert not SyncManifest.is_changed(recorded("a"), listed("a", hash="md5:2"))
+
+
+class TestSyncManifest:
+    """Test filtering listings and staging transferred files"""
+
+    def make_job(self, **config):
+        return SimpleNamespace(
+            source_endpoint_id="src", source_path="/in",
+            destination_endpoint_id="dst", destination_path="/out",
+            config=config
+        )
+
+    def test_only_incremental_jobs_have_a_manifest(self):
+        assert SyncManifest.for_job(self.make_job()) is None
+        manifest = SyncManifest.for_job(self.make_job(sync_mode="incremental"))
+        assert manifest.scope == SyncManifest.scope_for(self.make_job())
+        assert manifest.scope != SyncManifest.scope_for(
+            SimpleNamespace(**{**vars(self.make_job()), "destination_path": "/elsewhere"})
+        )
+
+    @pytest.mark.asyncio
+    async def test_filters_unchanged_files_and_stages_only_successes(self):
+        manifest = SyncManifest("scope", "src")
+        db = Mock()
+        db.execute = AsyncMock(return_value=[recorded("same"), recorded("grown", size=1)])
+
+        changed = await manifest.filter_changed(db, [listed("same"), listed("grown"), listed("new")])
+
+        assert [file_info["path"] for file_info in changed] == ["grown", "new"]
+        assert manifest.unchanged == 1
+
+        assert manifest.file_transferred("grown") == 1
+        manifest.file_failed("new")
+        assert manifest.file_transferred("new") == 1  # failed files are never recorded
+
+        db.execute.reset_mock()
+        await manifest.flush(db)
+        statement = db.execute.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (scope, file_path) DO UPDATE" in sql
+
+        # Nothing left to write
+        db.execute.reset_mock()
+        await manifest.flush(db)
+        db.execute.assert_not_called()
@@ -0,0 +1,46 @@
+"""Tests for rclone tuning by endpoint type and file size"""
+from types import SimpleNamespace
+
+from app.models.endpoint import EndpointType
+from app.services.transfer_tuning import TransferTuning
+
+GB = 1024 * 1024 * 1024
+
+
+def endpoint(endpoint_type, **config):
+    return SimpleNamespace(type=endpoint_type, config=config)
+
+
+class TestTransferTuning:
+    """Test picking and overriding tuning profiles"""
+
+    def test_size_classes(self):
+        assert TransferTuning.size_class(1024) == "small"
+        assert TransferTuning.size_class(100 * 1024 * 1024) == "medium"
+        assert TransferTuning.size_class(5 * GB) == "large"
+
+    def test_large_files_to_s3_get_wide_uploads(self):
+        tuning = TransferTuning().for_files(endpoint(EndpointType.LOCAL), endpoint(EndpointType.S3), [5 * GB])
+
+        assert tuning["s3_chunk_size"] == "64M"
+        assert tuning["s3_upload_concurrency"] == 16
+        # Parallelism is capped by the weaker endpoint
+        assert tuning["multi_thread_streams"] == 4
+        args = TransferTuning.rclone_args(tuning)
+        assert args[args.index("--s3-chunk-size") + 1] == "64M"
+        assert "--transfers" not in args
+
+    def test_mixed_batch_streams_for_the_largest_file_and_fans_out_for_the_rest(self):
+        sizes = [10 * 1024] * 50 + [5 * GB]
+        tuning = TransferTuning().for_files(endpoint(EndpointType.S3), endpoint(EndpointType.S3), sizes)
+
+        assert tuning["multi_thread_streams"] == 8
+        assert tuning["transfers"] == 32
+
+    def test_endpoint_config_overrides_a_size_class(self):
+        dest = endpoint(EndpointType.SMB, tuning={"large": {"buffer_size": "128M", "transfers": 1}})
+        tuning = TransferTuning().for_files(endpoint(EndpointType.LOCAL), dest, [2 * GB])
+
+        assert tuning["buffer_size"] == "128M"
+        assert tuning["transfers"] == 1
+        assert TransferTuning.rc_config(tuning) == {"MultiThreadStreams": 4, "BufferSize": "128M"}
@@ -1,15 +1,23 @@
 #!/usr/bin/env python3
 """
 Background worker for processing file transfer jobs.
-This worker polls Redis for queued jobs and executes them using rclone.
+This worker blocks on the Redis job queue and executes jobs using rclone.
 """
+import argparse
 import asyncio
+import contextlib
 import logging
 import signal
 import sys
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
 import json
+import os
+import posixpath
+import shutil
+import socket
+import time
 import uuid
 
 # Add parent directory to path so we can import our app
@@ -18,13 +26,20 @@ sys.path.append(str(Path(__file__).parent))
 from app.core.database import AsyncSessionLocal
 from app.core.config import settings
 from app.services.redis_manager import redis_manager
-from app.services.rclone_service import RcloneService
-from app.services.throttle_controller import ThrottleController
+from app.services.rclone_service import RcloneService, BATCH_TUNING_DEFAULTS, rc_job_monitor
+from app.services.throttle_controller import ThrottleController, TransferSlot
+from app.services.concurrency_controller import concurrency_controller
+from app.services.bandwidth_governor import bandwidth_governor, BandwidthAllocation
+from app.services.rclone_progress import RcloneOutputStream, TransferProgress, FileCompleted, TransferError, RcServing
+from app.services.sync_manifest import SyncManifest
+from app.services.delivery_index import DeliveryIndex
+from app.services.stats_counters import stats_counters
+from app.services.transfer_tuning import transfer_tuning
 from app.models.job import Job, JobStatus, JobType
 from app.models.transfer import Transfer, TransferStatus
-from app.models.endpoint import Endpoint
-from sqlalchemy import select, update
-from sqlalchemy.orm import selectinload
+from app.models.endpoint import Endpoint, EndpointType
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import make_transient_to_detached, selectinload
 
 # Configure logging
 logging.basicConfig(
@@ -34,16 +49,33 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class JobProcessor:
-    def __init__(self):
+    def __init__(self, job_concurrency: Optional[int] = None):
         self.running = False
         self.rclone_service = RcloneService()
         self.throttle_controller = ThrottleController()
         self.current_transfers = {}
         
+        # Job pool: up to job_concurrency jobs run at once as asyncio tasks
+        self.job_concurrency = max(1, job_concurrency or settings.WORKER_JOB_CONCURRENCY)
+        self.active_jobs: Dict[str, asyncio.Task] = {}
+        # Transfers within a job run in parallel but share the job's session,
+        # which only allows one operation at a time
+        self.job_db_locks: Dict[str, asyncio.Lock] = {}
+        self._stop_task: Optional[asyncio.Task] = None
+        self._promoter_task: Optional[asyncio.Task] = None
+        
+        # Claimed jobs are leased to this worker and renewed by heartbeat;
+        # jobs whose lease was reaped are being retried elsewhere
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lost_jobs: Set[str] = set()
+        self._lease_task: Optional[asyncio.Task] = None
+        self._progress_task: Optional[asyncio.Task] = None
+        self._stats_task: Optional[asyncio.Task] = None
+        
     async def start(self):
         """Start the worker process"""
         self.running = True
-        logger.info("Job processor started")
+        logger.info(f"Job processor {self.worker_id} started (job concurrency: {self.job_concurrency})")
         
         # Connect to Redis
         await redis_manager.connect()
@@ -51,37 +83,237 @@ class JobProcessor:
         # Load throttle limits
         await self.throttle_controller.load_endpoint_limits()
         
+        # Move delayed jobs onto the ready queue when they come due
+        self._promoter_task = asyncio.create_task(self._promote_delayed_jobs())
+        
+        # Heartbeat our job leases and requeue jobs from crashed workers
+        self._lease_task = asyncio.create_task(self._maintain_job_leases())
+        
+        # Write live transfer progress from Redis to Postgres in batches
+        self._progress_task = asyncio.create_task(self._flush_progress_periodically())
+        
+        # Apply endpoint/template counters accumulated in Redis to Postgres in batches
+        self._stats_task = asyncio.create_task(self._flush_stats_periodically())
+        
         # Start processing loop
         while self.running:
             try:
-                await self.process_next_job()
-                await asyncio.sleep(1)  # Small delay between polls
+                if len(self.active_jobs) >= self.job_concurrency:
+                    # Pool is full - wait for a job to finish (re-check running periodically)
+                    await asyncio.wait(
+                        list(self.active_jobs.values()),
+                        timeout=1,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    continue
+                
+                # Blocks until a job is enqueued (or the timeout passes, so we
+                # notice shutdown)
+                job_id = await redis_manager.claim_job(
+                    self.worker_id,
+                    settings.JOB_LEASE_SECONDS,
+                    timeout=settings.QUEUE_BLOCK_TIMEOUT
+                )
+                if not job_id:
+                    continue
+                
+                self._start_job_task(job_id)
             except Exception as e:
                 logger.error(f"Error in processing loop: {e}", exc_info=True)
                 await asyncio.sleep(5)  # Longer delay on error
     
     async def stop(self):
-        """Stop the worker process"""
+        """Stop the worker process
+        
+        Safe to call more than once (signal handler and main both call it);
+        every caller waits for the same shutdown to finish.
+        """
         self.running = False
+        if self._stop_task is None:
+            self._stop_task = asyncio.create_task(self._shutdown())
+        await asyncio.shield(self._stop_task)
+    
+    async def _shutdown(self):
+        """Drain running jobs, then cancel whatever is left and disconnect"""
         logger.info("Job processor stopping...")
         
+        if self._promoter_task:
+            self._promoter_task.cancel()
+        
+        # Leases keep being renewed while running jobs drain
+        if self.active_jobs:
+            logger.info(
+                f"Waiting up to {settings.WORKER_SHUTDOWN_TIMEOUT}s for "
+                f"{len(self.active_jobs)} running job(s) to finish"
+            )
+            done, pending = await asyncio.wait(
+                list(self.active_jobs.values()),
+                timeout=settings.WORKER_SHUTDOWN_TIMEOUT
+            )
+            
+            # Cancel jobs that didn't finish in time; process_job requeues them
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
         # Cancel any running transfers
         for transfer_id, task in self.current_transfers.items():
             if not task.done():
                 task.cancel()
                 logger.info(f"Cancelled transfer {transfer_id}")
         
+        if self._lease_task:
+            self._lease_task.cancel()
+        
+        if self._progress_task:
+            self._progress_task.cancel()
+        try:
+            await self.flush_progress()
+        except Exception as e:
+            logger.error(f"Error flushing transfer progress: {e}")
+        
+        if self._stats_task:
+            self._stats_task.cancel()
+        try:
+            await self.flush_stats()
+        except Exception as e:
+            logger.error(f"Error flushing statistics counters: {e}")
+        
+        await RcloneService.close_http_client()
         await redis_manager.disconnect()
         logger.info("Job processor stopped")
     
-    async def process_next_job(self):
-        """Get and process the next job from the queue"""
-        job_id = await redis_manager.dequeue_job()
-        if not job_id:
-            return
+    async def _promote_delayed_jobs(self):
+        """Promote delayed jobs (e.g. throttled retries) to the ready queue as they come due
         
-        logger.info(f"Processing job {job_id}")
+        Sleeps until the next delayed job is due, but wakes at least every
+        QUEUE_PROMOTE_INTERVAL seconds to pick up newly delayed jobs.
+        """
+        while self.running:
+            try:
+                promoted = await redis_manager.promote_delayed_jobs()
+                if promoted:
+                    logger.info(f"Promoted {promoted} delayed job(s) to the ready queue")
+                
+                wait = settings.QUEUE_PROMOTE_INTERVAL
+                next_due = await redis_manager.get_next_delayed_job_time()
+                if next_due is not None:
+                    wait = min(wait, max(next_due - time.time(), 0.05))
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error promoting delayed jobs: {e}")
+                await asyncio.sleep(5)
+    
+    async def _maintain_job_leases(self):
+        """Renew the leases on this worker's jobs and reap expired leases
         
+        Every JOB_LEASE_HEARTBEAT seconds. A job whose lease we lost (we missed
+        heartbeats long enough for another worker to reap it) is cancelled
+        here without requeueing, since it is already back on the queue.
+        """
+        while True:
+            try:
+                lost = await redis_manager.renew_job_leases(
+                    self.worker_id,
+                    list(self.active_jobs.keys()),
+                    settings.JOB_LEASE_SECONDS
+                )
+                for job_id in lost:
+                    logger.error(f"Lost lease on job {job_id}, abandoning it")
+                    self.lost_jobs.add(job_id)
+                    task = self.active_jobs.get(job_id)
+                    if task:
+                        task.cancel()
+                
+                reaped = await redis_manager.reap_expired_leases()
+                if reaped:
+                    logger.warning(f"Requeued {len(reaped)} job(s) with expired leases: {reaped}")
+                
+                await asyncio.sleep(settings.JOB_LEASE_HEARTBEAT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error maintaining job leases: {e}")
+                await asyncio.sleep(5)
+    
+    async def _flush_progress_periodically(self):
+        """Flush live transfer progress every PROGRESS_FLUSH_INTERVAL seconds"""
+        while True:
+            try:
+                await asyncio.sleep(settings.PROGRESS_FLUSH_INTERVAL)
+                await self.flush_progress()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing transfer progress: {e}")
+    
+    async def flush_progress(self):
+        """Write changed live progress from Redis to the transfers table
+        
+        Batched into one executemany UPDATE per 500 transfers. Only rows still
+        in progress are touched, so a late flush never overwrites the final
+        values written when a transfer finishes. Any worker can flush any
+        transfer; each change is taken by exactly one of them.
+        """
+        table = Transfer.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('b_id'), table.c.status == TransferStatus.IN_PROGRESS)
+            .values(
+                bytes_transferred=bindparam('b_bytes_transferred'),
+                progress_percentage=bindparam('b_progress_percentage'),
+                transfer_rate=bindparam('b_transfer_rate'),
+                eta=bindparam('b_eta')
+            )
+        )
+        while True:
+            progress = await redis_manager.take_dirty_transfer_progress(batch_size=500)
+            if not progress:
+                return
+            rows = [
+                {'b_id': transfer_id, **{f"b_{field}": value for field, value in values.items()}}
+                for transfer_id, values in progress.items()
+            ]
+            async with AsyncSessionLocal() as db:
+                await db.execute(stmt, rows)
+                await db.commit()
+            logger.debug(f"Flushed progress for {len(rows)} transfer(s)")
+    
+    async def _flush_stats_periodically(self):
+        """Flush endpoint/template counters every STATS_FLUSH_INTERVAL seconds"""
+        while True:
+            try:
+                await asyncio.sleep(settings.STATS_FLUSH_INTERVAL)
+                await self.flush_stats()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing statistics counters: {e}")
+    
+    async def flush_stats(self):
+        """Write counter increments accumulated in Redis to Postgres"""
+        async with AsyncSessionLocal() as db:
+            flushed = await stats_counters.flush(db)
+        if flushed:
+            logger.debug(f"Flushed statistics for {flushed} endpoint(s)/template(s)")
+    
+    def _start_job_task(self, job_id: str):
+        """Run a job as a background task in the job pool"""
+        task = asyncio.create_task(self.process_job(job_id))
+        self.active_jobs[job_id] = task
+        task.add_done_callback(lambda _: self.active_jobs.pop(job_id, None))
+        logger.info(f"Started job {job_id} ({len(self.active_jobs)}/{self.job_concurrency} slots in use)")
+    
+    async def process_job(self, job_id: str):
+        """Process a single job with its own database session
+        
+        The job must have been claimed by this worker; its lease is released
+        when processing ends.
+        """
+        logger.info(f"Processing job {job_id}")
         job = None  # Initialize job variable
         async with AsyncSessionLocal() as db:
             try:
@@ -100,6 +332,10 @@ class JobProcessor:
                     logger.error(f"Job {job_id} not found")
                     return
                 
+                if job.status == JobStatus.RUNNING:
+                    # Only a reaped lease puts a running job back on the queue
+                    await self._recover_interrupted_job(db, job)
+                
                 # Update job status to running
                 job.status = JobStatus.RUNNING
                 job.started_at = datetime.now(timezone.utc)
@@ -109,6 +345,17 @@ class JobProcessor:
                 # Execute the transfer
                 await self.execute_job(db, job)
                 
+            except asyncio.CancelledError:
+                if job_id in self.lost_jobs:
+                    # Already requeued by a reaper - another worker owns it now
+                    raise
+                # Worker shutting down - hand the job back to the queue
+                logger.warning(f"Job {job_id} interrupted by shutdown, requeueing")
+                if job:
+                    job.status = JobStatus.QUEUED
+                    await db.commit()
+                await redis_manager.release_job(job_id, self.worker_id, requeue=True)
+                raise
             except Exception as e:
                 logger.error(f"Error processing job {job_id}: {e}", exc_info=True)
                 if job:
@@ -116,9 +363,121 @@ class JobProcessor:
                     job.completed_at = datetime.now(timezone.utc)
                     job.failed_runs += 1
                     await db.commit()
+            finally:
+                await self._release_remotes(job_id)
+                if job_id in self.lost_jobs:
+                    self.lost_jobs.discard(job_id)
+                else:
+                    await redis_manager.release_job(job_id, self.worker_id)
+    
+    async def _recover_interrupted_job(self, db, job: Job):
+        """Clean up after a worker that died while running this job
+        
+        Transfers it left pending or in progress are marked failed; the job is
+        then run again from the start.
+        """
+        logger.warning(f"Job {job.id} was interrupted by a lost worker, re-running it")
+        await db.execute(
+            update(Transfer)
+            .where(
+                Transfer.job_id == job.id,
+                Transfer.status.in_([TransferStatus.PENDING, TransferStatus.IN_PROGRESS])
+            )
+            .values(
+                status=TransferStatus.FAILED,
+                error_message="Worker lost while transfer was running"
+            )
+        )
+        job.retry_count = (job.retry_count or 0) + 1
+        await db.commit()
+    
+    def _db_lock(self, job_id: str) -> asyncio.Lock:
+        """Get the lock serializing use of this job's database session"""
+        if job_id not in self.job_db_locks:
+            self.job_db_locks[job_id] = asyncio.Lock()
+        return self.job_db_locks[job_id]
+    
+    def _get_transfer_fan_out(self, job: Job) -> int:
+        """How many of a job's files may transfer at once
+        
+        The job's own limit (config "max_parallel_transfers", falling back to
+        JOB_MAX_PARALLEL_TRANSFERS) capped by both endpoints' max_concurrent_transfers.
+        """
+        limits = [(job.config or {}).get('max_parallel_transfers') or settings.JOB_MAX_PARALLEL_TRANSFERS]
+        for endpoint in (job.source_endpoint, job.destination_endpoint):
+            if endpoint.max_concurrent_transfers:
+                limits.append(endpoint.max_concurrent_transfers)
+        return max(1, min(limits))
+    
+    def _job_endpoint_ids(self, job: Job) -> list:
+        """Endpoints a job's transfers take throttle slots on"""
+        return [job.source_endpoint_id, job.destination_endpoint_id]
+    
+    def _rate_endpoint_ids(self, job: Job) -> list:
+        """Endpoints a job's transfer speed is put down to
+        
+        Between a local path and a network endpoint the network side sets the
+        pace, so only its adaptive limit should react to throughput. Between
+        two network endpoints (or two local paths) one sample can't tell which
+        side was slower, so both are judged by it.
+        """
+        network = [
+            endpoint.id for endpoint in (job.source_endpoint, job.destination_endpoint)
+            if endpoint.type != EndpointType.LOCAL
+        ]
+        return network or self._job_endpoint_ids(job)
+    
+    def _error_endpoint_ids(self, job: Job, error: str) -> list:
+        """Endpoints a failed transfer's error came from
+        
+        The side rclone's message points at (by remote name or wording), else
+        the side(s) throttling can come from: the network endpoint(s).
+        """
+        return concurrency_controller.error_endpoints(
+            error,
+            {job.source_endpoint_id: RcloneService.remote_name_prefix(job.source_endpoint_id)},
+            {job.destination_endpoint_id: RcloneService.remote_name_prefix(job.destination_endpoint_id)}
+        ) or self._rate_endpoint_ids(job)
+    
+    def _transfer_slot(self, job: Job, transfer_key: str, timeout: Optional[float] = None) -> TransferSlot:
+        """Slots on both of a job's endpoints, waited for as long as it takes by default"""
+        return TransferSlot(
+            self.throttle_controller,
+            *self._job_endpoint_ids(job),
+            timeout=timeout,
+            holder_id=f"{self.worker_id}:{transfer_key}"
+        )
+    
+    @contextlib.asynccontextmanager
+    async def _transfer_slots(self, job: Job, transfer_key: str, wanted: int):
+        """Up to `wanted` slots on both of a job's endpoints, yielding how many are held
+        
+        The first slot is waited for; the others are only taken while free, so
+        a batch never sits on some slots waiting for more. One slot covers one
+        file copied at a time.
+        """
+        async with contextlib.AsyncExitStack() as stack:
+            await stack.enter_async_context(self._transfer_slot(job, transfer_key))
+            held = 1
+            while held < wanted:
+                try:
+                    await stack.enter_async_context(self._transfer_slot(job, f"{transfer_key}:{held}", timeout=0))
+                except Exception:
+                    # Taken by other transfers: run with the slots already held
+                    break
+                held += 1
+            yield held
+    
+    def _bandwidth_allocation(self, transfer_key: str, budgets: Optional[Dict[str, int]],
+                              streams: int = 1) -> BandwidthAllocation:
+        """A transfer's share of its endpoints' max_bandwidth (one share per file copied at once)"""
+        return BandwidthAllocation(bandwidth_governor, budgets or {}, f"{self.worker_id}:{transfer_key}", streams)
     
     async def execute_job(self, db, job: Job):
         """Execute a job by creating and running transfers"""
+        # Fan-out chain jobs held back until their chunk's parent transfers have finished:
+        # transfer ID -> (its chunk's unfinished transfer IDs, the chunk's chain job IDs)
+        held_chain_jobs: Dict[str, tuple] = {}
         try:
             # PHASE 1: Log job configuration for tracking
             logger.info(f"[FILE_TRACKING] Starting job {job.id}:")
@@ -130,104 +489,243 @@ class JobProcessor:
             logger.info(f"[FILE_TRACKING]   Destination path: {job.destination_path}")
             logger.info(f"[FILE_TRACKING]   Parent job ID: {job.parent_job_id}")
             if job.config:
-                logger.info(f"[FILE_TRACKING]   Config: {json.dumps(job.config, indent=2)}")
-            # Check throttling
-            can_proceed = await self.throttle_controller.can_start_transfer(
-                job.source_endpoint_id,
-                job.destination_endpoint_id
-            )
-            
-            if not can_proceed:
-                logger.info(f"Job {job.id} throttled, requeueing")
-                job.status = JobStatus.QUEUED
-                await db.commit()
-                await redis_manager.enqueue_job(job.id, delay=60)  # Retry in 1 minute
-                return
-            
-            # Get list of files to transfer
-            files = await self._get_files_to_transfer(job)
-            
-            if not files:
-                logger.warning(f"No files found for job {job.id}")
-                job.status = JobStatus.COMPLETED
-                job.completed_at = datetime.now(timezone.utc)
-                job.successful_runs += 1
-                job.total_runs += 1
-                await db.commit()
+                # A chain manifest can list thousands of files; log its size only
+                config = {key: value for key, value in job.config.items() if key != 'file_manifest'}
+                if 'file_manifest' in job.config:
+                    config['file_manifest'] = f"<{len(job.config['file_manifest'])} files>"
+                logger.info(f"[FILE_TRACKING]   Config: {json.dumps(config, indent=2)}")
+            # Check throttling - park the job if either endpoint is full.
+            # Marked queued first so a release that wakes it straight away
+            # can't race with us updating the status.
+            job.status = JobStatus.QUEUED
+            await db.commit()
+            if await self.throttle_controller.park_job(job.id, self._job_endpoint_ids(job)):
+                logger.info(f"Job {job.id} throttled, parked until an endpoint slot frees up")
                 return
-            
-            # PHASE 1: Log file discovery for tracking
-            logger.info(f"[FILE_TRACKING] Job {job.id} - Found {len(files)} files to transfer:")
-            for idx, file_info in enumerate(files):
-                logger.info(f"[FILE_TRACKING]   [{idx+1}/{len(files)}] {file_info['name']} (size: {file_info['size']} bytes, path: {file_info['path']})")
-            
-            # Create transfer records
-            transfers = []
-            total_size = 0
-            for file_info in files:
-                transfer = Transfer(
-                    id=str(uuid.uuid4()),
-                    job_id=job.id,
-                    file_name=file_info['name'],
-                    file_path=file_info['path'],
-                    file_size=file_info['size'],
-                    status=TransferStatus.PENDING
-                )
-                db.add(transfer)
-                transfers.append(transfer)
-                total_size += file_info['size']
-            
-            # Update job with total files and bytes
-            job.total_files = len(files)
-            job.total_bytes = total_size
-            
+            job.status = JobStatus.RUNNING
             await db.commit()
             
-            # Execute transfers
+            # Files are listed, recorded and transferred as a pipeline: each
+            # chunk of the listing becomes Transfer rows and is handed to the
+            # transfer workers while the rest of the listing is still running
+            fan_out = self._get_transfer_fan_out(job)
+            db_lock = self._db_lock(job.id)
+            batch_mode = self._use_batch_mode(job)
+            if self._copies_server_side(job):
+                logger.info("[FILE_TRACKING]   Server-side copy: files won't pass through this worker")
+            manifest = SyncManifest.for_job(job)
+            delivery_index = DeliveryIndex.for_job(job)
+            # Streaming chains: each file's chain jobs are dispatched as soon as it lands.
+            # Fan-out: they are dispatched as files are listed and read from the source.
+            chain_dispatch = self._chain_dispatch(job)
+            chain_queue = asyncio.Queue() if chain_dispatch == 'streaming' else None
+            # Waiting fan-out chain jobs are only queued once they have files to copy,
+            # so they never hold a job slot while the parent is still copying
+            hold_fanout_chains = (job.config or {}).get('chain_fanout_wait', True) is not False
+            # Files whose chain jobs couldn't be dispatched while the job ran
+            undispatched_rows = []
+            undispatched_transfers = []
+            logger.info(f"Job {job.id} - running up to {fan_out} transfers in parallel")
+            
+            job.total_files = 0
+            job.total_bytes = 0
             success_count = 0
             transferred_size = 0
             successful_transfers = []  # PHASE 1: Track successful transfers
             failed_transfers = []      # PHASE 1: Track failed transfers
             
-            for transfer in transfers:
+            async def record_success(transfer: Transfer, commit: bool = True):
+                nonlocal success_count, transferred_size
+                success_count += 1
+                transferred_size += transfer.file_size
+                
+                # PHASE 1: Track successful transfer
+                successful_transfers.append({
+                    'file_name': transfer.file_name,
+                    'source_path': transfer.file_path,
+                    'destination_path': transfer.destination_path,
+                    'size': transfer.file_size,
+                    'transfer_id': transfer.id  # PHASE 3: Add transfer ID for chain creation
+                })
+                logger.info(f"[FILE_TRACKING] Transfer SUCCESS: {transfer.file_name} -> {transfer.destination_path}")
+                if chain_queue:
+                    chain_queue.put_nowait(transfer)
+                
+                if manifest and manifest.file_transferred(transfer.file_path) >= SyncManifest.FLUSH_SIZE:
+                    async with db_lock:
+                        await manifest.flush(db)
+                        await db.commit()
+                if (delivery_index and delivery_index.file_transferred(transfer.file_path, transfer.id)
+                        >= DeliveryIndex.FLUSH_SIZE):
+                    async with db_lock:
+                        await delivery_index.flush(db)
+                        await db.commit()
+                
+                # Update job progress (the total grows while the listing runs)
+                job.transferred_files = success_count
+                job.transferred_bytes = transferred_size
+                job.progress_percentage = int((success_count / job.total_files) * 100)
+                if commit:
+                    async with db_lock:
+                        await db.commit()
+                await transfer_finished(transfer)
+            
+            async def record_failure(transfer: Transfer, error: Exception, commit: bool = True):
+                logger.error(f"Transfer {transfer.id} failed: {error}")
+                transfer.status = TransferStatus.FAILED
+                transfer.error_message = str(error)
+                if manifest:
+                    manifest.file_failed(transfer.file_path)
+                if delivery_index:
+                    delivery_index.file_failed(transfer.file_path)
+                if commit:
+                    async with db_lock:
+                        await db.commit()
+                
+                # PHASE 1: Track failed transfer
+                failed_transfers.append({
+                    'file_name': transfer.file_name,
+                    'source_path': transfer.file_path,
+                    'destination_path': transfer.destination_path,
+                    'error': str(error)
+                })
+                logger.error(f"[FILE_TRACKING] Transfer FAILED: {transfer.file_name} - Error: {error}")
+                await transfer_finished(transfer)
+            
+            async def transfer_finished(transfer: Transfer):
+                held = held_chain_jobs.pop(transfer.id, None)
+                if held:
+                    unfinished, chain_job_ids = held
+                    unfinished.discard(transfer.id)
+                    if not unfinished:
+                        await self._queue_held_chain_jobs(job, chain_job_ids)
+            
+            async def run_transfer(transfer: Transfer):
                 try:
-                    await self._execute_transfer(db, job, transfer)
-                    success_count += 1
-                    transferred_size += transfer.file_size
-                    
-                    # PHASE 1: Track successful transfer
-                    successful_transfers.append({
-                        'file_name': transfer.file_name,
-                        'source_path': transfer.file_path,
-                        'destination_path': transfer.destination_path,
-                        'size': transfer.file_size,
-                        'transfer_id': transfer.id  # PHASE 3: Add transfer ID for chain creation
-                    })
-                    logger.info(f"[FILE_TRACKING] Transfer SUCCESS: {transfer.file_name} -> {transfer.destination_path}")
-                    
-                    # Update job progress
-                    job.transferred_files = success_count
-                    job.transferred_bytes = transferred_size
-                    job.progress_percentage = int((success_count / len(transfers)) * 100)
-                    await db.commit()
+                    # Hold a slot on both endpoints for the whole transfer
+                    async with self._transfer_slot(job, transfer.id):
+                        await self._execute_transfer(db, job, transfer)
+                except asyncio.CancelledError:
+                    raise
                 except Exception as e:
-                    logger.error(f"Transfer {transfer.id} failed: {e}")
-                    transfer.status = TransferStatus.FAILED
-                    transfer.error_message = str(e)
-                    await db.commit()
-                    
-                    # PHASE 1: Track failed transfer
-                    failed_transfers.append({
-                        'file_name': transfer.file_name,
-                        'source_path': transfer.file_path,
-                        'destination_path': transfer.destination_path,
-                        'error': str(e)
-                    })
-                    logger.error(f"[FILE_TRACKING] Transfer FAILED: {transfer.file_name} - Error: {e}")
+                    await record_failure(transfer, e)
+                else:
+                    await record_success(transfer)
+            
+            # Bounded, so the listing waits when transfers fall behind
+            pending = asyncio.Queue(maxsize=fan_out * 2)
+            
+            async def queue_transfers(rows: list):
+                if batch_mode:
+                    if rows:
+                        await pending.put(rows)
+                else:
+                    for row in rows:
+                        await pending.put(row)
+            
+            async def list_transfers():
+                async for chunk in self._create_transfer_chunks(db, job, manifest, delivery_index):
+                    if chain_dispatch == 'fanout':
+                        chain_jobs = await self._dispatch_fanout_chain_jobs(job, chunk, queue=not hold_fanout_chains)
+                        if chain_jobs is None:
+                            undispatched_rows.extend(chunk)
+                        elif hold_fanout_chains and chain_jobs:
+                            held = ({row['id'] for row in chunk}, [chain_job.id for chain_job in chain_jobs])
+                            for row in chunk:
+                                held_chain_jobs[row['id']] = held
+                    # Files already at the destination were created completed
+                    delivered = [row for row in chunk if row['status'] == TransferStatus.COMPLETED]
+                    if delivered:
+                        for transfer in await self._attach_transfers(db, job, delivered):
+                            logger.info(f"[FILE_TRACKING] Already delivered, skipping copy: {transfer.destination_path}")
+                            await record_success(transfer, commit=False)
+                        async with db_lock:
+                            await db.commit()
+                        chunk = [row for row in chunk if row['status'] != TransferStatus.COMPLETED]
+                        if not chunk:
+                            continue
+                    if (job.config or {}).get('wait_for_parent'):
+                        # Fan-out chain: only copy files whose parent transfer succeeded
+                        async for ready, failed in self._wait_for_parent_transfers(db, job, chunk):
+                            for transfer in await self._attach_transfers(db, job, failed):
+                                await record_failure(transfer, Exception("Parent transfer failed"), commit=False)
+                            if failed:
+                                async with db_lock:
+                                    await db.commit()
+                            await queue_transfers(ready)
+                    else:
+                        await queue_transfers(chunk)
+                for _ in range(fan_out):
+                    await pending.put(None)
+            
+            async def transfer_worker():
+                while (work := await pending.get()) is not None:
+                    if batch_mode:
+                        # Batch mode: one rclone process per destination directory,
+                        # several chunks at once as far as endpoint slots allow;
+                        # anything that can't be batched goes through run_transfer
+                        transfers = await self._attach_transfers(db, job, work)
+                        unbatched = await self._execute_batch_transfers(
+                            db, job, transfers, record_success, record_failure
+                        )
+                        for transfer in unbatched:
+                            await run_transfer(transfer)
+                    else:
+                        [transfer] = await self._attach_transfers(db, job, [work])
+                        await run_transfer(transfer)
+            
+            async def run_transfers():
+                try:
+                    await self._run_concurrently(list_transfers(), *(transfer_worker() for _ in range(fan_out)))
+                finally:
+                    if chain_queue:
+                        chain_queue.put_nowait(None)
+            
+            async def dispatch_chains():
+                done = False
+                while not done:
+                    # Files landing within CHAIN_DISPATCH_SECONDS of the first go out together
+                    landed = [await chain_queue.get()]
+                    deadline = time.monotonic() + settings.CHAIN_DISPATCH_SECONDS
+                    while landed[-1] is not None and len(landed) < settings.LISTING_CHUNK_SIZE:
+                        try:
+                            landed.append(await asyncio.wait_for(chain_queue.get(), deadline - time.monotonic()))
+                        except asyncio.TimeoutError:
+                            break
+                    if landed[-1] is None:
+                        done = True
+                        landed.pop()
+                    if landed:
+                        if not await self._dispatch_chain_jobs(job, landed):
+                            undispatched_transfers.extend(landed)
+            
+            try:
+                if chain_queue:
+                    await self._run_concurrently(run_transfers(), dispatch_chains())
+                else:
+                    await run_transfers()
+            finally:
+                self.job_db_locks.pop(job.id, None)
+            
+            if not job.total_files:
+                if manifest and manifest.unchanged:
+                    logger.info(f"No new or changed files for job {job.id} ({manifest.unchanged} unchanged)")
+                else:
+                    logger.warning(f"No files found for job {job.id}")
+                job.status = JobStatus.COMPLETED
+                job.completed_at = datetime.now(timezone.utc)
+                job.successful_runs += 1
+                job.total_runs += 1
+                await db.commit()
+                return
             
             # PHASE 1: Log job summary for tracking
             logger.info(f"[FILE_TRACKING] Job {job.id} Summary:")
-            logger.info(f"[FILE_TRACKING]   Total files: {len(transfers)}")
+            logger.info(f"[FILE_TRACKING]   Total files: {job.total_files}")
+            if manifest:
+                logger.info(f"[FILE_TRACKING]   Unchanged (skipped): {manifest.unchanged}")
+            if delivery_index:
+                logger.info(f"[FILE_TRACKING]   Already delivered (skipped): {delivery_index.skipped}")
             logger.info(f"[FILE_TRACKING]   Successful: {len(successful_transfers)}")
             logger.info(f"[FILE_TRACKING]   Failed: {len(failed_transfers)}")
             if successful_transfers:
@@ -235,20 +733,34 @@ class JobProcessor:
                 for idx, transfer in enumerate(successful_transfers):
                     logger.info(f"[FILE_TRACKING]     [{idx+1}] {transfer['file_name']} -> {transfer['destination_path']}")
             
+            # Chain dispatches that failed while the job ran get one more try
+            chains_dispatched = True
+            if undispatched_rows:
+                chains_dispatched = await self._dispatch_fanout_chain_jobs(job, undispatched_rows) is not None
+            if undispatched_transfers:
+                chains_dispatched = await self._dispatch_chain_jobs(job, undispatched_transfers) and chains_dispatched
+            if not chains_dispatched:
+                logger.error(f"[CHAIN_FIX] Job {job.id} - chain jobs for some files could not be created")
+            
             # Update job status
-            if success_count == len(transfers):
+            if success_count == job.total_files and chains_dispatched:
                 job.status = JobStatus.COMPLETED
                 job.completed_at = datetime.now(timezone.utc)
                 job.successful_runs += 1
                 
                 # Check for chain jobs - pass successful transfers for future use
-                await self._process_chain_jobs(db, job, successful_transfers)
+                # (streamed and fanned-out chains were dispatched as the job ran)
+                await self._process_chain_jobs(db, job, successful_transfers if chain_dispatch == 'on_completion' else None)
             else:
                 job.status = JobStatus.FAILED
                 job.completed_at = datetime.now(timezone.utc)
                 job.failed_runs += 1
             
             job.total_runs += 1
+            if manifest:
+                await manifest.flush(db)
+            if delivery_index:
+                await delivery_index.flush(db)
             await db.commit()
             
         except Exception as e:
@@ -258,18 +770,196 @@ class JobProcessor:
             job.failed_runs += 1
             job.total_runs += 1
             await db.commit()
+        finally:
+            if held_chain_jobs:
+                # Chunks whose transfers never all finished (job failed or stopped);
+                # their chain jobs fail the files whose parent transfer didn't succeed
+                chain_job_ids = {
+                    chain_job_id for _, chain_job_ids in held_chain_jobs.values() for chain_job_id in chain_job_ids
+                }
+                held_chain_jobs.clear()
+                await self._queue_held_chain_jobs(job, list(chain_job_ids))
     
-    async def _get_files_to_transfer(self, job: Job) -> list:
-        """Get list of files to transfer based on job configuration"""
+    @staticmethod
+    async def _run_concurrently(*coros):
+        """Run coroutines concurrently; if one fails, cancel the others and re-raise"""
+        tasks = [asyncio.create_task(coro) for coro in coros]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    
+    async def _create_transfer_chunks(self, db, job: Job, manifest: Optional[SyncManifest] = None,
+                                      delivery_index: Optional[DeliveryIndex] = None):
+        """List the job's files and yield their Transfer rows in committed chunks
+        
+        A chunk is cut every LISTING_CHUNK_SIZE files, or as soon as a file
+        arrives LISTING_CHUNK_SECONDS after the chunk was started, so
+        transfers begin while a large listing is still running. The job's
+        totals grow with each chunk. With a manifest, only new or changed
+        files get Transfer rows; with a delivery index, files already at the
+        destination get completed ones.
+        
+        Grouped chain jobs carry their files in config "file_manifest"; those
+        are not listed and go out as a single chunk.
+        """
+        file_manifest = (job.config or {}).get('file_manifest')
+        if file_manifest is not None:
+            files = [{'mod_time': None, 'hash': None, **entry} for entry in file_manifest]
+            logger.info(f"[FILE_TRACKING] Job {job.id} - {len(files)} files from chain manifest, skipping listing")
+            rows = await self._create_transfers(db, job, files, manifest, delivery_index)
+            if rows:
+                yield rows
+            return
+        
+        chunk = []
+        chunk_started = 0.0
+        files = self._iter_files_to_transfer(job, hashes=self._compare_hashes(job) if manifest else False)
+        try:
+            async for file_info in files:
+                if not chunk:
+                    chunk_started = time.monotonic()
+                chunk.append(file_info)
+                if (len(chunk) >= settings.LISTING_CHUNK_SIZE
+                        or time.monotonic() - chunk_started >= settings.LISTING_CHUNK_SECONDS):
+                    rows = await self._create_transfers(db, job, chunk, manifest, delivery_index)
+                    chunk = []
+                    if rows:
+                        yield rows
+            if chunk:
+                rows = await self._create_transfers(db, job, chunk, manifest, delivery_index)
+                if rows:
+                    yield rows
+        finally:
+            # Stops the listing if the job ends before it does
+            await files.aclose()
+    
+    async def _create_transfers(self, db, job: Job, files: list, manifest: Optional[SyncManifest] = None,
+                                delivery_index: Optional[DeliveryIndex] = None) -> list:
+        """Bulk insert PENDING Transfer rows for listed files
+        
+        The rows go in with one executemany INSERT and come back as plain
+        dicts; _attach_transfers turns them into session objects when they
+        are about to run, so queued files don't hold ORM instances. Files the
+        manifest has already transferred unchanged are left out; files the
+        delivery index finds at the destination are created COMPLETED.
+        """
+        if manifest:
+            async with self._db_lock(job.id):
+                listed = len(files)
+                files = await manifest.filter_changed(db, files)
+            logger.info(f"[FILE_TRACKING] Job {job.id} - {listed - len(files)} of {listed} listed files unchanged since last sync")
+            if not files:
+                return []
+        
+        created_at = datetime.now(timezone.utc)
+        parent_transfer_id = (job.config or {}).get('parent_transfer_id')
+        server_side = self._copies_server_side(job)
+        rows = []
+        # PHASE 1: Log file discovery for tracking; per file only at debug level, listings can be huge
+        log_files = logger.isEnabledFor(logging.DEBUG)
+        for file_info in files:
+            if log_files:
+                logger.debug(f"[FILE_TRACKING]   [{job.total_files + len(rows) + 1}] {file_info['name']} (size: {file_info['size']} bytes, path: {file_info['path']})")
+            # Every column is given so attached objects never need to load one
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'job_id': job.id,
+                'file_name': file_info['name'],
+                'file_path': file_info['path'],
+                'file_size': file_info['size'],
+                'fingerprint': DeliveryIndex.fingerprint(file_info),
+                'destination_path': None,
+                'parent_transfer_id': file_info.get('parent_transfer_id', parent_transfer_id),
+                'status': TransferStatus.PENDING,
+                'bytes_transferred': 0,
+                'progress_percentage': 0.0,
+                'transfer_rate': None,
+                'started_at': None,
+                'completed_at': None,
+                'eta': None,
+                'error_message': None,
+                'retry_count': 0,
+                'rclone_job_id': None,
+                'server_side': server_side,
+                'created_at': created_at,
+            })
+        
+        if delivery_index:
+            await self._check_deliveries(db, job, files, rows, delivery_index)
+        
+        chunk_bytes = sum(row['file_size'] for row in rows)
+        async with self._db_lock(job.id):
+            await db.execute(insert(Transfer), rows)
+            # Update job with total files and bytes found so far
+            job.total_files += len(rows)
+            job.total_bytes += chunk_bytes
+            await db.commit()
+        
+        logger.info(
+            f"[FILE_TRACKING] Job {job.id} - Found {len(rows)} more files ({chunk_bytes} bytes) to transfer "
+            f"({job.total_files} files, {job.total_bytes} bytes so far)"
+        )
+        return rows
+    
+    async def _check_deliveries(self, db, job: Job, files: list, rows: list, delivery_index: DeliveryIndex):
+        """Mark rows whose file is already at the destination completed; remember the rest for the index"""
+        dest_remote = await self._configure_endpoint(job.destination_endpoint, job.id)
+        dest_dirs = [self._resolve_destination_dir(job, file_info['name']) for file_info in files]
+        destination_paths = [
+            posixpath.join(dest_dir, file_info['name']) for dest_dir, file_info in zip(dest_dirs, files)
+        ]
+        
+        async with self._db_lock(job.id):
+            delivered = await delivery_index.find_delivered(db, list(zip(destination_paths, files)))
+        
+        completed_at = datetime.now(timezone.utc)
+        for row, file_info, dest_dir, destination_path in zip(rows, files, dest_dirs, destination_paths):
+            if destination_path in delivered:
+                dest_path = self._build_remote_path(dest_remote, job.destination_endpoint, dest_dir, "")
+                row.update({
+                    'status': TransferStatus.COMPLETED,
+                    'destination_path': f"{dest_path}/{row['file_name']}",
+                    'bytes_transferred': row['file_size'],
+                    'progress_percentage': 100.0,
+                    'completed_at': completed_at,
+                })
+            else:
+                delivery_index.file_dispatched(row['file_path'], destination_path, file_info)
+    
+    async def _attach_transfers(self, db, job: Job, rows: list) -> list:
+        """Session-bound Transfer objects for rows written by _create_transfers, without a SELECT"""
+        transfers = []
+        async with self._db_lock(job.id):
+            for row in rows:
+                transfer = Transfer(**row)
+                make_transient_to_detached(transfer)
+                db.add(transfer)
+                transfers.append(transfer)
+        return transfers
+    
+    @staticmethod
+    def _compare_hashes(job: Job) -> bool:
+        """Whether incremental sync compares file hashes as well as size and modification time
+        
+        Set per job with config "sync_compare": "hash". Off by default since
+        local and SMB listings have to read every file to hash it.
+        """
+        return (job.config or {}).get('sync_compare') == 'hash'
+    
+    async def _iter_files_to_transfer(self, job: Job, hashes: bool = False):
+        """Yield the files to transfer based on job configuration, as they are listed"""
         try:
             # Configure source endpoint
-            source_config = await self._configure_endpoint(job.source_endpoint, "source")
+            source_remote = await self._configure_endpoint(job.source_endpoint, job.id)
             
             # For chain jobs with specific file paths, handle differently
             if job.type == JobType.CHAINED and job.source_path and not job.file_pattern:
                 # This is a chain job for a specific file
                 # Extract directory and filename
-                import os
                 dir_path = os.path.dirname(job.source_path)
                 file_name = os.path.basename(job.source_path)
                 
@@ -278,28 +968,50 @@ class JobProcessor:
                     dir_path = ""
                 
                 # List files in the directory and filter for the specific file
-                files = await self.rclone_service.list_files(
-                    remote_name="source",
-                    path=dir_path,
-                    pattern=file_name  # Use the specific filename as pattern
-                )
+                path, pattern = dir_path, file_name  # Use the specific filename as pattern
             else:
                 # Normal job - list files from source
-                files = await self.rclone_service.list_files(
-                    remote_name="source",
-                    path=job.source_path,
-                    pattern=job.file_pattern or "*"
-                )
+                path, pattern = job.source_path, job.file_pattern or "*"
             
-            return files
+            if settings.RCLONE_EXECUTION_ENGINE == "rcd":
+                # operations/list returns the whole directory at once
+                for file_info in await self.rclone_service.rc_list_files(source_remote, path, pattern, hashes=hashes):
+                    yield file_info
+            else:
+                async for file_info in self.rclone_service.iter_files(source_remote, path, pattern, hashes=hashes):
+                    yield file_info
         except Exception as e:
             logger.error(f"Error listing files for job {job.id}: {e}")
             raise
     
-    async def _configure_endpoint(self, endpoint: Endpoint, name: str) -> dict:
-        """Configure rclone remote for an endpoint"""
+    async def _configure_endpoint(self, endpoint: Endpoint, job_id: str) -> str:
+        """Configure the rclone remote for an endpoint and return its name
+        
+        Remotes are named by endpoint ID and config version, so every job and
+        transfer using the same endpoint shares one remote definition. The
+        job's remotes stay configured until _release_remotes, even if the
+        endpoint is edited while the job runs.
+        """
+        config = self._remote_config(endpoint)
+        name = RcloneService.remote_name_for(endpoint.id, config)
+        config['name'] = name
+        await self.rclone_service.configure_remote(name, config, user=job_id)
+        if settings.RCLONE_EXECUTION_ENGINE == "rcd":
+            await self.rclone_service.configure_rc_remote(name, config, user=job_id)
+        return name
+    
+    async def _release_remotes(self, job_id: str):
+        """Let remotes a finished job used go, if newer config versions replaced them"""
+        try:
+            await self.rclone_service.release_remotes(job_id)
+            if settings.RCLONE_EXECUTION_ENGINE == "rcd":
+                await self.rclone_service.release_rc_remotes(job_id)
+        except Exception as e:
+            logger.warning(f"Error releasing rclone remotes of job {job_id}: {e}")
+    
+    def _remote_config(self, endpoint: Endpoint) -> Dict[str, Any]:
+        """The rclone remote config for an endpoint"""
         config = {
-            'name': name,
             'type': endpoint.type.value  # Get the string value from the enum
         }
         
@@ -349,86 +1061,351 @@ class JobProcessor:
                 
             config.update(sftp_config)
         
-        # Configure the remote
-        await self.rclone_service.configure_remote(name, config)
         return config
     
+    def _copies_server_side(self, job: Job) -> bool:
+        """Whether a job's files can be copied (or moved) without streaming them through the worker
+        
+        S3 endpoints with the same credentials and region only differ by
+        bucket, so rclone can copy between them server-side. Local endpoints
+        are both plain paths for rclone; a move within one filesystem is a
+        rename, while a copy still reads and writes every byte.
+        """
+        source, dest = job.source_endpoint, job.destination_endpoint
+        if source.type != dest.type:
+            return False
+        if source.type.value == 's3':
+            source_config, dest_config = self._remote_config(source), self._remote_config(dest)
+            source_config.pop('bucket', None)
+            dest_config.pop('bucket', None)
+            return source_config == dest_config
+        if source.type.value == 'local' and job.delete_source_after_transfer:
+            # Relative paths are under the endpoint's base path; templates resolve below their fixed prefix
+            return self._same_filesystem(
+                os.path.join(source.config.get('path', '/'), job.source_path),
+                os.path.join(dest.config.get('path', '/'), job.destination_path.split('{', 1)[0])
+            )
+        return False
+    
+    @staticmethod
+    def _same_filesystem(source_path: str, dest_path: str) -> bool:
+        """Whether two local paths (or their nearest existing parents) are on the same device"""
+        def device(path: str) -> Optional[int]:
+            path = os.path.abspath(path)
+            while not os.path.exists(path):
+                parent = os.path.dirname(path)
+                if parent == path:
+                    return None
+                path = parent
+            return os.stat(path).st_dev
+        source_device = device(source_path)
+        return source_device is not None and source_device == device(dest_path)
+    
     async def _execute_transfer(self, db, job: Job, transfer: Transfer):
         """Execute a single file transfer"""
-        transfer.status = TransferStatus.IN_PROGRESS
-        transfer.started_at = datetime.now(timezone.utc)
-        await db.commit()
+        db_lock = self._db_lock(job.id)
+        async with db_lock:
+            transfer.status = TransferStatus.IN_PROGRESS
+            transfer.started_at = datetime.now(timezone.utc)
+            await db.commit()
         
         try:
             # Configure endpoints
-            await self._configure_endpoint(job.source_endpoint, "source")
-            await self._configure_endpoint(job.destination_endpoint, "dest")
+            source_remote = await self._configure_endpoint(job.source_endpoint, job.id)
+            dest_remote = await self._configure_endpoint(job.destination_endpoint, job.id)
             
             # Build source and destination paths
-            source_path = self._build_remote_path("source", job.source_endpoint, job.source_path, transfer.file_path)
+            source_path = self._build_remote_path(source_remote, job.source_endpoint, job.source_path, transfer.file_path)
             
             # PHASE 1: Log source path building
             logger.info(f"[FILE_TRACKING] Source path: endpoint_type={job.source_endpoint.type.value}, base={job.source_path}, file={transfer.file_path} -> {source_path}")
             
             # For destination, apply template substitution if the path contains template variables
-            dest_base_path = job.destination_path
-            original_dest_path = dest_base_path  # PHASE 1: Track original template
-            
-            if any(var in dest_base_path for var in ['{year}', '{month}', '{day}', '{filename}', '{original_filename}', '{timestamp}']):
-                # Apply template substitution
-                substituted_path = self._apply_path_template(dest_base_path, transfer.file_name)
-                # Extract the directory path (remove the filename if it's at the end)
-                from pathlib import Path
-                path_obj = Path(substituted_path)
-                if path_obj.name == transfer.file_name:
-                    # If the path ends with the filename, use the parent directory
-                    dest_base_path = str(path_obj.parent)
-                else:
-                    # Otherwise use the full substituted path
-                    dest_base_path = substituted_path
-                
-                # PHASE 1: Log destination path template processing
-                logger.info(f"[FILE_TRACKING] Destination template: '{original_dest_path}' -> '{dest_base_path}'")
+            dest_base_path = self._resolve_destination_dir(job, transfer.file_name)
             
             # Build the final destination path
-            dest_path = self._build_remote_path("dest", job.destination_endpoint, dest_base_path, "")
+            dest_path = self._build_remote_path(dest_remote, job.destination_endpoint, dest_base_path, "")
             
             # PHASE 1: Track the actual destination path for each file
             # This includes the full path with filename after template substitution
             actual_dest_file_path = f"{dest_path}/{transfer.file_name}"
-            transfer.destination_path = actual_dest_file_path
             logger.info(f"[FILE_TRACKING] Transfer {transfer.id} - File: {transfer.file_name}, Destination: {actual_dest_file_path}")
-            await db.commit()
+            async with db_lock:
+                transfer.destination_path = actual_dest_file_path
+                await db.commit()
             
             # Track this transfer
-            transfer_task = asyncio.create_task(
-                self._run_transfer_with_progress(db, transfer, source_path, dest_path, job.delete_source_after_transfer)
-            )
+            # Tuned for the file's size class; server-side copies don't use the worker's bandwidth
+            tuning = transfer_tuning.for_files(job.source_endpoint, job.destination_endpoint, [transfer.file_size])
+            if settings.RCLONE_EXECUTION_ENGINE == "rcd":
+                run = self._run_transfer_via_rcd(
+                    db, transfer, source_path, dest_path, job.delete_source_after_transfer,
+                    server_side=transfer.server_side, tuning=tuning
+                )
+            else:
+                run = self._run_transfer_with_progress(
+                    db, transfer, source_path, dest_path, job.delete_source_after_transfer,
+                    bandwidth_budgets=None if transfer.server_side else bandwidth_governor.budgets_for(
+                        job.source_endpoint, job.destination_endpoint
+                    ),
+                    server_side=transfer.server_side, tuning=tuning
+                )
+            transfer_task = asyncio.create_task(run)
             self.current_transfers[transfer.id] = transfer_task
             
             # Wait for completion
+            transfer_started = time.monotonic()
             await transfer_task
+            await self.throttle_controller.record_success(
+                self._job_endpoint_ids(job), transfer.file_size, time.monotonic() - transfer_started,
+                measure=not transfer.server_side, rate_endpoint_ids=self._rate_endpoint_ids(job)
+            )
             
             # Update transfer status
-            transfer.status = TransferStatus.COMPLETED
-            transfer.completed_at = datetime.now(timezone.utc)
-            transfer.progress_percentage = 100.0
-            await db.commit()
+            async with db_lock:
+                transfer.status = TransferStatus.COMPLETED
+                transfer.completed_at = datetime.now(timezone.utc)
+                transfer.progress_percentage = 100.0
+                await db.commit()
             
             # Update endpoint statistics
-            await self._update_endpoint_stats(db, job.source_endpoint_id, job.destination_endpoint_id, transfer.file_size)
+            await stats_counters.record_transfers(
+                (job.source_endpoint_id, job.destination_endpoint_id), 1, transfer.file_size
+            )
             
         except asyncio.CancelledError:
-            transfer.status = TransferStatus.CANCELLED
-            await db.commit()
+            async with db_lock:
+                transfer.status = TransferStatus.CANCELLED
+                await db.commit()
             raise
         except Exception as e:
-            transfer.status = TransferStatus.FAILED
-            transfer.error_message = str(e)
-            await db.commit()
+            async with db_lock:
+                transfer.status = TransferStatus.FAILED
+                transfer.error_message = str(e)
+                await db.commit()
+            await self.throttle_controller.record_failure(self._error_endpoint_ids(job, str(e)), str(e))
             raise
         finally:
             self.current_transfers.pop(transfer.id, None)
+            await redis_manager.clear_transfer_progress(transfer.id, transfer.job_id)
+    
+    def _resolve_destination_dir(self, job: Job, file_name: str) -> str:
+        """Resolve the job's destination path template to the directory a file is copied into"""
+        dest_base_path = job.destination_path
+        original_dest_path = dest_base_path  # PHASE 1: Track original template
+        
+        if any(var in dest_base_path for var in ['{year}', '{month}', '{day}', '{filename}', '{original_filename}',
+                                                 '{basename}', '{extension}', '{timestamp}']):
+            # Apply template substitution
+            substituted_path = self._apply_path_template(dest_base_path, file_name)
+            # Extract the directory path (remove the filename if it's at the end)
+            path_obj = Path(substituted_path)
+            if path_obj.name == file_name:
+                # If the path ends with the filename, use the parent directory
+                dest_base_path = str(path_obj.parent)
+            else:
+                # Otherwise use the full substituted path
+                dest_base_path = substituted_path
+            
+            # PHASE 1: Log destination path template processing
+            logger.info(f"[FILE_TRACKING] Destination template: '{original_dest_path}' -> '{dest_base_path}'")
+        
+        return dest_base_path
+    
+    def _use_batch_mode(self, job: Job) -> bool:
+        """Whether a job's files go through one rclone invocation instead of one per file
+        
+        Set per job with config "transfer_mode" ("batch", "per_file" or "auto"),
+        falling back to TRANSFER_MODE. "auto" batches whenever an SMB or SFTP
+        endpoint is involved, where connection setup dominates small transfers.
+        """
+        mode = (job.config or {}).get('transfer_mode') or settings.TRANSFER_MODE
+        if mode == 'auto':
+            return any(
+                endpoint.type.value in ('smb', 'sftp')
+                for endpoint in (job.source_endpoint, job.destination_endpoint)
+            )
+        return mode == 'batch'
+    
+    def _get_batch_tuning(self, job: Job, size_tuning: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """rclone --transfers/--checkers for a batch, tuned to the weaker endpoint
+        
+        Starts from the per-type defaults, or the transfers of the batch's
+        size profile (see transfer_tuning) when given. An endpoint's config
+        can override them with "batch_transfers"/"batch_checkers", and the
+        result never exceeds either endpoint's max_concurrent_transfers.
+        """
+        transfers = []
+        checkers = []
+        for endpoint in (job.source_endpoint, job.destination_endpoint):
+            defaults = BATCH_TUNING_DEFAULTS.get(endpoint.type.value, BATCH_TUNING_DEFAULTS['default'])
+            default_transfers = (size_tuning or {}).get('transfers', defaults['transfers'])
+            endpoint_config = endpoint.config or {}
+            transfers.append(endpoint_config.get('batch_transfers', default_transfers))
+            checkers.append(endpoint_config.get('batch_checkers', defaults['checkers']))
+            if endpoint.max_concurrent_transfers:
+                transfers.append(endpoint.max_concurrent_transfers)
+        return {'transfers': max(1, min(transfers)), 'checkers': max(1, min(checkers))}
+    
+    async def _execute_batch_transfers(self, db, job: Job, transfers: list, record_success, record_failure) -> list:
+        """Run a job's transfers as batched rclone invocations
+        
+        Files are grouped by resolved destination directory and each group is
+        copied with a single `rclone copy --files-from-raw`. Per-file results
+        come from rclone's JSON log and are applied to each Transfer row.
+        
+        Several calls can run at once for one job, each rclone process holding
+        one endpoint slot and one bandwidth share per file it copies at once
+        (--transfers is cut down to the slots it could get); only the shared
+        session is serialized, by the job's db_lock.
+        
+        Returns the transfers that can't be batched (nested source paths, which
+        batch mode would recreate at the destination) for per-file execution.
+        """
+        db_lock = self._db_lock(job.id)
+        rclone_service = self.rclone_service
+        source_remote = await self._configure_endpoint(job.source_endpoint, job.id)
+        dest_remote = await self._configure_endpoint(job.destination_endpoint, job.id)
+        
+        async def apply_results(results: list):
+            # Final statuses are committed before the callbacks run: they may
+            # queue fan-out chain jobs that read them
+            async with db_lock:
+                for transfer, error in results:
+                    if error is not None:
+                        transfer.status = TransferStatus.FAILED
+                        transfer.error_message = str(error)
+                await db.commit()
+            for transfer, error in results:
+                if error is None:
+                    await record_success(transfer, commit=False)
+                else:
+                    await record_failure(transfer, error, commit=False)
+            async with db_lock:
+                await db.commit()
+        
+        groups: Dict[str, list] = {}
+        unbatched = []
+        for transfer in transfers:
+            if transfer.file_path != transfer.file_name:
+                unbatched.append(transfer)
+                continue
+            dest_dir = self._resolve_destination_dir(job, transfer.file_name)
+            groups.setdefault(dest_dir, []).append(transfer)
+        
+        source_root = self._build_remote_path(source_remote, job.source_endpoint, job.source_path, "")
+        
+        for dest_dir, group in groups.items():
+            dest_path = self._build_remote_path(dest_remote, job.destination_endpoint, dest_dir, "")
+            size_tuning = transfer_tuning.for_files(
+                job.source_endpoint, job.destination_endpoint, [transfer.file_size for transfer in group]
+            )
+            tuning = self._get_batch_tuning(job, size_tuning)
+            logger.info(
+                f"[FILE_TRACKING] Batch transfer of {len(group)} files: {source_root} -> {dest_path} "
+                f"(transfers={tuning['transfers']}, checkers={tuning['checkers']})"
+            )
+            
+            by_path = {transfer.file_path: transfer for transfer in group}
+            async with db_lock:
+                started_at = datetime.now(timezone.utc)
+                for transfer in group:
+                    transfer.status = TransferStatus.IN_PROGRESS
+                    transfer.started_at = started_at
+                    transfer.destination_path = f"{dest_path}/{transfer.file_name}"
+                await db.commit()
+            
+            # Each file rclone copies at once holds a slot and a bandwidth share on each endpoint
+            batch_key = f"batch:{uuid.uuid4().hex[:8]}"
+            server_side = all(transfer.server_side for transfer in group)
+            bandwidth_budgets = None if server_side else bandwidth_governor.budgets_for(
+                job.source_endpoint, job.destination_endpoint
+            )
+            async with self._transfer_slots(job, batch_key, min(tuning['transfers'], len(group))) as streams, \
+                    self._bandwidth_allocation(batch_key, bandwidth_budgets, streams) as bandwidth:
+                process, work_dir = await rclone_service.start_batch_transfer(
+                    source=source_root,
+                    dest=dest_path,
+                    files=list(by_path.keys()),
+                    transfers=streams,
+                    checkers=tuning['checkers'],
+                    delete_source=job.delete_source_after_transfer,
+                    bwlimit=bandwidth.rate,
+                    live_bwlimit=bool(bandwidth.rate),
+                    server_side=server_side,
+                    tuning_args=transfer_tuning.rclone_args(size_tuning)
+                )
+            
+                errors: Dict[str, str] = {}
+                output = RcloneOutputStream(process)
+                batch_started = time.monotonic()
+                try:
+                    async for event in output:
+                        if isinstance(event, FileCompleted) and event.path in by_path:
+                            logger.info(f"[FILE_TRACKING] Batch file done: {event.path} ({event.message})")
+                        elif isinstance(event, TransferError) and event.path in by_path:
+                            errors[event.path] = event.message
+                        elif isinstance(event, RcServing):
+                            bandwidth.follow(lambda rate, port=event.port: rclone_service.set_bandwidth_limit(port, rate))
+                    await process.wait()
+                    report = rclone_service.read_batch_report(work_dir)
+                except asyncio.CancelledError:
+                    process.kill()
+                    async with db_lock:
+                        for transfer in group:
+                            if transfer.status == TransferStatus.IN_PROGRESS:
+                                transfer.status = TransferStatus.CANCELLED
+                        await db.commit()
+                    raise
+                except Exception as e:
+                    # Reading the log or report failed: nothing is known per file
+                    if process.returncode is None:
+                        process.kill()
+                    logger.error(f"Batch transfer to {dest_path} failed: {e}", exc_info=True)
+                    await apply_results([(transfer, e) for transfer in group])
+                    continue
+                finally:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+                batch_seconds = time.monotonic() - batch_started
+            
+            batch_error = output.error_summary() or f"rclone exited with code {process.returncode}"
+            completed_at = datetime.now(timezone.utc)
+            transferred_count = 0
+            transferred_bytes = 0
+            results = []
+            for file_path, transfer in by_path.items():
+                # "=" (already identical at the destination) counts as delivered
+                if file_path not in errors and report.get(file_path) in ('=', '+', '*'):
+                    transfer.status = TransferStatus.COMPLETED
+                    transfer.completed_at = completed_at
+                    transfer.progress_percentage = 100.0
+                    transfer.bytes_transferred = transfer.file_size
+                    transferred_count += 1
+                    transferred_bytes += transfer.file_size
+                    results.append((transfer, None))
+                elif file_path in errors or file_path in report or process.returncode:
+                    # A failed run (e.g. unreachable remote) may leave no report at all
+                    results.append((transfer, Exception(errors.get(file_path, batch_error))))
+                else:
+                    # rclone ran cleanly but never saw the file
+                    results.append((transfer, Exception(f"File not found at source: {file_path}")))
+            
+            await apply_results(results)
+            await stats_counters.record_transfers(
+                (job.source_endpoint_id, job.destination_endpoint_id), transferred_count, transferred_bytes
+            )
+            # One rclone process is one sample; its rate is split over the files it ran at once
+            if errors or process.returncode:
+                error = next(iter(errors.values()), batch_error)
+                await self.throttle_controller.record_failure(self._error_endpoint_ids(job, error), error)
+            elif transferred_count:
+                await self.throttle_controller.record_success(
+                    self._job_endpoint_ids(job), transferred_bytes, batch_seconds,
+                    streams=streams, measure=not server_side,
+                    rate_endpoint_ids=self._rate_endpoint_ids(job)
+                )
+        
+        return unbatched
     
     def _build_remote_path(self, remote_name: str, endpoint: Endpoint, base_path: str, file_path: str) -> str:
         """Build the full remote path for rclone"""
@@ -468,6 +1445,8 @@ class JobProcessor:
             '{original_filename}': filename,  # Alias for {filename}
             '{name}': name_without_ext,
             '{ext}': ext,
+            '{basename}': name_without_ext,  # Chain rule names for {name} and {ext}
+            '{extension}': ext.lstrip('.'),
             '{year}': str(now.year),
             '{month}': f"{now.month:02d}",
             '{day}': f"{now.day:02d}",
@@ -486,87 +1465,278 @@ class JobProcessor:
             
         return result
     
-    async def _run_transfer_with_progress(self, db, transfer: Transfer, source: str, dest: str, delete_source: bool):
-        """Run the transfer and monitor progress"""
+    async def _run_transfer_with_progress(self, db, transfer: Transfer, source: str, dest: str, delete_source: bool,
+                                          bandwidth_budgets: Optional[Dict[str, int]] = None,
+                                          server_side: bool = False, tuning: Optional[Dict[str, Any]] = None):
+        """Run the transfer and monitor progress
+        
+        bandwidth_budgets (endpoint ID -> bytes/sec) caps the transfer at its
+        share of those endpoints' bandwidth, rebalanced while it runs.
+        """
         logger.info(f"Starting transfer: {source} -> {dest}")
+        rclone_service = self.rclone_service
         
-        # Start the transfer
-        process = await self.rclone_service.start_transfer(
-            source=source,
-            dest=dest,
-            delete_source=delete_source
-        )
+        async with self._bandwidth_allocation(transfer.id, bandwidth_budgets) as bandwidth:
+            # Start the transfer
+            process = await rclone_service.start_transfer(
+                source=source,
+                dest=dest,
+                delete_source=delete_source,
+                bwlimit=bandwidth.rate,
+                live_bwlimit=bool(bandwidth.rate),
+                server_side=server_side,
+                tuning_args=transfer_tuning.rclone_args(tuning)
+            )
+            
+            # Follow rclone's JSON log: progress once a second, errors for the failure message
+            output = RcloneOutputStream(process)
+            last_progress = None
+            try:
+                async for event in output:
+                    if isinstance(event, RcServing):
+                        # The rc server is up: rebalance the bandwidth share through it
+                        bandwidth.follow(lambda rate, port=event.port: rclone_service.set_bandwidth_limit(port, rate))
+                    if not isinstance(event, TransferProgress):
+                        continue
+                    # Live progress goes to Redis; the flusher batches it into Postgres
+                    last_progress = self._progress_fields(event)
+                    try:
+                        await redis_manager.set_transfer_progress(transfer.id, transfer.job_id, last_progress)
+                    except Exception as e:
+                        logger.error(f"Error recording progress for transfer {transfer.id}: {e}")
+                await process.wait()
+            except asyncio.CancelledError:
+                process.kill()
+                raise
+            
+            # Final progress is saved with the transfer's completion commit
+            if last_progress:
+                for field, value in last_progress.items():
+                    setattr(transfer, field, value)
+        
+        # Check final status
+        if process.returncode != 0:
+            error_msg = output.error_summary()  # Last 10 lines of error
+            logger.error(f"Rclone failed with code {process.returncode}: {error_msg}")
+            raise Exception(f"Rclone failed: {error_msg}")
+    
+    async def _run_transfer_via_rcd(self, db, transfer: Transfer, source: str, dest: str, delete_source: bool,
+                                    server_side: bool = False, tuning: Optional[Dict[str, Any]] = None):
+        """Run the transfer as a job in the shared rcd and monitor progress
         
-        # Collect stderr for error reporting
-        stderr_lines = []
+        Progress comes from the transfer's own stats group. Cancelling stops
+        the rcd job. The per-transfer bandwidth governor doesn't apply here:
+        an rcd has one bandwidth limit for all of its jobs.
+        """
+        rclone_service = self.rclone_service
+        group = f"transfer/{transfer.id}"
+        rc_job_id = await rclone_service.start_rc_transfer(
+            source, dest, group, delete_source=delete_source, server_side=server_side,
+            rc_config=transfer_tuning.rc_config(tuning)
+        )
         
-        # Monitor progress
-        while True:
-            try:
-                # Check if process is still running
-                if process.returncode is not None:
-                    break
-                
-                # Read any stderr output
+        last_progress = None
+        try:
+            while True:
+                # One batched status+stats request per tick covers every running rcd transfer
+                status, stats = await rc_job_monitor.poll(rc_job_id, group)
                 try:
-                    stderr_line = await asyncio.wait_for(process.stderr.readline(), timeout=0.1)
-                    if stderr_line:
-                        line = stderr_line.decode().strip()
-                        stderr_lines.append(line)
-                        logger.debug(f"Rclone stderr: {line}")
-                except asyncio.TimeoutError:
-                    pass
-                
-                # Get progress from rclone (this would parse rclone's JSON output)
-                progress_info = await self.rclone_service.get_transfer_progress(process)
-                
-                if progress_info:
-                    transfer.bytes_transferred = progress_info.get('bytes', 0)
-                    transfer.progress_percentage = progress_info.get('percentage', 0)
-                    transfer.transfer_rate = progress_info.get('rate', 0)
-                    transfer.eta = progress_info.get('eta')
-                    await db.commit()
-                
-                await asyncio.sleep(1)  # Update every second
-                
+                    progress = TransferProgress.from_stats(stats)
+                    last_progress = self._progress_fields(progress)
+                    # Live progress goes to Redis; the flusher batches it into Postgres
+                    await redis_manager.set_transfer_progress(transfer.id, transfer.job_id, last_progress)
+                except Exception as e:
+                    logger.error(f"Error recording progress for transfer {transfer.id}: {e}")
+                if status.get('finished'):
+                    break
+        except asyncio.CancelledError:
+            await asyncio.shield(rclone_service.stop_rc_job(rc_job_id))
+            raise
+        finally:
+            try:
+                await asyncio.shield(rclone_service.delete_rc_stats(group))
             except Exception as e:
-                logger.error(f"Error monitoring transfer {transfer.id}: {e}")
-                break
+                logger.warning(f"Could not delete rcd stats group {group}: {e}")
         
-        # Read any remaining stderr
-        remaining_stderr = await process.stderr.read()
-        if remaining_stderr:
-            stderr_lines.extend(remaining_stderr.decode().strip().split('\n'))
+        # Final progress is saved with the transfer's completion commit
+        if last_progress:
+            for field, value in last_progress.items():
+                setattr(transfer, field, value)
         
-        # Check final status
-        if process.returncode != 0:
-            error_msg = '\n'.join(stderr_lines[-10:])  # Last 10 lines of error
-            logger.error(f"Rclone failed with code {process.returncode}: {error_msg}")
+        if not status.get('success'):
+            error_msg = status.get('error') or "unknown error"
+            logger.error(f"Rclone job {rc_job_id} failed: {error_msg}")
             raise Exception(f"Rclone failed: {error_msg}")
     
-    async def _update_endpoint_stats(self, db, source_id: str, dest_id: str, bytes_transferred: int):
-        """Update endpoint statistics after successful transfer"""
-        # Update source endpoint
-        await db.execute(
-            update(Endpoint)
-            .where(Endpoint.id == source_id)
-            .values(
-                total_transfers=Endpoint.total_transfers + 1,
-                total_bytes_transferred=Endpoint.total_bytes_transferred + bytes_transferred
+    @staticmethod
+    def _progress_fields(progress: TransferProgress) -> dict:
+        """Map rclone progress to Transfer columns (rclone's ETA is in seconds)"""
+        return {
+            'bytes_transferred': progress.bytes,
+            'progress_percentage': progress.percentage,
+            'transfer_rate': progress.speed,
+            'eta': datetime.now(timezone.utc) + timedelta(seconds=progress.eta) if progress.eta is not None else None,
+        }
+    
+    @staticmethod
+    def _chain_dispatch(job: Job) -> str:
+        """When a job creates its chain jobs: "on_completion", "streaming" or "fanout"
+        
+        Set per job with config "chain_dispatch", falling back to CHAIN_DISPATCH.
+        Streamed chains start as each file lands, while the parent is still
+        running, and don't wait for its other files to succeed. Fan-out
+        chains are created as files are listed and copy from the parent's
+        source, so files aren't re-read from the primary destination. Each
+        file still waits for its parent transfer and is only copied if that
+        succeeded: a chunk's chain jobs are queued once all of its parent
+        transfers have finished. With config "chain_fanout_wait": False they
+        are queued right away, so every destination is written at the same
+        time but a file whose parent copy fails still reaches the chain
+        destinations. Moves
+        can't fan out (the parent deletes the source), so they stream instead.
+        """
+        config = job.config or {}
+        if not config.get('chain_rules'):
+            return 'on_completion'
+        dispatch = config.get('chain_dispatch') or settings.CHAIN_DISPATCH
+        if dispatch == 'fanout' and job.delete_source_after_transfer:
+            logger.warning(f"Job {job.id} deletes its source files, streaming chain jobs instead of fanning out")
+            dispatch = 'streaming'
+        return dispatch
+    
+    async def _wait_for_parent_transfers(self, db, job: Job, rows: list):
+        """Yield (ready, failed) Transfer rows of a fan-out chain job as their parent transfers finish
+        
+        Checked every CHAIN_DISPATCH_SECONDS. Rows whose parent transfer
+        failed or was cancelled, or didn't complete before the parent job
+        stopped running, come back as failed. The parent only queues the job
+        once those transfers have finished, so normally the first check
+        settles every row.
+        """
+        ready = [row for row in rows if not row['parent_transfer_id']]
+        waiting = {row['parent_transfer_id']: row for row in rows if row['parent_transfer_id']}
+        while True:
+            failed = []
+            if waiting:
+                async with self._db_lock(job.id):
+                    # Parent job first: once it has stopped, the statuses read next are final
+                    parent_status = await db.scalar(select(Job.status).where(Job.id == job.parent_job_id))
+                    result = await db.execute(
+                        select(Transfer.id, Transfer.status).where(Transfer.id.in_(list(waiting)))
+                    )
+                    statuses = dict(result.all())
+                parent_running = parent_status in (JobStatus.QUEUED, JobStatus.RUNNING)
+                for parent_transfer_id in list(waiting):
+                    status = statuses.get(parent_transfer_id)
+                    if status == TransferStatus.COMPLETED:
+                        ready.append(waiting.pop(parent_transfer_id))
+                    elif status in (TransferStatus.FAILED, TransferStatus.CANCELLED) or not parent_running:
+                        failed.append(waiting.pop(parent_transfer_id))
+            if ready or failed:
+                logger.info(
+                    f"[CHAIN_FIX] Job {job.id} - {len(ready)} file(s) cleared by their parent transfers, "
+                    f"{len(failed)} failed, {len(waiting)} still waiting"
+                )
+                yield ready, failed
+                ready = []
+            if not waiting:
+                return
+            await asyncio.sleep(settings.CHAIN_DISPATCH_SECONDS)
+    
+    async def _dispatch_fanout_chain_jobs(self, parent_job: Job, rows: list, queue: bool = True) -> Optional[list]:
+        """Create fan-out chain jobs for a chunk of a parent job's Transfer rows
+        
+        With queue=False they are left pending, for _queue_held_chain_jobs
+        once the rows' transfers have finished. Returns the chain jobs, or
+        None if they couldn't be created; the caller then keeps the rows to
+        try again when the parent job finishes.
+        """
+        from app.services.chain_job_service import ChainJobService
+        
+        async def create(chain_db):
+            return await ChainJobService.create_fanout_chain_jobs(
+                parent_job, parent_job.config['chain_rules'], rows, chain_db
             )
+        
+        chain_jobs = await self._queue_new_chain_jobs(parent_job, create, queue=queue)
+        if chain_jobs is None:
+            return None
+        logger.info(
+            f"[CHAIN_FIX] Fanned out {len(rows)} file(s) of job {parent_job.id} to {len(chain_jobs)} chain job(s)"
+            f"{'' if queue else ', held until their parent transfers finish'}"
         )
+        return chain_jobs
+    
+    async def _queue_held_chain_jobs(self, parent_job: Job, chain_job_ids: list):
+        """Queue chain jobs left pending by _dispatch_fanout_chain_jobs
         
-        # Update destination endpoint
-        await db.execute(
-            update(Endpoint)
-            .where(Endpoint.id == dest_id)
-            .values(
-                total_transfers=Endpoint.total_transfers + 1,
-                total_bytes_transferred=Endpoint.total_bytes_transferred + bytes_transferred
+        Only jobs still pending are queued, so a job queued meanwhile (e.g.
+        by _process_chain_jobs) is never queued twice. If this fails the jobs
+        stay pending, to be queued when the parent job completes.
+        """
+        async with AsyncSessionLocal() as chain_db:
+            try:
+                result = await chain_db.execute(
+                    update(Job)
+                    .where(Job.id.in_(chain_job_ids), Job.status == JobStatus.PENDING)
+                    .values(status=JobStatus.QUEUED)
+                    .returning(Job.id)
+                )
+                queued = list(result.scalars())
+                await chain_db.commit()
+            except Exception as e:
+                await chain_db.rollback()
+                logger.error(f"Error queueing held chain jobs of {parent_job.id}: {e}")
+                return
+        if queued:
+            await redis_manager.enqueue_jobs(queued)
+            logger.info(f"[CHAIN_FIX] Queued {len(queued)} fan-out chain job(s) of job {parent_job.id}")
+    
+    async def _dispatch_chain_jobs(self, parent_job: Job, transfers: list) -> bool:
+        """Create and queue chain jobs for transfers of a still-running parent job
+        
+        Returns False if they couldn't be created; the caller keeps the
+        transfers to try again when the parent job finishes.
+        """
+        from app.services.chain_job_service import ChainJobService
+        chain_mode = parent_job.config.get('chain_mode') or settings.CHAIN_JOB_MODE
+        
+        async def create(chain_db):
+            return await ChainJobService.create_chain_jobs(
+                parent_job, parent_job.config['chain_rules'], chain_db, per_file_transfers=transfers,
+                grouped=chain_mode == 'grouped'
             )
+        
+        chain_jobs = await self._queue_new_chain_jobs(parent_job, create)
+        if chain_jobs is None:
+            return False
+        logger.info(
+            f"[CHAIN_FIX] Dispatched {len(chain_jobs)} {chain_mode} chain job(s) for "
+            f"{len(transfers)} file(s) of running job {parent_job.id}"
         )
+        return True
+    
+    async def _queue_new_chain_jobs(self, parent_job: Job, create, queue: bool = True) -> Optional[list]:
+        """Create chain jobs with create(session) and queue them; None if that failed
         
-        await db.commit()
+        Runs in a session of its own, so a failed insert or commit is rolled
+        back there and never leaves the running parent's shared session
+        needing a rollback. With queue=False the jobs are left pending.
+        """
+        async with AsyncSessionLocal() as chain_db:
+            try:
+                chain_jobs = await create(chain_db)
+                if queue:
+                    for chain_job in chain_jobs:
+                        chain_job.status = JobStatus.QUEUED
+                await chain_db.commit()
+            except Exception as e:
+                await chain_db.rollback()
+                logger.error(f"Error creating chain jobs for {parent_job.id}: {e}")
+                return None
+        if queue:
+            await redis_manager.enqueue_jobs([chain_job.id for chain_job in chain_jobs])
+        return chain_jobs
     
     async def _process_chain_jobs(self, db, parent_job: Job, successful_transfers: list = None):
         """Process any chain jobs after parent job completion"""
@@ -588,12 +1758,14 @@ class JobProcessor:
                         # Import ChainJobService to create per-file chain jobs
                         from app.services.chain_job_service import ChainJobService
                         chain_rules = parent_job.config['chain_rules']
+                        chain_mode = parent_job.config.get('chain_mode') or settings.CHAIN_JOB_MODE
                         
-                        # Create chain jobs for each successful transfer
+                        # Create chain jobs for the successful transfers
                         new_chain_jobs = await ChainJobService.create_chain_jobs(
-                            parent_job, chain_rules, db, per_file_transfers=transfers
+                            parent_job, chain_rules, db, per_file_transfers=transfers,
+                            grouped=chain_mode == 'grouped'
                         )
-                        logger.info(f"[CHAIN_FIX] Created {len(new_chain_jobs)} per-file chain jobs")
+                        logger.info(f"[CHAIN_FIX] Created {len(new_chain_jobs)} {chain_mode} chain jobs")
             
             # Check if there are chain jobs waiting for this parent (legacy or newly created)
             result = await db.execute(
@@ -605,34 +1777,42 @@ class JobProcessor:
             )
             chain_jobs = result.scalars().all()
             
-            for chain_job in chain_jobs:
-                # Queue the chain job for processing
-                chain_job.status = JobStatus.QUEUED
+            if chain_jobs:
+                # Queue the chain jobs for processing
+                for chain_job in chain_jobs:
+                    chain_job.status = JobStatus.QUEUED
                 await db.commit()
                 
-                await redis_manager.enqueue_job(chain_job.id)
-                logger.info(f"Queued chain job {chain_job.id} after parent {parent_job.id} completed")
+                await redis_manager.enqueue_jobs([chain_job.id for chain_job in chain_jobs])
+                logger.info(f"Queued {len(chain_jobs)} chain job(s) after parent {parent_job.id} completed")
                 
             # Also check if parent job had transfer template with chain rules
             if parent_job.config and 'transfer_template_id' in parent_job.config:
                 # Update transfer template success count
-                from app.models.transfer_template import TransferTemplate
-                result = await db.execute(
-                    select(TransferTemplate).where(TransferTemplate.id == parent_job.config['transfer_template_id'])
+                await stats_counters.record_template(
+                    parent_job.config['transfer_template_id'], successful_transfers=1
                 )
-                transfer_template = result.scalar_one_or_none()
-                
-                if transfer_template:
-                    transfer_template.successful_transfers += 1
-                    await db.commit()
                     
         except Exception as e:
             logger.error(f"Error processing chain jobs for {parent_job.id}: {e}")
 
 
+def parse_args():
+    """Parse worker command line options"""
+    parser = argparse.ArgumentParser(description="File transfer job worker")
+    parser.add_argument(
+        "--job-concurrency",
+        type=int,
+        default=settings.WORKER_JOB_CONCURRENCY,
+        help="Maximum number of jobs this worker runs at once (default: %(default)s)"
+    )
+    return parser.parse_args()
+
+
 async def main():
     """Main entry point for the worker"""
-    processor = JobProcessor()
+    args = parse_args()
+    processor = JobProcessor(job_concurrency=args.job_concurrency)
     
     # Handle shutdown signals
     def signal_handler(sig, frame):